@@ -0,0 +1,73 @@
+# [h] hTools2 command line
+
+'''
+Apply actions to all fonts in a folder from the command line.
+
+    python -m hTools2 ufos_folder --decompose --overlaps --generate --workers 4 --json summary.json
+
+'''
+
+import sys
+import json
+import argparse
+from hTools2.modules.batch import ACTIONS, batch_folder
+from hTools2.modules.backends import can_generate
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m hTools2',
+                description='Apply actions to all .ufo fonts in a folder.')
+    parser.add_argument('ufos_folder',
+                help='folder with .ufo fonts')
+    for action in ACTIONS:
+        parser.add_argument('--%s' % action.replace('_', '-'),
+                dest='actions', action='append_const', const=action,
+                help='%s (action)' % action.replace('_', ' '))
+    parser.add_argument('--otfs-folder', default=None,
+                help='folder for generated .otfs (default: same as .ufos)')
+    parser.add_argument('--autohint', action='store_true',
+                help='autohint generated .otfs')
+    parser.add_argument('--release-mode', action='store_true',
+                help='generate .otfs in release mode')
+    parser.add_argument('--no-decompose', action='store_true',
+                help='keep components when generating .otfs')
+    parser.add_argument('--workers', type=int, default=None,
+                help='number of worker processes (default: one per CPU, limited by available memory)')
+    parser.add_argument('--max-memory', type=int, default=None, metavar='MB',
+                help='memory available to the worker processes, in megabytes')
+    parser.add_argument('--json', default=None, metavar='PATH',
+                help='save a JSON summary to PATH, use - for standard output')
+    options = parser.parse_args(args)
+
+    if not options.actions:
+        parser.error('no actions selected.')
+    if 'generate' in options.actions and not can_generate():
+        parser.error('--generate needs RoboFont or ufo2ft (pip install hTools2[generate]).')
+
+    generate_options = {
+        'decompose' : not options.no_decompose,
+        'checkOutlines' : 'overlaps' in options.actions,
+        'autohint' : options.autohint,
+        'releaseMode' : options.release_mode,
+    }
+    max_memory = None
+    if options.max_memory is not None:
+        max_memory = options.max_memory * 1024 * 1024
+    verbose = options.json != '-'
+    summary = batch_folder(options.ufos_folder, options.actions,
+                workers=options.workers,
+                otfs_folder=options.otfs_folder,
+                generate_options=generate_options,
+                max_memory=max_memory,
+                verbose=verbose)
+
+    if options.json == '-':
+        json.dump(summary, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    elif options.json is not None:
+        with open(options.json, 'w') as json_file:
+            json.dump(summary, json_file, indent=2, sort_keys=True)
+
+    return 1 if summary['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,7 @@ from vanilla import *
 from vanilla.dialogs import getFolder
 from hTools2 import hDialog
 from hTools2.modules.fontutils import get_full_name
+from hTools2.modules.batch import can_use_pool, font_has_changes, generate_fonts, generate_open_font, print_generate_result
 from hTools2.modules.messages import no_font_open
 
 # dialog
@@ -22,7 +23,7 @@ class generateAllFontsDialog(hDialog):
 
     def __init__(self):
         self.title = "generate"
-        self.height = (self.text_height * 5) + (self.button_height * 3) + (self.padding_y * 7)
+        self.height = (self.text_height * 6) + (self.button_height * 3) + (self.padding_y * 7)
         self.w = HUDFloatingWindow((self.width, self.height), self.title)
         # ufos folder
         x = self.padding_x
@@ -77,6 +78,14 @@ class generateAllFontsDialog(hDialog):
                     "release mode",
                     value=True,
                     sizeStyle=self.size_style)
+        y += self.text_height
+        self.w._skip_unchanged = CheckBox(
+                    (x, y,
+                    -self.padding_x,
+                    self.text_height),
+                    "skip unchanged",
+                    value=True,
+                    sizeStyle=self.size_style)
         # progress bar
         y += self.text_height + self.padding_y
         self.w.bar = ProgressBar(
@@ -119,6 +128,7 @@ class generateAllFontsDialog(hDialog):
             _overlaps = self.w._overlaps.get()
             _autohint = self.w._autohint.get()
             _release_mode = self.w._release_mode.get()
+            _skip_unchanged = self.w._skip_unchanged.get()
             # print settings
             boolstring = ("False", "True")
             print 'generating .otfs for all open fonts...\n'
@@ -127,24 +137,36 @@ class generateAllFontsDialog(hDialog):
             print '\tdecompose: %s' % boolstring[_decompose]
             print '\tautohint: %s' % boolstring[_autohint]
             print '\trelease mode: %s' % boolstring[_release_mode]
+            print '\tskip unchanged: %s' % boolstring[_skip_unchanged]
             print
             # batch generate
             self.w.bar.start()
             _undo_name = 'generate all open fonts'
+            _generate_options = {
+                'decompose' : _decompose,
+                'autohint' : _autohint,
+                'checkOutlines' : _overlaps,
+                'releaseMode' : _release_mode,
+                'glyphOrder' : [],
+            }
+            _ufo_paths = []
             for font in all_fonts:
                 if font.path is not None:
-                    _font_path = font.path
-                    print '\tgenerating .otf for %s...' % os.path.split(get_full_name(font))[1]
-                    # generate otf
-                    otf_file = os.path.splitext(os.path.split(font.path)[1])[0] + '.otf'
-                    otf_path = os.path.join(self._otfs_folder, otf_file)
-                    font.generate(otf_path, 'otf', decompose=_decompose, autohint=_autohint,
-                                checkOutlines=_overlaps, releaseMode=_release_mode, glyphOrder=[])
-                    print '\t\totf path: %s' % otf_path
-                    print '\t\tgeneration sucessful? %s\n' % os.path.exists(otf_path)
+                    # saved fonts are generated from file in worker processes, if possible
+                    if can_use_pool() and not font_has_changes(font):
+                        _ufo_paths.append(font.path)
+                    # open fonts are generated here, with font.generate()
+                    else:
+                        print_generate_result(generate_open_font(font, self._otfs_folder, _generate_options, incremental=_skip_unchanged))
                 # skip unsaved open fonts
                 else:
                     print '\tskipping "%s", please save this font to file first.\n' % os.path.split(get_full_name(font))[1]
+            if len(_ufo_paths):
+                generate_fonts(_ufo_paths, self._otfs_folder,
+                            incremental=_skip_unchanged,
+                            callback=print_generate_result,
+                            verbose=False,
+                            **_generate_options)
             # done all
             self.w.bar.stop()
             print '...done.\n'
@@ -1,12 +1,10 @@
 # [h] apply actions to all fonts in folder
 
-from mojo.roboFont import RFont
 from vanilla import *
 from vanilla.dialogs import getFolder
 from hTools2 import hDialog
-from hTools2.modules.fileutils import walk
-from hTools2.modules.fontutils import get_full_name, decompose, auto_contour_order, auto_contour_direction, add_extremes
-from hTools2.modules.opentype import clear_features
+from hTools2.modules.fileutils import iwalk
+from hTools2.modules.batch import batch_fonts, can_use_pool
 from hTools2.modules.messages import no_font_in_folder
 
 # objects
@@ -28,16 +26,22 @@ class actionsFolderDialog(hDialog):
     overlaps = True
     extremes = False
     remove_features = False
+    mark = False
     save = False
     close = False
+    max_memory = None
     ufos_folder = None
+    column_1 = 60
 
     # methods
 
     def __init__(self):
         self.title = 'actions'
         self.width = 123
-        self.height = (self.text_height * 8) + (self.button_height * 2) + (self.padding_y * 5) + self.progress_bar
+        self.height = (self.text_height * 9) + (self.button_height * 2) + (self.padding_y * 5) + self.progress_bar
+        # the memory ceiling is only used by worker processes
+        if can_use_pool():
+            self.height += self.text_input + self.padding_y
         self.w = HUDFloatingWindow((self.width, self.height), self.title)
         # ufos folder
         x = self.padding_x
@@ -115,6 +119,15 @@ class actionsFolderDialog(hDialog):
                     value=self.remove_features,
                     sizeStyle=self.size_style)
         y += self.text_height
+        self.w.mark_checkBox = CheckBox(
+                    (x, y,
+                    -self.padding_x,
+                    self.text_height),
+                    "mark composed",
+                    callback=self.mark_callback,
+                    value=self.mark,
+                    sizeStyle=self.size_style)
+        y += self.text_height
         self.w.save_checkBox = CheckBox(
                     (x, y,
                     -self.padding_x,
@@ -123,8 +136,25 @@ class actionsFolderDialog(hDialog):
                     callback=self.save_callback,
                     value=self.save,
                     sizeStyle=self.size_style)
+        # memory ceiling
+        y += self.text_height + self.padding_y
+        if can_use_pool():
+            y -= 2
+            self.w.memory_label = TextBox(
+                        (x, y,
+                        self.column_1,
+                        self.text_input),
+                        "max MB",
+                        sizeStyle=self.size_style)
+            self.w.memory_value = EditText(
+                        (x + self.column_1, y,
+                        -self.padding_x,
+                        self.text_input),
+                        placeholder='auto',
+                        callback=self.memory_callback,
+                        sizeStyle=self.size_style)
+            y += self.text_input + self.padding_y
         # progress bar
-        y += (self.text_height + self.padding_y) - 2
         self.w.bar = ProgressBar(
                     (x, y,
                     -self.padding_x,
@@ -182,43 +212,51 @@ class actionsFolderDialog(hDialog):
     def mark_callback(self, sender):
         self.mark = sender.get()
 
+    def memory_callback(self, sender):
+        # memory ceiling in MB, empty for all the available memory
+        try:
+            self.max_memory = int(float(sender.get()) * 1024 * 1024)
+        except ValueError:
+            self.max_memory = None
+
     # apply callback
 
+    def get_actions(self):
+        actions = []
+        if self.round_points:
+            actions.append('round')
+        if self.decompose:
+            actions.append('decompose')
+        if self.overlaps:
+            actions.append('overlaps')
+        if self.order:
+            actions.append('order')
+        if self.direction:
+            actions.append('direction')
+        if self.extremes:
+            actions.append('extremes')
+        if self.remove_features:
+            actions.append('remove_features')
+        if self.mark:
+            actions.append('mark')
+        if self.save:
+            actions.append('save')
+        return actions
+
     def apply_callback(self, sender):
-        ufo_paths = walk(self.ufos_folder, 'ufo')
-        if len(ufo_paths) > 0:
-            print 'transforming all fonts in folder...\n'
-            self.w.bar.start()
-            for ufo_path in ufo_paths:
-                font = RFont(ufo_path, showInterface=False)
-                print '\ttransforming %s...' % get_full_name(font)
-                if self.round_points:
-                    print '\t\trounding points...'
-                    font.round()
-                if self.decompose:
-                    print '\t\tdecomposing...'
-                    decompose(font)
-                if self.overlaps:
-                    print '\t\tremoving overlaps...'
-                    font.removeOverlap()
-                if self.order:
-                    print '\t\tauto contour order...'
-                    auto_contour_order(font)
-                if self.direction:
-                    print '\t\tauto contour direction...'
-                    auto_contour_direction(font)
-                if self.extremes:
-                    print '\t\tadding extreme points...'
-                    add_extremes(font)
-                if self.remove_features:
-                    print '\t\tremoving all OpenType features...'
-                    clear_features(font)
-                if self.save:
-                    print '\t\tsaving font...'
-                    font.save()
-                print '\t...done.\n'
-            self.w.bar.stop()
-            print '...done.\n'
+        print 'transforming all fonts in folder...\n'
+        print '\tactions: %s' % ', '.join(self.get_actions())
+        if self.max_memory is not None:
+            print '\tmax memory: %s MB' % (self.max_memory // (1024 * 1024))
+        print
+        self.w.bar.start()
+        # one font at a time in the current process inside RoboFont,
+        # otherwise one font per process, as many processes as fit in memory
+        ufo_paths = iwalk(self.ufos_folder, 'ufo')
+        summary = batch_fonts(ufo_paths, self.get_actions(), max_memory=self.max_memory)
+        self.w.bar.stop()
         # no font in folder
-        else:
+        if len(summary['fonts']) == 0:
             print no_font_in_folder
+        else:
+            print '\n...done.\n'
@@ -1,11 +1,10 @@
 # [h] ufos -> otfs
 
-import os
-from mojo.roboFont import RFont
 from vanilla import *
 from vanilla.dialogs import getFolder
 from hTools2 import hDialog
 from hTools2.modules.fileutils import walk
+from hTools2.modules.batch import generate_fonts, print_generate_result
 from hTools2.modules.messages import no_font_in_folder
 
 # objects
@@ -31,7 +30,7 @@ class UFOsToOTFsDialog(hDialog):
     def __init__(self):
         # window
         self.title = "ufo2otf"
-        self.height = (self.button_height * 3) + (self.padding_y * 6) + (self.text_height * 4) + self.progress_bar
+        self.height = (self.button_height * 3) + (self.padding_y * 6) + (self.text_height * 5) + self.progress_bar
         self.w = HUDFloatingWindow((self.width, self.height), self.title)
         x = self.padding_x
         y = self.padding_y
@@ -85,6 +84,14 @@ class UFOsToOTFsDialog(hDialog):
                     "release mode",
                     sizeStyle=self.size_style,
                     value=True)
+        y += self.text_height
+        self.w._skip_unchanged = CheckBox(
+                    (x, y,
+                    -self.padding_x,
+                    self.text_height),
+                    "skip unchanged",
+                    sizeStyle=self.size_style,
+                    value=True)
         y += (self.text_height + self.padding_y)
         # progress bar
         self.w.bar = ProgressBar(
@@ -127,6 +134,7 @@ class UFOsToOTFsDialog(hDialog):
                 _overlaps = self.w._overlaps.get()
                 _autohint = self.w._autohint.get()
                 _release_mode = self.w._release_mode.get()
+                _skip_unchanged = self.w._skip_unchanged.get()
                 # print settings
                 boolstring = ("False", "True")
                 print 'batch generating .otfs for all fonts in folder...\n'
@@ -136,24 +144,18 @@ class UFOsToOTFsDialog(hDialog):
                 print '\tremove overlaps: %s' % boolstring[_overlaps]
                 print '\tautohint: %s' % boolstring[_autohint]
                 print '\trelease mode: %s' % boolstring[_release_mode]
+                print '\tskip unchanged: %s' % boolstring[_skip_unchanged]
                 print
-                # batch generate
+                # batch generate (in the current process inside RoboFont)
                 self.w.bar.start()
-                for ufo_path in _ufo_paths:
-                    print '\tgenerating .otf for %s...' % os.path.split(ufo_path)[1]
-                    ufo = RFont(ufo_path, showInterface=False)
-                    # generate otf
-                    otf_file = os.path.splitext(os.path.split(ufo_path)[1])[0] + '.otf'
-                    otf_path = os.path.join(self.otfs_folder, otf_file)
-                    ufo.generate(otf_path, 'otf',
-                                decompose=_decompose,
-                                autohint=_autohint,
-                                checkOutlines=_overlaps,
-                                releaseMode=_release_mode)
-                    # close
-                    ufo.close()
-                    print '\t\totf path: %s' % otf_path
-                    print '\t\tgeneration sucessful? %s\n' % os.path.exists(otf_path)
+                generate_fonts(_ufo_paths, self.otfs_folder,
+                            decompose=_decompose,
+                            autohint=_autohint,
+                            checkOutlines=_overlaps,
+                            releaseMode=_release_mode,
+                            incremental=_skip_unchanged,
+                            callback=print_generate_result,
+                            verbose=False)
                 # done
                 self.w.bar.stop()
                 print '...done.\n'
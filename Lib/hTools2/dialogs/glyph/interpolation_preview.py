@@ -9,6 +9,7 @@ from mojo.events import addObserver, removeObserver
 from mojo.drawingTools import *
 from hTools2 import hDialog
 from hTools2.modules.fontutils import get_full_name
+from hTools2.modules.interpol import glyphs_compatible
 from hTools2.extras.grapefruit import Color
 
 # object
@@ -151,7 +152,7 @@ class interpolationPreviewDialog(hDialog, BaseWindowController):
             if f2.has_key(g1.name):
                 g2 = f2[g1.name]
                 # check if glyph in f2 is compatible
-                if g1.isCompatible(g2):
+                if glyphs_compatible(g1, g2):
                     # create colors
                     c1 = Color.NewFromRgb(*_mark_color)
                     c2 = Color.NewFromRgb(*_mark_color_2)
@@ -7,6 +7,7 @@ from mojo.events import addObserver, removeObserver
 from hTools2 import hDialog
 from hTools2.dialogs.misc import Spinner
 from hTools2.modules.fontutils import get_full_name, get_glyphs
+from hTools2.modules.interpol import InterpolationCache
 from hTools2.modules.messages import no_glyph_selected, no_font_open
 
 class interpolateGlyphsDialog(hDialog):
@@ -159,6 +160,7 @@ class interpolateGlyphsDialog(hDialog):
                 print '\t',
                 self.w.bar.start()
                 # interpolate glyphs
+                cache = InterpolationCache(f1, f2)
                 for glyph_name in glyph_names:
                     # check glyphs
                     if f2.has_key(glyph_name):
@@ -168,9 +170,10 @@ class interpolateGlyphsDialog(hDialog):
                         g1 = f1[glyph_name]
                         g2 = f2[glyph_name]
                         g3 = f3[glyph_name]
-                        # interpolate
+                        # interpolate (from cached deltas if compatible)
                         g3.prepareUndo('interpolate')
-                        g3.interpolate((x, y), g1, g2)
+                        if not cache.interpolate_glyph(g3, glyph_name, (x, y)):
+                            g3.interpolate((x, y), g1, g2)
                         g3.mark = 1.0, 0, 0, 0.5
                         g3.update()
                         g3.performUndo()
@@ -7,12 +7,12 @@ from mojo.roboFont import AllFonts
 from mojo.events import addObserver, removeObserver
 from vanilla import *
 from hTools2 import hDialog
-from hTools2.modules.interpol import check_compatibility
+from hTools2.modules.interpol import check_compatibility, check_family_compatibility
 from hTools2.modules.fontutils import get_full_name, get_glyphs
 
 class checkGlyphsCompatibilityDialog(hDialog):
 
-    '''A dialog to run a simple compatibility check between selected glyphs in two open fonts.
+    '''A dialog to run a simple compatibility check between selected glyphs in two open fonts, or between all open fonts.
 
     .. image:: imgs/glyphs/interpolate-check.png
 
@@ -29,7 +29,7 @@ class checkGlyphsCompatibilityDialog(hDialog):
     def __init__(self):
         self.get_fonts()
         self.title = 'interpol check'
-        self.height = self.text_height*4 + self.padding_y*3 + self.button_height
+        self.height = self.text_height*4 + self.padding_y*4 + self.button_height*2
         self.w = HUDFloatingWindow((self.width, self.height), self.title)
         # font 1
         x = self.padding_x
@@ -71,6 +71,15 @@ class checkGlyphsCompatibilityDialog(hDialog):
                     'apply',
                     callback=self.apply_callback,
                     sizeStyle=self.size_style)
+        y += self.button_height + self.padding_y
+        # check all fonts button
+        self.w.check_all_button = SquareButton(
+                    (x, y,
+                    -self.padding_x,
+                    self.button_height),
+                    'check all fonts',
+                    callback=self.check_all_callback,
+                    sizeStyle=self.size_style)
         # bind
         self.w.bind("became key", self.update_callback)
         self.w.bind("close", self.on_close_window)
@@ -114,6 +123,15 @@ class checkGlyphsCompatibilityDialog(hDialog):
         # run!
         check_compatibility(f1, f2, names=glyph_names, report=False)
 
+    def check_all_callback(self, sender):
+        # get glyphs
+        f1 = self.all_fonts[self.w.f1_font.get()]
+        glyph_names = get_glyphs(f1)
+        if not len(glyph_names):
+            glyph_names = None
+        # run!
+        check_family_compatibility(self.all_fonts, glyph_names=glyph_names)
+
     def on_close_window(self, sender):
         # remove observers on close window
         removeObserver(self, "fontDidOpen")
@@ -7,11 +7,12 @@
 # thanks to Andy Clymer for vanilla-dialogKit hack
 #---------------------------------------------------
 
-from mojo.roboFont import CurrentFont, AllFonts, RFont
+from mojo.roboFont import CurrentFont, AllFonts
 from dialogKit import *
 from vanilla import *
 from vanilla.dialogs import getFolder
 from hTools2.modules.fileutils import walk
+from hTools2.modules.backends import FontProxy
 
 # objects
 
@@ -34,6 +35,8 @@ class SelectFonts(object):
         >>> <Font Publica 55>
         >>> <Font Publica 95>
 
+    Fonts from a folder are listed using only their ``fontinfo.plist``, and are opened when they are first used. They stay open until the caller closes them with ``font.release()`` (without saving), for example at the end of each loop iteration to keep only one folder font in memory.
+
     '''
 
     # attributes
@@ -160,9 +163,10 @@ class SelectFonts(object):
         '''add all folder fonts to list'''
         # add folder fonts
         if len(self._folder_fonts) > 0:
+            font_paths = [f.path for f in self._fonts]
             for font in self._folder_fonts:
-                # add font
-                if font not in self._fonts:
+                # add font (unless the same file is already in the list as an open font)
+                if font.path not in font_paths:
                     self._fonts.append(font)
                     if self._verbose:
                         print 'font %s added to list' % font
@@ -181,9 +185,9 @@ class SelectFonts(object):
         '''collect all .ufo fonts in the selected folder'''
         # get font paths
         self._folder_font_paths = walk(self._folder, 'ufo')
-        # open fonts
+        # font proxies (font files are opened only when used)
         for font_path in self._folder_font_paths:
-            font = RFont(font_path, showInterface=False)
+            font = FontProxy(font_path)
             if font not in self._folder_fonts:
                 self._folder_fonts.append(font)
 
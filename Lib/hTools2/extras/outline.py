@@ -6,12 +6,15 @@
 # from vanilla import *
 # from AppKit import *
 
-from fontTools.pens.cocoaPen import CocoaPen
-from lib.tools.bezierTools import curveConverter
+# CocoaPen and RoboFont's curveConverter are not used here, and are not
+# imported so that the outliner also works outside RoboFont.
 from fontTools.pens.basePen import BasePen
-from robofab.pens.pointPen import AbstractPointPen
-from robofab.pens.reverseContourPointPen import ReverseContourPointPen
-from robofab.pens.adapterPens import PointToSegmentPen
+try:
+    from robofab.pens.pointPen import AbstractPointPen
+    from robofab.pens.reverseContourPointPen import ReverseContourPointPen
+    from robofab.pens.adapterPens import PointToSegmentPen
+except ImportError:
+    from fontTools.pens.pointPen import AbstractPointPen, ReverseContourPointPen, PointToSegmentPen
 from defcon import Glyph
 from math import sqrt, cos, sin, acos, asin, degrees, radians, tan, pi
 
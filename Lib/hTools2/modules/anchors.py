@@ -3,6 +3,7 @@
 '''Tools to create, move, delete and transfer anchors.'''
 
 from hTools2.modules.color import clear_colors, random_color
+from hTools2.modules.backends import set_mark_color
 
 # font-level tools
 
@@ -54,7 +55,7 @@ def find_lost_anchors(font):
             for a in g.anchors:
                 if a.y > f.info.unitsPerEm:
                     lost_anchors.append((g.name, a.name, (a.x, a.y) ))
-                    g.mark = c
+                    set_mark_color(g, c)
     return lost_anchors
 
 
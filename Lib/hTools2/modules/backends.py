@@ -0,0 +1,348 @@
+# [h] hTools2.modules.backends
+
+'''
+Font object backends, so that batch tools can run inside and outside of RoboFont.
+
+Inside RoboFont, fonts and tools come from ``mojo``. In other environments (``NoneLab``), fonts are handled by fontParts (with defcon), and external commands are run with ``subprocess``.
+
+'''
+
+import os
+import pipes
+import plistlib
+import subprocess
+from hTools2.modules.sysutils import get_context
+
+#: The name of the current backend: ``RoboFont``, ``fontParts``, or ``None`` if no font library is available.
+backend = None
+
+#: The RoboFont version string, or ``None`` outside RoboFont.
+version = None
+
+if get_context() == 'RoboFont':
+    from mojo.roboFont import OpenFont, NewFont, version
+    from mojo.compile import executeCommand
+    backend = 'RoboFont'
+
+else:
+    try:
+        from fontParts.world import OpenFont, NewFont
+        backend = 'fontParts'
+    except ImportError:
+        OpenFont = NewFont = None
+
+#-------
+# fonts
+#-------
+
+def open_font(ufo_path, showInterface=False):
+    '''Open the font at ``ufo_path`` with the current backend, without a font window by default.'''
+    if backend is None:
+        raise ImportError('no font backend available, install fontParts to run hTools2 outside RoboFont.')
+    return OpenFont(ufo_path, showInterface=showInterface)
+
+def new_font(showInterface=False):
+    '''Create a new empty font with the current backend, without a font window by default.'''
+    if backend is None:
+        raise ImportError('no font backend available, install fontParts to run hTools2 outside RoboFont.')
+    return NewFont(showInterface=showInterface)
+
+def save_font(font):
+    '''Save ``font`` to its file. Outside RoboFont all glyphs are written, because point changes made through fontParts do not always mark the glyphs as changed.'''
+    if backend != 'RoboFont':
+        for glyph in font:
+            glyph.naked().dirty = True
+    font.save()
+
+def can_generate():
+    '''Return ``True`` if fonts can be generated with the current backend: always inside RoboFont, and outside RoboFont only if ufo2ft is installed.'''
+    if backend == 'RoboFont':
+        return True
+    try:
+        import ufo2ft
+    except ImportError:
+        return False
+    return True
+
+def generate_font(font, otf_path, decompose=True, checkOutlines=True, autohint=False, releaseMode=False, glyphOrder=None):
+    '''
+    Generate an ``.otf`` font from ``font``.
+
+    Inside RoboFont the font is generated with ``font.generate``, and ``glyphOrder`` is passed to it if given. Outside RoboFont it is compiled with ufo2ft (which always decomposes components in CFF fonts and uses the glyph order of the font), and ``autohint`` and ``glyphOrder`` are ignored.
+
+    Returns ``True`` if the font file was written.
+
+    '''
+    if backend == 'RoboFont':
+        options = {}
+        if glyphOrder is not None:
+            options['glyphOrder'] = glyphOrder
+        font.generate(otf_path, 'otf',
+                    decompose=decompose,
+                    autohint=autohint,
+                    checkOutlines=checkOutlines,
+                    releaseMode=releaseMode,
+                    **options)
+    else:
+        from ufo2ft import compileOTF
+        otf = compileOTF(font.naked(),
+                    removeOverlaps=checkOutlines,
+                    optimizeCFF=releaseMode)
+        otf.save(otf_path)
+    return os.path.exists(otf_path)
+
+#-------------
+# font proxies
+#-------------
+
+class FontInfoProxy(object):
+
+    '''
+    The font info attributes of a ``.ufo`` font, read from its ``fontinfo.plist``. Missing attributes are ``None``.
+
+    Setting an attribute opens the font of ``font_proxy`` and sets the attribute in its real font info, so that the change is not lost. Without a ``font_proxy`` the font info is read-only.
+
+    '''
+
+    def __init__(self, ufo_path, font_proxy=None):
+        self.__dict__['_font_proxy'] = font_proxy
+        info_path = os.path.join(ufo_path, 'fontinfo.plist')
+        if os.path.exists(info_path):
+            self.__dict__.update(plistlib.readPlist(info_path))
+
+    def __getattr__(self, attr):
+        return None
+
+    def __setattr__(self, attr, value):
+        if self._font_proxy is None:
+            raise AttributeError('font info is read-only: %s' % attr)
+        setattr(self._font_proxy.font().info, attr, value)
+        self.__dict__[attr] = value
+
+class FontProxy(object):
+
+    '''
+    A lightweight stand-in for a ``.ufo`` font file.
+
+    Only ``fontinfo.plist`` and the glyphs' ``contents.plist`` are read to show the font's names and number of glyphs. The font itself is opened when any other attribute is used or a font info attribute is set, and can be closed again with ``release()``.
+
+    '''
+
+    def __init__(self, ufo_path):
+        self.path = ufo_path
+        self.info = FontInfoProxy(ufo_path, self)
+        self._font = None
+        self._glyph_count = None
+
+    def __repr__(self):
+        if self._font is not None:
+            return repr(self._font)
+        return '<FontProxy %s %s>' % (self.info.familyName, self.info.styleName)
+
+    def __eq__(self, other):
+        # proxies are never equal to open fonts, even with the same path
+        return isinstance(other, FontProxy) and other.path == self.path
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __len__(self):
+        if self._font is not None:
+            return len(self._font)
+        if self._glyph_count is None:
+            contents_path = os.path.join(self.path, 'glyphs', 'contents.plist')
+            if os.path.exists(contents_path):
+                self._glyph_count = len(plistlib.readPlist(contents_path))
+            else:
+                self._glyph_count = 0
+        return self._glyph_count
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.font(), attr)
+
+    def __getitem__(self, glyph_name):
+        return self.font()[glyph_name]
+
+    def __contains__(self, glyph_name):
+        return glyph_name in self.font()
+
+    def __iter__(self):
+        return iter(self.font())
+
+    def font(self):
+        '''Return the real font object, opening the font file if needed.'''
+        if self._font is None:
+            self._font = open_font(self.path)
+            self.info = self._font.info
+        return self._font
+
+    def loaded(self):
+        '''Return ``True`` if the real font object has been opened.'''
+        return self._font is not None
+
+    def release(self):
+        '''Close the real font object (without saving), so that its memory can be freed.'''
+        if self._font is not None:
+            self._font.close()
+            self._font = None
+            self.info = FontInfoProxy(self.path, self)
+
+#--------
+# glyphs
+#--------
+
+def get_naked_glyph(glyph):
+    '''Return the defcon glyph wrapped by ``glyph`` (in RoboFont or fontParts), or ``None`` if there is none. Drawing and reading outlines through the defcon glyph avoids creating a wrapper object for every contour and point.'''
+    try:
+        naked = glyph.naked()
+    except AttributeError:
+        return None
+    if not hasattr(naked, 'dispatcher'):
+        return None
+    return naked
+
+def set_mark_color(glyph, color):
+    '''Set the mark color of ``glyph``, using the attribute supported by the current backend.'''
+    # RF 1.8.X
+    if backend == 'RoboFont' and version[0] != '2':
+        glyph.mark = color
+    # RF 2.0, fontParts
+    else:
+        glyph.markColor = color
+
+def set_auto_unicodes(glyph):
+    '''Set the unicode values of ``glyph`` from its name. Outside RoboFont, unicodes are looked up in the Adobe Glyph List.'''
+    try:
+        glyph.autoUnicodes()
+    except NotImplementedError:
+        from fontTools.agl import AGL2UV
+        if glyph.name in AGL2UV:
+            glyph.unicodes = [AGL2UV[glyph.name]]
+        else:
+            glyph.unicodes = []
+
+def _contour_order_key(contour):
+    xMin, yMin, xMax, yMax = contour.bounds
+    return (len(contour), len(contour.segments), (xMin + xMax) * 0.5, (yMin + yMax) * 0.5, (xMax - xMin) * (yMax - yMin))
+
+def auto_contour_order(glyph):
+    '''
+    Sort the contours of ``glyph`` automatically.
+
+    Outside RoboFont (where fontParts does not implement ``autoContourOrder``), contours are sorted like in RoboFont: by number of points, number of segments, horizontal center, vertical center, and area of the bounding box.
+
+    '''
+    if backend == 'RoboFont':
+        glyph.autoContourOrder()
+        return
+    naked = get_naked_glyph(glyph)
+    contours = [contour for contour in naked if contour.bounds is not None]
+    contours.sort(key=_contour_order_key)
+    contours += [contour for contour in naked if contour.bounds is None]
+    if contours == list(naked):
+        return
+    naked.clearContours()
+    pen = naked.getPointPen()
+    for contour in contours:
+        contour.drawPoints(pen)
+
+class _ExtremePointsPen(object):
+
+    '''A filter pen which splits cubic curves at their horizontal and vertical extremes before drawing them into ``pen``.'''
+
+    def __init__(self, pen):
+        self.pen = pen
+        self.current = None
+        self.split = False
+
+    def moveTo(self, pt):
+        self.pen.moveTo(pt)
+        self.current = pt
+
+    def lineTo(self, pt):
+        self.pen.lineTo(pt)
+        self.current = pt
+
+    def curveTo(self, *points):
+        if len(points) != 3:
+            self.pen.curveTo(*points)
+            self.current = points[-1]
+            return
+        from fontTools.misc.bezierTools import solveQuadratic, splitCubicAtT
+        p0 = self.current
+        p1, p2, p3 = points
+        # roots of the derivative in x and y
+        t_values = set()
+        for i in range(2):
+            a = 3 * (-p0[i] + 3 * p1[i] - 3 * p2[i] + p3[i])
+            b = 6 * (p0[i] - 2 * p1[i] + p2[i])
+            c = 3 * (p1[i] - p0[i])
+            for t in solveQuadratic(a, b, c):
+                if 0.001 < t < 0.999:
+                    t_values.add(t)
+        if not t_values:
+            self.pen.curveTo(p1, p2, p3)
+        else:
+            self.split = True
+            for segment in splitCubicAtT(p0, p1, p2, p3, *sorted(t_values)):
+                self.pen.curveTo(*segment[1:])
+        self.current = p3
+
+    def qCurveTo(self, *points):
+        self.pen.qCurveTo(*points)
+        self.current = points[-1]
+
+    def closePath(self):
+        self.pen.closePath()
+
+    def endPath(self):
+        self.pen.endPath()
+
+    def addComponent(self, baseGlyphName, transformation):
+        pass
+
+def add_extremes(glyph):
+    '''
+    Add points at the extremes of the curves in ``glyph``, if they are missing.
+
+    Outside RoboFont (where ``extremePoints`` is not available), cubic curves are split at their extremes with fontTools; quadratic curves are left unchanged.
+
+    '''
+    if backend == 'RoboFont':
+        glyph.extremePoints()
+        return
+    from fontTools.pens.basePen import NullPen
+    naked = get_naked_glyph(glyph)
+    contours = list(naked)
+    # redraw only if some curve is split
+    check_pen = _ExtremePointsPen(NullPen())
+    for contour in contours:
+        contour.draw(check_pen)
+    if not check_pen.split:
+        return
+    naked.clearContours()
+    pen = _ExtremePointsPen(naked.getPen())
+    for contour in contours:
+        contour.draw(pen)
+
+#----------
+# commands
+#----------
+
+def execute_command(command, shell=False):
+    '''Run an external command (given as a list of arguments) with RoboFont's ``executeCommand``, or with ``subprocess`` outside RoboFont.'''
+    if backend == 'RoboFont':
+        return executeCommand(command, shell=shell)
+    if shell:
+        args = []
+        for arg in command:
+            if arg in ['<', '>', '|']:
+                args.append(arg)
+            else:
+                args.append(pipes.quote(arg))
+        command = ' '.join(args)
+    p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=shell)
+    stdout, stderr = p.communicate()
+    return stdout, stderr
@@ -0,0 +1,398 @@
+# [h] hTools2.modules.batch
+
+'''
+Apply sets of actions to all fonts in a folder, without a user interface.
+
+The same actions as in the folder dialogs are available. Fonts are processed in a pool of worker processes (or one after the other inside RoboFont, which cannot fork worker processes), and a summary with the result and timing of each font is returned as a dictionary which can be saved as JSON.
+
+'''
+
+import os
+import time
+import json
+import hashlib
+import traceback
+from itertools import chain, islice
+from multiprocessing import Pool, cpu_count
+from hTools2.modules.fileutils import iwalk, get_folder_size
+from hTools2.modules.fontutils import get_full_name, decompose, auto_contour_order, auto_contour_direction, add_extremes, remove_overlap, mark_composed_glyphs
+from hTools2.modules.opentype import clear_features
+from hTools2.modules.backends import backend, open_font, save_font, generate_font
+from hTools2.modules.sysutils import get_available_memory
+
+#: Estimated memory used by a worker process, in bytes, before loading a font.
+WORKER_MEMORY = 80 * 1024 * 1024
+
+#: Estimated ratio between the memory used to process a font and its ``.ufo`` size on disk.
+FONT_MEMORY_FACTOR = 10
+
+#: The name of the build cache file, saved in the folder of the generated fonts.
+BUILD_CACHE = '.hTools2-build-cache.json'
+
+#: The files in a ``.ufo`` which are used to build a binary font. All files in the default glyphs folder are used too.
+UFO_BUILD_FILES = ['fontinfo.plist', 'features.fea', 'kerning.plist', 'groups.plist', 'lib.plist']
+
+#---------
+# actions
+#---------
+
+#: All available actions, in the order in which they are applied to each font. Composed glyphs are marked before components are decomposed.
+ACTIONS = [
+    'round',
+    'mark',
+    'decompose',
+    'overlaps',
+    'order',
+    'direction',
+    'extremes',
+    'remove_features',
+    'save',
+    'generate',
+]
+
+def apply_actions(font, actions, otfs_folder=None, generate_options={}):
+    '''
+    Apply a list of actions to a font.
+
+    **actions** A list of action names (see ``ACTIONS``). Actions are always applied in the order of ``ACTIONS``.
+    **otfs_folder** The folder for the generated ``.otf`` fonts. Use ``None`` to save them next to the ``.ufo``.
+    **generate_options** Keyword arguments for ``backends.generate_font``.
+
+    Returns the path of the generated ``.otf`` font, or ``None``.
+
+    '''
+    otf_path = None
+    for action in ACTIONS:
+        if action not in actions:
+            continue
+        if action == 'round':
+            font.round()
+        elif action == 'mark':
+            mark_composed_glyphs(font)
+        elif action == 'decompose':
+            decompose(font)
+        elif action == 'overlaps':
+            remove_overlap(font)
+        elif action == 'order':
+            auto_contour_order(font)
+        elif action == 'direction':
+            auto_contour_direction(font)
+        elif action == 'extremes':
+            add_extremes(font)
+        elif action == 'remove_features':
+            clear_features(font)
+        elif action == 'save':
+            save_font(font)
+        elif action == 'generate':
+            otf_path = get_otf_path(font.path, otfs_folder)
+            generate_font(font, otf_path, **generate_options)
+    return otf_path
+
+def get_otf_path(ufo_path, otfs_folder=None):
+    '''Return the path of the ``.otf`` font generated from ``ufo_path``. Use ``None`` as ``otfs_folder`` for the folder of the ``.ufo``.'''
+    ufo_folder, ufo_file = os.path.split(ufo_path)
+    if otfs_folder is None:
+        otfs_folder = ufo_folder
+    return os.path.join(otfs_folder, '%s.otf' % os.path.splitext(ufo_file)[0])
+
+def print_generate_result(result):
+    '''Print the result of generating one font, as returned by ``batch_fonts`` or ``generate_open_font``. Fonts are reported as generated only if the ``.otf`` file was written.'''
+    file_name = os.path.split(result['path'])[1]
+    if result['status'] == 'skipped':
+        print '\tskipping %s, no changes since last build.\n' % file_name
+    elif result['status'] == 'ok' and result['otf_path'] is not None and os.path.exists(result['otf_path']):
+        print '\tgenerated .otf for %s (%.2f s)' % (file_name, result['time'])
+        print '\t\totf path: %s\n' % result['otf_path']
+    else:
+        print '\t### could not generate .otf for %s (%.2f s)' % (file_name, result['time'])
+        if result['error'] is not None:
+            print result['error']
+        else:
+            print '\t\tno font file was written.\n'
+
+def _batch_font_job(job):
+    '''Apply actions to one font. Runs in a worker process, so errors are returned instead of raised.'''
+    ufo_path, actions, otfs_folder, generate_options = job
+    result = {
+        'path' : ufo_path,
+        'name' : None,
+        'status' : 'ok',
+        'error' : None,
+        'otf_path' : None,
+    }
+    start = time.time()
+    font = None
+    try:
+        font = open_font(ufo_path)
+        result['name'] = get_full_name(font)
+        result['otf_path'] = apply_actions(font, actions, otfs_folder, generate_options)
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    finally:
+        if font is not None:
+            font.close()
+    result['time'] = time.time() - start
+    return result
+
+def font_has_changes(font):
+    '''Return ``True`` if an open font has unsaved changes, or if this cannot be checked.'''
+    try:
+        return font.naked().dirty
+    except AttributeError:
+        return True
+
+def generate_open_font(font, otfs_folder=None, generate_options={}, incremental=False):
+    '''
+    Generate an ``.otf`` font from an open font in the current process, including its unsaved changes. Inside RoboFont this is the same as calling ``font.generate``.
+
+    **incremental** Skip the font if it has no unsaved changes and has not changed since its last successful build, with the same options.
+
+    Fonts without unsaved changes are recorded in the build cache. Fonts with unsaved changes do not match their ``.ufo`` file, so their entry in the build cache is removed (see ``invalidate_build_cache``), and the next incremental build generates them again.
+
+    Returns a result dictionary like the ones of ``batch_fonts``. Errors are returned instead of raised.
+
+    '''
+    result = {
+        'path' : font.path,
+        'name' : get_full_name(font),
+        'status' : 'ok',
+        'error' : None,
+        'otf_path' : get_otf_path(font.path, otfs_folder),
+    }
+    start = time.time()
+    otf_folder, otf_file = os.path.split(result['otf_path'])
+    fingerprint = None
+    if not font_has_changes(font):
+        fingerprint = get_ufo_fingerprint(font.path, generate_options)
+        if incremental and read_build_cache(otf_folder).get(otf_file) == fingerprint and os.path.exists(result['otf_path']):
+            result['status'] = 'skipped'
+            result['time'] = time.time() - start
+            return result
+    try:
+        if not generate_font(font, result['otf_path'], **generate_options):
+            result['status'] = 'error'
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    if fingerprint is not None and result['status'] == 'ok':
+        cache = read_build_cache(otf_folder)
+        cache[otf_file] = fingerprint
+        write_build_cache(otf_folder, cache)
+    else:
+        invalidate_build_cache(result['otf_path'])
+    result['time'] = time.time() - start
+    return result
+
+#-------------
+# build cache
+#-------------
+
+def get_ufo_fingerprint(ufo_path, options=None):
+    '''
+    Return a fingerprint of the contents of a ``.ufo`` font, for the files listed in ``UFO_BUILD_FILES`` and the files in the default glyphs folder.
+
+    **options** A dictionary of generation options, which are included in the fingerprint.
+
+    '''
+    file_paths = [os.path.join(ufo_path, file_name) for file_name in UFO_BUILD_FILES]
+    glyphs_folder = os.path.join(ufo_path, 'glyphs')
+    if os.path.isdir(glyphs_folder):
+        for file_name in sorted(os.listdir(glyphs_folder)):
+            file_paths.append(os.path.join(glyphs_folder, file_name))
+    fingerprint = hashlib.sha1()
+    fingerprint.update(json.dumps(options, sort_keys=True))
+    for file_path in file_paths:
+        if os.path.isfile(file_path):
+            fingerprint.update(os.path.relpath(file_path, ufo_path))
+            fingerprint.update('\0')
+            with open(file_path, 'rb') as f:
+                fingerprint.update(hashlib.sha1(f.read()).digest())
+    return fingerprint.hexdigest()
+
+def read_build_cache(otfs_folder):
+    '''Read the build cache in a folder of generated fonts. Returns a dictionary of ``.otf`` file names and fingerprints.'''
+    cache_path = os.path.join(otfs_folder, BUILD_CACHE)
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except ValueError:
+            pass
+    return {}
+
+def write_build_cache(otfs_folder, cache):
+    '''Save the build cache in a folder of generated fonts.'''
+    cache_path = os.path.join(otfs_folder, BUILD_CACHE)
+    with open(cache_path, 'w') as cache_file:
+        json.dump(cache, cache_file, indent=2, sort_keys=True)
+
+def invalidate_build_cache(otf_path):
+    '''Remove the build cache entry of a generated font, for fonts which were not generated from their ``.ufo`` file.'''
+    otf_folder, otf_file = os.path.split(otf_path)
+    cache = read_build_cache(otf_folder)
+    if otf_file in cache:
+        del cache[otf_file]
+        write_build_cache(otf_folder, cache)
+
+#-------------
+# batch tools
+#-------------
+
+def can_use_pool():
+    '''Return ``True`` if fonts can be processed in worker processes. Inside RoboFont worker processes cannot be forked from the application, so fonts are processed one after the other in the current process.'''
+    return backend != 'RoboFont'
+
+def get_workers(ufo_paths, max_memory=None):
+    '''
+    Return the number of worker processes to use for a list of fonts.
+
+    One process per CPU is used, but never more than the number of fonts, and never more than fit in memory: each process is estimated to need ``WORKER_MEMORY`` plus ``FONT_MEMORY_FACTOR`` times the size of the largest ``.ufo``. The result is always ``1`` if no worker processes can be used (see ``can_use_pool``).
+
+    **max_memory** The memory available to the workers, in bytes. Use ``None`` for all the available memory.
+
+    '''
+    if not can_use_pool():
+        return 1
+    workers = min(cpu_count(), len(ufo_paths))
+    if max_memory is None:
+        max_memory = get_available_memory()
+    if max_memory is not None and len(ufo_paths):
+        font_memory = max([get_folder_size(ufo_path) for ufo_path in ufo_paths]) * FONT_MEMORY_FACTOR
+        workers = min(workers, max_memory // (WORKER_MEMORY + font_memory))
+    return max(1, workers)
+
+def batch_fonts(ufo_paths, actions, workers=None, otfs_folder=None, generate_options={}, max_memory=None, callback=None, verbose=True):
+    '''
+    Apply a list of actions to several fonts, using a pool of worker processes.
+
+    **ufo_paths** A list (or iterator) of paths of ``.ufo`` fonts.
+    **actions** A list of action names (see ``ACTIONS``).
+    **workers** The number of worker processes. Use ``None`` to choose it from the number of CPUs and the available memory (see ``get_workers``), or ``1`` to process all fonts in the current process. Inside RoboFont fonts are always processed in the current process.
+    **max_memory** The memory available to the workers, in bytes, if ``workers`` is ``None``.
+    **callback** A function which is called with the result of each font as soon as it is done.
+
+    Fonts are streamed: each one is opened, processed, saved and closed by a worker before it takes the next one, and each worker process is replaced after every font, so no more than ``workers`` fonts are in memory at any time. The paths are consumed lazily; if ``workers`` is ``None``, the memory needed per font is estimated from the first ``cpu_count()`` fonts.
+
+    Results are printed as each font is done. Returns a summary dictionary with the options, the total time and a list with the result of each font, in the order of ``ufo_paths``.
+
+    '''
+    unknown = [action for action in actions if action not in ACTIONS]
+    if len(unknown):
+        raise ValueError('unknown actions: %s' % ', '.join(unknown))
+    start = time.time()
+    ufo_paths = iter(ufo_paths)
+    if workers is None or not can_use_pool():
+        first_paths = list(islice(ufo_paths, cpu_count()))
+        workers = get_workers(first_paths, max_memory)
+        ufo_paths = chain(first_paths, ufo_paths)
+    order = {}
+    def get_jobs():
+        for ufo_path in ufo_paths:
+            order[ufo_path] = len(order)
+            yield (ufo_path, actions, otfs_folder, generate_options)
+    jobs = get_jobs()
+    pool = None
+    if workers == 1:
+        results_iter = (_batch_font_job(job) for job in jobs)
+    else:
+        pool = Pool(workers, maxtasksperchild=1)
+        results_iter = pool.imap_unordered(_batch_font_job, jobs)
+    results = []
+    try:
+        for result in results_iter:
+            if verbose:
+                print '\t%s (%.2f s): %s' % (os.path.split(result['path'])[1], result['time'], result['status'])
+                if result['error'] is not None:
+                    print result['error']
+            if callback is not None:
+                callback(result)
+            results.append(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    # keep results in the order of the input paths
+    results.sort(key=lambda result: order[result['path']])
+    summary = {
+        'actions' : [action for action in ACTIONS if action in actions],
+        'workers' : workers,
+        'fonts' : results,
+        'errors' : len([result for result in results if result['status'] == 'error']),
+        'time' : time.time() - start,
+    }
+    return summary
+
+def batch_folder(ufos_folder, actions, workers=None, otfs_folder=None, generate_options={}, max_memory=None, callback=None, verbose=True):
+    '''Apply a list of actions to all ``.ufo`` fonts in a folder. See ``batch_fonts``.'''
+    ufo_paths = iwalk(ufos_folder, 'ufo')
+    if verbose:
+        print 'applying actions to fonts in %s...\n' % ufos_folder
+    summary = batch_fonts(ufo_paths, actions, workers, otfs_folder, generate_options, max_memory, callback, verbose)
+    summary['folder'] = ufos_folder
+    if verbose:
+        print '\n...done (%.2f s).\n' % summary['time']
+    return summary
+
+def generate_fonts(ufo_paths, otfs_folder=None, decompose=True, checkOutlines=True, autohint=False, releaseMode=False, glyphOrder=None, incremental=False, workers=None, max_memory=None, callback=None, verbose=True):
+    '''
+    Generate ``.otf`` fonts for several ``.ufo`` fonts in parallel.
+
+    **otfs_folder** The folder for the generated fonts. Use ``None`` to save them next to the ``.ufos``.
+    **decompose**, **checkOutlines**, **autohint**, **releaseMode**, **glyphOrder** Generation options (see ``backends.generate_font``).
+    **incremental** Skip fonts which have not changed since their last successful build, with the same options.
+
+    The number of processes is limited by the available memory (see ``get_workers``). The result of each font is passed to ``callback`` as soon as it is done. Returns the summary dictionary of ``batch_fonts``, in which skipped fonts have the status ``skipped``.
+
+    '''
+    generate_options = {
+        'decompose' : decompose,
+        'checkOutlines' : checkOutlines,
+        'autohint' : autohint,
+        'releaseMode' : releaseMode,
+    }
+    if glyphOrder is not None:
+        generate_options['glyphOrder'] = glyphOrder
+    if not incremental:
+        return batch_fonts(ufo_paths, ['generate'], workers, otfs_folder, generate_options, max_memory, callback, verbose)
+
+    # compare fingerprints with the build caches
+    caches = {}
+    fingerprints = {}
+    skipped = []
+    build_paths = []
+    for ufo_path in ufo_paths:
+        otf_folder, otf_file = os.path.split(get_otf_path(ufo_path, otfs_folder))
+        if otf_folder not in caches:
+            caches[otf_folder] = read_build_cache(otf_folder)
+        fingerprints[ufo_path] = get_ufo_fingerprint(ufo_path, generate_options)
+        if caches[otf_folder].get(otf_file) == fingerprints[ufo_path] and os.path.exists(os.path.join(otf_folder, otf_file)):
+            result = {
+                'path' : ufo_path,
+                'name' : None,
+                'status' : 'skipped',
+                'error' : None,
+                'otf_path' : os.path.join(otf_folder, otf_file),
+                'time' : 0,
+            }
+            if verbose:
+                print '\t%s: skipped (unchanged)' % os.path.split(ufo_path)[1]
+            if callback is not None:
+                callback(result)
+            skipped.append(result)
+        else:
+            build_paths.append(ufo_path)
+
+    # build changed fonts
+    summary = batch_fonts(build_paths, ['generate'], workers, otfs_folder, generate_options, max_memory, callback, verbose)
+
+    # update the build caches
+    for result in summary['fonts']:
+        if result['status'] == 'ok' and os.path.exists(result['otf_path']):
+            otf_folder, otf_file = os.path.split(result['otf_path'])
+            caches[otf_folder][otf_file] = fingerprints[result['path']]
+    for otf_folder, cache in caches.items():
+        write_build_cache(otf_folder, cache)
+
+    summary['fonts'] = sorted(summary['fonts'] + skipped, key=lambda result: ufo_paths.index(result['path']))
+    return summary
@@ -3,7 +3,8 @@
 '''Simple tools for working with colors.'''
 
 import random
-from hTools2.modules.sysutils import _ctx
+from hTools2.modules.sysutils import _ctx, BatchChanges, glyph_changed
+from hTools2.modules.backends import set_mark_color
 from hTools2.extras.colorsys import *
 
 #-----------
@@ -18,22 +19,14 @@ def random_color(alpha=1.0):
 
 def clear_colors(font):
     '''Clear the color from all glyph cells in the font.'''
-    for glyph_name in font.keys():
-        clear_color(font[glyph_name])
-    # font.update()
-    font.changed()
+    with BatchChanges(font):
+        for glyph_name in font.keys():
+            clear_color(font[glyph_name])
 
 def clear_color(glyph):
     '''Clear the color of a glyph cell.'''
-    from mojo.roboFont import version
-    # RF 2.0
-    if version[0] == '2':
-        glyph.markColor = None
-        glyph.changed()
-    # RF 1.8.X
-    else:
-        glyph.mark = None
-        glyph.update()
+    set_mark_color(glyph, None)
+    glyph_changed(glyph)
 
 def convert_to_1(R, G, B, A=None):
     r = R / 255.0
@@ -3,12 +3,10 @@
 '''Tools to work with encoding files, character sets etc.'''
 
 import os
-try:
-    from mojo.roboFont import RFont
-except:
-    from fontParts.nonelab import RFont
 from hTools2.modules.unicode import *
 from hTools2.modules.color import clear_colors, hls_to_rgb
+from hTools2.modules.sysutils import BatchChanges, glyph_changed
+from hTools2.modules.backends import open_font, set_mark_color
 
 def import_encoding(file_path):
     '''
@@ -32,7 +30,7 @@ def extract_encoding(ufo_path, enc_path=None):
     Extract encoding data from an ufo's glyphOrder attribute.
 
     '''
-    ufo = RFont(ufo_path)
+    ufo = open_font(ufo_path)
     enc = ''
     for glyph_name in ufo.glyphOrder:
         enc += '%s\n' % glyph_name
@@ -109,29 +107,29 @@ def paint_groups(font, crop=False, order=None):
 
     '''
     if len(font.groups) > 0:
-        clear_colors(font)
-        count = 0
-        _order = []
-        if order is not None:
-            groups = order
-        elif font.lib.has_key('groups_order'):
-            groups = font.lib['groups_order']
-        else:
-            groups = font.groups.keys()
-        for group in groups:
-            color_step = 1.0 / len(font.groups)
-            color = color_step * count
-            R, G, B = hls_to_rgb(color, 0.5, 1.0)
-            for glyph_name in font.groups[group]:
-                if font.has_key(glyph_name) is not True:
-                    font.newGlyph(glyph_name)
-                _order.append(glyph_name)
-                font[glyph_name].mark = (R, G, B, 0.3)
-                font[glyph_name].update()
-            count += 1
-        # print _order
-        font.glyphOrder = _order
-        font.update()
+        with BatchChanges(font):
+            clear_colors(font)
+            count = 0
+            _order = []
+            if order is not None:
+                groups = order
+            elif font.lib.has_key('groups_order'):
+                groups = font.lib['groups_order']
+            else:
+                groups = font.groups.keys()
+            for group in groups:
+                color_step = 1.0 / len(font.groups)
+                color = color_step * count
+                R, G, B = hls_to_rgb(color, 0.5, 1.0)
+                for glyph_name in font.groups[group]:
+                    if font.has_key(glyph_name) is not True:
+                        font.newGlyph(glyph_name)
+                    _order.append(glyph_name)
+                    set_mark_color(font[glyph_name], (R, G, B, 0.3))
+                    glyph_changed(font[glyph_name])
+                count += 1
+            # print _order
+            font.glyphOrder = _order
         if crop:
             crop_glyphset(font, _order)
     else:
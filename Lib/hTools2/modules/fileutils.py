@@ -32,6 +32,12 @@ def walk(folder, extension):
         folder = folder[:-1]
     return glob.glob("%s/*.%s" % (folder, extension))
 
+def iwalk(folder, extension):
+    '''Like ``walk``, but returns an iterator which yields the file paths one by one.'''
+    if folder.endswith("/"):
+        folder = folder[:-1]
+    return glob.iglob("%s/*.%s" % (folder, extension))
+
 def get_names_from_path(fontpath):
     '''Parse underscore(or hyphen)-separated font file names into ``family`` and ``style`` names.'''
     file_name = os.path.basename(fontpath)
@@ -124,3 +130,11 @@ def copy_files(source_path, dest_path, verbose=False):
                             print 'copying file from %s to %s.' % (old_loc, new_loc)
                         shutil.copy2(old_loc, new_loc)
 
+
+def get_folder_size(folder):
+    '''Return the total size in bytes of all files in a folder (for example an ``.ufo`` package).'''
+    size = 0
+    for root, dirs, files in os.walk(folder):
+        for f in files:
+            size += os.path.getsize(os.path.join(root, f))
+    return size
@@ -5,8 +5,11 @@
 import os
 from random import randint
 # from fontParts.nonelab import RFont
-from hTools2.modules.glyphutils import round_points, round_width
+from hTools2.modules.glyphutils import round_points, round_glyphs_points, round_width
 from hTools2.modules.color import *
+from hTools2.modules.sysutils import BatchChanges, glyph_changed
+from hTools2.modules.backends import set_mark_color
+from hTools2.modules import backends
 
 #--------
 # glyphs
@@ -66,26 +69,14 @@ def parse_glyphs_groups(names, groups):
 
 def mark_composed_glyphs(font, color='Orange', alpha=.35):
     '''Mark all composed glyphs in the font.'''
-    from mojo.roboFont import version
     R, G, B = x11_colors[color]
     mark_color = convert_to_1(R, G, B)
     mark_color += (alpha,)
-    for glyph in font:
-        if len(glyph.components) > 0:
-            # RF 2.0
-            if version[0] == '2':
-                glyph.markColor = mark_color
-                glyph.changed()
-            # RF 1.8.X
-            else:
-                glyph.mark = mark_color
-                glyph.update()
-    # RF 2.0
-    if version[0] == '2':
-        font.changed()
-    # RF 1.8.X
-    else:
-        font.update()
+    with BatchChanges(font):
+        for glyph in font:
+            if len(glyph.components) > 0:
+                set_mark_color(glyph, mark_color)
+                glyph_changed(glyph)
 
 #-----------------
 # renaming glyphs
@@ -104,14 +95,14 @@ def rename_glyph(font, old_name, new_name, overwrite=True, mark=True, verbose=Tr
                 font.removeGlyph(new_name)
                 g.name = new_name
                 if mark:
-                    g.mark = named_colors['orange']
+                    set_mark_color(g, named_colors['orange'])
                 g.changed()
             # option [2]: skip, do not overwrite
             else:
                 if verbose:
                     print '\tskipping "%s", "%s" already exists in font.' % (old_name, new_name)
                 if mark:
-                    g.mark = named_colors['red']
+                    set_mark_color(g, named_colors['red'])
                 g.changed()
         # if new name not already in font, simply rename glyph
         else:
@@ -119,7 +110,7 @@ def rename_glyph(font, old_name, new_name, overwrite=True, mark=True, verbose=Tr
                 print '\trenaming "%s" to "%s"...' % (old_name, new_name)
             g.name = new_name
             if mark:
-                g.mark = named_colors['green']
+                set_mark_color(g, named_colors['green'])
             g.changed()
         # done glyph
     else:
@@ -170,7 +161,7 @@ def rename_components(font, names_list, mark=True):
                     if component.baseGlyph == old_name:
                         component.baseGlyph = new_name
                         if mark:
-                            font[glyph_name].mark = 0, 1, 1, 0.4
+                            set_mark_color(font[glyph_name], (0, 1, 1, 0.4))
 
 def rename_features_file(fea_path, names_list):
     features_old = open(fea_path, 'r').readlines()
@@ -433,7 +424,7 @@ def decompose(font):
 def auto_contour_order(font):
     '''Automatically set contour order for all glyphs in the font.'''
     for glyph in font:
-        glyph.autoContourOrder()
+        backends.auto_contour_order(glyph)
 
 def auto_contour_direction(font):
     '''Automatically set contour directions for all glyphs in the font.'''
@@ -443,7 +434,7 @@ def auto_contour_direction(font):
 def auto_order_direction(font):
     '''Automatically set contour order and direction for all glyphs in the font, in one go.'''
     for glyph in font:
-        glyph.autoContourOrder()
+        backends.auto_contour_order(glyph)
         glyph.correctDirection()
 
 def auto_point_start(font):
@@ -454,7 +445,7 @@ def auto_point_start(font):
 def add_extremes(font):
     '''Add extreme points to all glyphs in the font, if they are missing.'''
     for glyph in font:
-        glyph.extremePoints()
+        backends.add_extremes(glyph)
 
 def remove_overlap(font):
     '''Remove overlaps in all glyphs of the font.'''
@@ -463,10 +454,10 @@ def remove_overlap(font):
 
 def align_to_grid(font, (sizeX, sizeY)):
     '''Align all points of all glyphs in the font to a ``(x,y)`` grid.'''
-    for glyph in font:
-        round_points(glyph, (sizeX, sizeY))
-        glyph.changed()
-    font.changed()
+    with BatchChanges(font):
+        round_glyphs_points(font, (sizeX, sizeY))
+        for glyph in font:
+            glyph_changed(glyph)
 
 def scale_glyphs(f, (factor_x, factor_y)):
     '''Scale all glyphs in the font by the given ``(x,y)`` factor.'''
@@ -489,8 +480,8 @@ def move_glyphs(f, (delta_x, delta_y)):
 def round_to_grid(font, gridsize, glyphs=None):
     if glyphs is None:
         glyphs = font.keys()
+    round_glyphs_points([font[glyph_name] for glyph_name in glyphs], (gridsize, gridsize))
     for glyph_name in glyphs:
-        round_points(font[glyph_name], (gridsize, gridsize))
         round_width(font[glyph_name], gridsize)
     font.changed()
 
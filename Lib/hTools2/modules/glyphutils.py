@@ -4,6 +4,13 @@
 
 from math import floor, ceil
 
+from hTools2.modules.backends import get_naked_glyph
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 #---------
 # margins
 #---------
@@ -62,39 +69,170 @@ def change_suffix(glyph, old_suffix, new_suffix=None):
 # round to grid
 #---------------
 
+def round_array(values, gridsize):
+    '''
+    Round a NumPy array of values to multiples of ``gridsize``.
+
+    Halfway cases are rounded away from zero, so the results are the same as with the builtin ``round``.
+
+    '''
+    values = values / float(gridsize)
+    values_floor = numpy.floor(values)
+    fraction = values - values_floor
+    up = (fraction > 0.5) | ((fraction == 0.5) & (values > 0))
+    return (values_floor + up) * gridsize
+
+def round_xy_array(xy, (sizeX, sizeY)):
+    '''Round an array of ``(x,y)`` coordinates to the gridsize ``(sizeX,sizeY)``. Returns the rounded array and the indexes of the rows which changed.'''
+    xy_round = numpy.empty_like(xy)
+    xy_round[:, 0] = round_array(xy[:, 0], sizeX)
+    xy_round[:, 1] = round_array(xy[:, 1], sizeY)
+    changed = numpy.nonzero((xy_round != xy).any(axis=1))[0]
+    return xy_round, changed
+
+def get_points(glyphs):
+    '''Collect all ``points`` in all contours of the given glyphs into a single list.'''
+    points = []
+    for glyph in glyphs:
+        for contour in glyph.contours:
+            points += contour.points
+    return points
+
+class ContoursRecorder(object):
+
+    '''A point pen which records the contours of a glyph: the coordinates of all points in one list, and the other point data of each contour. Components are ignored.'''
+
+    def __init__(self):
+        self.contours = []
+        self.coordinates = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.contours.append((identifier, []))
+
+    def endPath(self):
+        pass
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.contours[-1][1].append((segmentType, smooth, name, identifier))
+        self.coordinates.append(pt)
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        pass
+
+    def write(self, glyph, coordinates):
+        '''Replace the contours of ``glyph`` with the recorded contours, using new ``coordinates`` for their points.'''
+        glyph.clearContours()
+        pen = glyph.getPointPen()
+        coordinates = iter(coordinates)
+        for contour_identifier, points in self.contours:
+            if contour_identifier is not None:
+                pen.beginPath(identifier=contour_identifier)
+            else:
+                pen.beginPath()
+            for segmentType, smooth, name, identifier in points:
+                if identifier is not None:
+                    pen.addPoint(next(coordinates), segmentType, smooth, name, identifier=identifier)
+                else:
+                    pen.addPoint(next(coordinates), segmentType, smooth, name)
+            pen.endPath()
+
+def round_glyphs_points(glyphs, (sizeX, sizeY)):
+    '''
+    Round the position of all ``points`` in the given glyphs to the gridsize ``(sizeX,sizeY)``.
+
+    If NumPy is available, the contours of each glyph are read in one pass with a point pen (see ``ContoursRecorder``), the coordinates of all glyphs are rounded in a single array operation, and the contours of the glyphs in which any point moved are written back in one pass, without touching point objects one by one.
+
+    '''
+    # no numpy: round one point at a time
+    if numpy is None:
+        for glyph in glyphs:
+            for contour in glyph.contours:
+                for point in contour.points:
+                    _x = float(point.x)
+                    _y = float(point.y)
+                    _x_round = round(_x / sizeX) * sizeX
+                    _y_round = round(_y / sizeY) * sizeY
+                    point.x = _x_round
+                    point.y = _y_round
+        return
+    # numpy: read all contours, round all points at once
+    glyphs = list(glyphs)
+    recorders = []
+    coordinates = []
+    for i, glyph in enumerate(glyphs):
+        # draw the defcon glyph if possible, without wrapper objects
+        naked = get_naked_glyph(glyph)
+        if naked is not None:
+            glyphs[i] = glyph = naked
+        recorder = ContoursRecorder()
+        glyph.drawPoints(recorder)
+        recorders.append(recorder)
+        coordinates += recorder.coordinates
+    if len(coordinates) == 0:
+        return
+    xy = numpy.array(coordinates, dtype=float)
+    xy_round, changed = round_xy_array(xy, (sizeX, sizeY))
+    moved = numpy.zeros(len(xy), dtype=bool)
+    moved[changed] = True
+    # write back the contours of glyphs with moved points
+    start = 0
+    for glyph, recorder in zip(glyphs, recorders):
+        end = start + len(recorder.coordinates)
+        if moved[start:end].any():
+            recorder.write(glyph, xy_round[start:end].tolist())
+        start = end
+
 def round_points(glyph, (sizeX, sizeY)):
     '''Round the position of all ``points`` in ``glyph`` to the gridsize ``(sizeX,sizeY)``.'''
-    for contour in glyph.contours:
-        for point in contour.points:
-            _x = float(point.x)
-            _y = float(point.y)
-            _x_round = round(_x / sizeX) * sizeX
-            _y_round = round(_y / sizeY) * sizeY
-            point.x = _x_round
-            point.y = _y_round
+    round_glyphs_points([glyph], (sizeX, sizeY))
     # glyph.changed()
 
 def round_bpoints(glyph, (sizeX, sizeY)):
     '''Round the position of all ``bPoints`` in ``glyph`` to the gridsize ``(sizeX,sizeY)``.'''
+    # no numpy: round one point at a time
+    if numpy is None:
+        for contour in glyph.contours:
+            for b_point in contour.bPoints:
+                _x = float(b_point.anchor[0])
+                _y = float(b_point.anchor[1])
+                _x_round = round(_x / sizeX) * sizeX
+                _y_round = round(_y / sizeY) * sizeY
+                b_point.anchor = (_x_round, _y_round)
+        return
+    # numpy: round all bPoints at once
+    b_points = []
     for contour in glyph.contours:
-        for b_point in contour.bPoints:
-            _x = float(b_point.anchor[0])
-            _y = float(b_point.anchor[1])
-            _x_round = round(_x / sizeX) * sizeX
-            _y_round = round(_y / sizeY) * sizeY
-            b_point.anchor = (_x_round, _y_round)
+        b_points += contour.bPoints
+    if len(b_points) == 0:
+        return
+    xy = numpy.array([b_point.anchor for b_point in b_points], dtype=float)
+    xy_round, changed = round_xy_array(xy, (sizeX, sizeY))
+    for i, (x, y) in zip(changed.tolist(), xy_round[changed].tolist()):
+        b_points[i].anchor = (x, y)
     # glyph.changed()
 
 def round_anchors(glyph, (sizeX, sizeY)):
     '''Round the position of all ``anchors`` in ``glyph`` to the gridsize ``(sizeX,sizeY)``.'''
     if len(glyph.anchors) > 0:
-        for anchor in glyph.anchors:
-            _x_round = round(float(anchor.x) / sizeX)
-            _y_round = round(float(anchor.y) / sizeY)
-            x_new = int(_x_round * sizeX)
-            y_new = int(_y_round * sizeY)
-            x_delta = x_new - anchor.x
-            y_delta = y_new - anchor.y
+        # no numpy: round one anchor at a time
+        if numpy is None:
+            for anchor in glyph.anchors:
+                _x_round = round(float(anchor.x) / sizeX)
+                _y_round = round(float(anchor.y) / sizeY)
+                x_new = int(_x_round * sizeX)
+                y_new = int(_y_round * sizeY)
+                x_delta = x_new - anchor.x
+                y_delta = y_new - anchor.y
+                anchor.moveBy((x_delta, y_delta))
+            return
+        # numpy: round all anchors at once
+        anchors = glyph.anchors
+        xy = numpy.array([(anchor.x, anchor.y) for anchor in anchors], dtype=float)
+        xy_round, changed = round_xy_array(xy, (sizeX, sizeY))
+        for i, (x_new, y_new) in zip(changed.tolist(), xy_round[changed].tolist()):
+            anchor = anchors[i]
+            x_delta = int(x_new) - anchor.x
+            y_delta = int(y_new) - anchor.y
             anchor.moveBy((x_delta, y_delta))
         # glyph.changed()
 
@@ -0,0 +1,300 @@
+# [h] hTools2.modules.instances
+
+'''
+Generate instances from any number of masters in a multi-axis design space.
+
+Axes, masters and instances are described as in ``mutator.DesignSpaceMaker``: a list of axis names, and dictionaries with master or instance names (keys) and lists of axis values (values). Locations are normalized around the neutral master, and each instance is computed from cached master coordinate arrays with the location-support weights of fontTools' ``VariationModel``, without a mutatorMath run.
+
+'''
+
+import os
+import copy
+import time
+import traceback
+from multiprocessing import Pool
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from fontTools.varLib.models import VariationModel, normalizeValue
+from hTools2.modules.backends import open_font, new_font
+from hTools2.modules.interpol import get_glyph_structure, get_signature, get_glyph_data, write_interpolated_glyphs
+
+#: Font info attributes copied from the neutral master to generated instances.
+INSTANCE_INFO = ['familyName', 'unitsPerEm', 'ascender', 'descender', 'xHeight', 'capHeight']
+
+#---------
+# engine
+#---------
+
+class InstanceEngine(object):
+
+    '''
+    An interpolation engine for N masters on any number of axes.
+
+    .. code-block:: python
+
+        axes = ['weight', 'width']
+        masters = { 'Light' : [0, 0], 'Bold' : [1000, 0], 'Condensed' : [0, 100] }
+        fonts = { name : OpenFont('%s.ufo' % name, showInterface=False) for name in masters }
+        engine = InstanceEngine(axes, masters, 'Light', fonts)
+        engine.make_instance(NewFont(), [500, 50])
+
+    For each compatible glyph, the master coordinates (see ``interpol.get_glyph_structure``) are read and turned into deltas once, and cached in the engine. Glyph edits do not always send notifications, so use ``invalidate`` or ``clear`` after editing the masters. The support weights of an instance location are computed once, and applied to the deltas of all glyphs in one array operation. Requires NumPy.
+
+    '''
+
+    def __init__(self, axes, masters, neutral, fonts):
+        if numpy is None:
+            raise ImportError('the instance engine requires NumPy.')
+        self.axes = axes
+        self.master_names = list(masters.keys())
+        self.neutral = neutral
+        self.fonts = fonts
+        # axis ranges, with the neutral master as default
+        self.axis_ranges = {}
+        for i, axis in enumerate(axes):
+            values = [masters[master][i] for master in self.master_names]
+            self.axis_ranges[axis] = min(values), masters[neutral][i], max(values)
+        locations = [self.normalize_location(masters[master]) for master in self.master_names]
+        self.model = VariationModel(locations, axisOrder=axes)
+        self.entries = {}
+
+    def normalize_location(self, location):
+        '''Convert a location, as a list of axis values or as a dictionary, to a dictionary of normalized values between ``-1`` and ``1``.'''
+        if not isinstance(location, dict):
+            location = dict(zip(self.axes, location))
+        normalized = {}
+        for axis in self.axes:
+            normalized[axis] = normalizeValue(location[axis], self.axis_ranges[axis])
+        return normalized
+
+    def get_scalars(self, location):
+        '''Return the support weights of all masters (in model order) for an instance location.'''
+        return self.model.getScalars(self.normalize_location(location))
+
+    def clear(self):
+        '''Remove all cached deltas.'''
+        self.entries = {}
+
+    def invalidate(self, glyph_names):
+        '''Remove the cached deltas of the given glyphs, so they are read again from the masters.'''
+        for glyph_name in glyph_names:
+            self.entries.pop(glyph_name, None)
+
+    def get_entry(self, glyph_name):
+        '''Return the structure in the neutral master and the deltas (in model order) of glyph ``glyph_name``, or ``None`` if it is missing in a master or the master glyphs are not compatible.'''
+        if glyph_name in self.entries:
+            return self.entries[glyph_name]
+        glyphs = []
+        for master in self.master_names:
+            font = self.fonts[master]
+            if not font.has_key(glyph_name):
+                return None
+            glyphs.append(font[glyph_name])
+        structures = [get_glyph_structure(glyph) for glyph in glyphs]
+        signatures = set([get_signature(structure) for structure, coords in structures])
+        if len(signatures) > 1:
+            entry = None
+        else:
+            master_values = [numpy.array(coords, dtype=float) for structure, coords in structures]
+            neutral_structure = structures[self.master_names.index(self.neutral)][0]
+            entry = neutral_structure, self.model.getDeltas(master_values)
+        self.entries[glyph_name] = entry
+        return entry
+
+    def get_arrays(self, glyph_names=None):
+        '''
+        Collect the deltas of several glyphs.
+
+        Returns a list of compatible glyph names, a list with their structures in the neutral master, a list with the number of coordinates in each glyph, and a list with one ``(n, 2)`` array of deltas for each master, in model order.
+
+        '''
+        if glyph_names is None:
+            glyph_names = self.fonts[self.neutral].keys()
+        names, structures, sizes = [], [], []
+        deltas = [[] for master in self.master_names]
+        for glyph_name in glyph_names:
+            entry = self.get_entry(glyph_name)
+            if entry is None:
+                continue
+            names.append(glyph_name)
+            structures.append(entry[0])
+            sizes.append(len(entry[1][0]))
+            for i, master_deltas in enumerate(entry[1]):
+                deltas[i].append(master_deltas)
+        if len(names):
+            deltas = [numpy.concatenate(master_deltas) for master_deltas in deltas]
+        else:
+            deltas = [numpy.zeros((0, 2)) for master_deltas in deltas]
+        return names, structures, sizes, deltas
+
+    def make_instance(self, font, location, glyph_names=None):
+        '''
+        Interpolate all compatible glyphs at ``location`` into ``font``, replacing existing glyphs. Glyph libs, unicodes and notes, groups, kerning and features are copied from the neutral master.
+
+        Returns a list with the names of the interpolated glyphs.
+
+        '''
+        names, structures, sizes, deltas = self.get_arrays(glyph_names)
+        coords = self.model.interpolateFromDeltasAndScalars(deltas, self.get_scalars(location))
+        neutral = self.get_neutral_data(names)
+        write_interpolated_glyphs(font, names, structures, sizes, coords, neutral['glyphs'])
+        set_neutral_data(font, neutral)
+        return names
+
+    def get_neutral_data(self, glyph_names):
+        '''Return a copy of the data which instances take from the neutral master: font info, glyph order, groups, kerning, features, and the libs, unicodes and notes of the given glyphs.'''
+        neutral = self.fonts[self.neutral]
+        data = {
+            'info' : dict([(attr, getattr(neutral.info, attr)) for attr in INSTANCE_INFO]),
+            'glyph_order' : list(neutral.glyphOrder),
+            'groups' : copy.deepcopy(dict(neutral.groups)),
+            'kerning' : dict(neutral.kerning),
+            'features' : neutral.features.text,
+            'glyphs' : {},
+        }
+        for glyph_name in glyph_names:
+            data['glyphs'][glyph_name] = get_glyph_data(neutral[glyph_name])
+        return data
+
+    def generate_instances(self, instances, instances_folder, glyph_names=None, workers=None, callback=None, verbose=True):
+        '''
+        Generate instances as ``.ufo`` files, in parallel.
+
+        **instances** A dictionary with instance names (keys) and locations (values).
+        **instances_folder** The folder for the instance fonts, which are named like in ``DesignSpaceMaker``.
+        **workers** The number of worker processes. Use ``None`` for one process per CPU, or ``1`` to generate all instances in the current process.
+
+        Deltas, support weights and the data taken from the neutral master are computed here, from the fonts in memory (including unsaved changes), and sent once to each worker, which only builds and writes its instances. The result of each instance is passed to ``callback`` as soon as it is done.
+
+        Returns a list of result dictionaries, with the path, status, error traceback and time of each instance.
+
+        '''
+        names, structures, sizes, deltas = self.get_arrays(glyph_names)
+        jobs = []
+        for instance, location in instances.items():
+            ufo_path = os.path.join(instances_folder, '%s.ufo' % instance.replace(' ', '-'))
+            jobs.append((instance, self.get_scalars(location), ufo_path))
+        if verbose:
+            print 'generating %s instances from %s masters...\n' % (len(jobs), len(self.master_names))
+        source = {
+            'model' : self.model,
+            'names' : names,
+            'structures' : structures,
+            'sizes' : sizes,
+            'deltas' : deltas,
+            'neutral' : self.get_neutral_data(names),
+        }
+        pool = None
+        if workers == 1:
+            _init_instance_worker(source)
+            results_iter = (_instance_job(job) for job in jobs)
+        else:
+            pool = Pool(workers, initializer=_init_instance_worker, initargs=(source,))
+            results_iter = pool.imap_unordered(_instance_job, jobs)
+        results = []
+        try:
+            for result in results_iter:
+                if callback is not None:
+                    callback(result)
+                if verbose:
+                    if result['status'] == 'ok':
+                        print '\t%s (%.2f s)' % (os.path.split(result['path'])[1], result['time'])
+                    else:
+                        print '\t### %s failed:\n%s' % (os.path.split(result['path'])[1], result['error'])
+                results.append(result)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        paths = [job[2] for job in jobs]
+        results.sort(key=lambda result: paths.index(result['path']))
+        if verbose:
+            print '\n...done.\n'
+        return results
+
+#--------------
+# worker jobs
+#--------------
+
+_instance_source = None
+
+def _init_instance_worker(source):
+    '''Keep the deltas and neutral master data in a worker process, so they are sent only once per process.'''
+    global _instance_source
+    _instance_source = source
+
+def _instance_job(job):
+    '''Generate one instance font. Runs in a worker process, so errors are returned instead of raised.'''
+    instance, scalars, ufo_path = job
+    source = _instance_source
+    neutral = source['neutral']
+    result = {
+        'path' : ufo_path,
+        'status' : 'ok',
+        'error' : None,
+    }
+    start = time.time()
+    try:
+        coords = source['model'].interpolateFromDeltasAndScalars(source['deltas'], scalars)
+        font = new_font()
+        for attr, value in neutral['info'].items():
+            setattr(font.info, attr, value)
+        font.info.styleName = instance
+        write_interpolated_glyphs(font, source['names'], source['structures'], source['sizes'], coords, neutral['glyphs'])
+        set_neutral_data(font, neutral)
+        font.glyphOrder = [glyph_name for glyph_name in neutral['glyph_order'] if glyph_name in font]
+        font.save(ufo_path)
+        font.close()
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    result['time'] = time.time() - start
+    return result
+
+#-----------
+# functions
+#-----------
+
+def set_neutral_data(font, neutral):
+    '''Replace the groups, kerning and features of ``font`` with the ones in the neutral master data (see ``InstanceEngine.get_neutral_data``).'''
+    font.groups.clear()
+    font.groups.update(copy.deepcopy(neutral['groups']))
+    font.kerning.clear()
+    font.kerning.update(neutral['kerning'])
+    font.features.text = neutral['features']
+
+def generate_designspace_instances(maker, glyph_names=None, workers=None, callback=None, verbose=True):
+    '''
+    Generate all instances of a ``mutator.DesignSpaceMaker`` with an ``InstanceEngine``, using its ``axes``, ``masters``, ``instances`` and ``neutral`` attributes and the folders of its project.
+
+    Masters without a ``.ufo`` file are skipped, like in ``DesignSpaceMaker.add_masters``. Raises an ``IOError`` if the neutral master is missing.
+
+    Returns a list of result dictionaries (see ``InstanceEngine.generate_instances``).
+
+    '''
+    masters = {}
+    for master, location in maker.masters.items():
+        ufo_path = os.path.join(maker.project.ufos_folder, '%s.ufo' % master)
+        # check if master exists
+        if os.path.exists(ufo_path):
+            masters[master] = location
+        elif master == maker.neutral:
+            raise IOError('neutral master %s does not exist.' % ufo_path)
+        elif verbose:
+            print '\t### master %s does not exist, skipping...' % ufo_path
+    fonts = {}
+    for master in masters:
+        ufo_path = os.path.join(maker.project.ufos_folder, '%s.ufo' % master)
+        fonts[master] = open_font(ufo_path)
+    try:
+        engine = InstanceEngine(maker.axes, masters, maker.neutral, fonts)
+        results = engine.generate_instances(maker.instances, maker.project.instances_folder,
+                    glyph_names=glyph_names, workers=workers, callback=callback, verbose=verbose)
+    finally:
+        for font in fonts.values():
+            font.close()
+    return results
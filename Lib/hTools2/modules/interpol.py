@@ -5,26 +5,690 @@
 import hTools2.modules.color
 reload(hTools2.modules.color)
 
+import copy
+import json
+import time
+import weakref
+import traceback
+from multiprocessing import Pool
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from hTools2.modules.fontutils import get_full_name
 from hTools2.modules.color import clear_color, clear_colors, named_colors
+from hTools2.modules.sysutils import BatchChanges, glyph_changed, font_changed
+from hTools2.modules.backends import open_font, set_mark_color, get_naked_glyph
+
+# objects
+
+class InterpolationCache(object):
+
+    '''
+    A cache of interpolation data for the glyphs of two masters ``f1`` and ``f2``.
+
+    For each compatible pair of glyphs, the cache stores the coordinates of the first master (base) and the differences to the second master (deltas), so that any instance is a multiply-add over the cached values. Each glyph is read from the masters only once: glyph edits do not always send notifications, so use ``invalidate`` or ``clear`` after editing the masters. ``interpolate_fonts`` makes a new cache for each call by default.
+
+    '''
+
+    def __init__(self, f1, f2):
+        self.f1 = f1
+        self.f2 = f2
+        self.entries = {}
+
+    def clear(self):
+        '''Remove all cached entries.'''
+        self.entries = {}
+
+    def invalidate(self, glyph_names):
+        '''Remove the cached entries of the given glyphs, so they are read again from the masters.'''
+        for glyph_name in glyph_names:
+            self.entries.pop(glyph_name, None)
+
+    def get_entry(self, glyph_name):
+        '''
+        Get the interpolation data for glyph ``glyph_name``.
+
+        Components, anchors and guidelines in a different order are matched by base glyph or name (see ``match_coords``). Returns a tuple with the structure of the glyph in ``f1``, its coordinates (base) and the deltas to ``f2``, or ``None`` if the glyph is missing in one of the masters or the glyphs cannot be matched.
+
+        '''
+        if glyph_name in self.entries:
+            return self.entries[glyph_name]
+        if not self.f1.has_key(glyph_name) or not self.f2.has_key(glyph_name):
+            return None
+        structure1, coords1 = get_glyph_structure(self.f1[glyph_name])
+        structure2, coords2 = get_glyph_structure(self.f2[glyph_name])
+        if get_signature(structure1) != get_signature(structure2):
+            coords2 = match_coords(structure1, structure2, coords2)
+        if coords2 is None:
+            entry = None
+        elif numpy is not None:
+            coords1 = numpy.array(coords1, dtype=float)
+            coords2 = numpy.array(coords2, dtype=float)
+            entry = structure1, coords1, coords2 - coords1
+        else:
+            entry = structure1, coords1, [(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(coords1, coords2)]
+        self.entries[glyph_name] = entry
+        return entry
+
+    def get_arrays(self, glyph_names):
+        '''
+        Collect the interpolation data of several glyphs.
+
+        Returns a list of compatible glyph names, a list with their structures, a list with the number of coordinates in each glyph, and the base coordinates and deltas of all glyphs. With NumPy the coordinates are ``(n, 2)`` arrays, otherwise they are lists.
+
+        '''
+        names, structures, sizes = [], [], []
+        coords, deltas = [], []
+        for glyph_name in glyph_names:
+            entry = self.get_entry(glyph_name)
+            if entry is None:
+                continue
+            names.append(glyph_name)
+            structures.append(entry[0])
+            sizes.append(len(entry[1]))
+            coords.append(entry[1])
+            deltas.append(entry[2])
+        if numpy is not None:
+            if len(names):
+                coords = numpy.concatenate(coords)
+                deltas = numpy.concatenate(deltas)
+            else:
+                coords = deltas = numpy.zeros((0, 2))
+        else:
+            coords = [xy for glyph_coords in coords for xy in glyph_coords]
+            deltas = [xy for glyph_deltas in deltas for xy in glyph_deltas]
+        return names, structures, sizes, coords, deltas
+
+    def interpolate_glyph(self, glyph, glyph_name, factor):
+        '''
+        Interpolate glyph ``glyph_name`` from the masters into ``glyph``, replacing its contents.
+
+        The glyph lib, unicodes and note are copied from ``f1``. Returns ``False`` (and leaves ``glyph`` unchanged) if the glyph is missing in one of the masters or the glyphs cannot be matched.
+
+        '''
+        entry = self.get_entry(glyph_name)
+        if entry is None:
+            return False
+        if not isinstance(factor, tuple):
+            factor = factor, factor
+        coords = apply_deltas(entry[1], entry[2], factor)
+        glyph.clear()
+        set_glyph_structure(glyph, entry[0], coords)
+        set_glyph_data(glyph, get_glyph_data(self.f1[glyph_name]))
+        return True
+
+class SignatureCache(object):
+
+    '''
+    A cache of the glyph signatures of one font (see ``get_glyph_signature``).
+
+    Signatures are kept until the glyph posts a ``Glyph.Changed`` notification. While these notifications are held (for example inside a ``BatchChanges`` block), signatures are read from the glyphs. Point types changed in place do not post a notification, so use ``clear`` after such edits. Use ``get_signature_cache`` to get the cache of a font.
+
+    '''
+
+    def __init__(self, naked_font):
+        self.dispatcher = naked_font.dispatcher
+        self.signatures = weakref.WeakKeyDictionary()
+        self.dispatcher.addObserver(self, 'glyph_changed_callback', 'Glyph.Changed')
+
+    def clear(self):
+        '''Remove all cached signatures.'''
+        self.signatures.clear()
+
+    def glyph_changed_callback(self, notification):
+        self.signatures.pop(notification.object, None)
+
+    def get(self, glyph):
+        '''Return the signature of ``glyph``, from the cache if the glyph has not changed.'''
+        if self.dispatcher.areNotificationsHeld(notification='Glyph.Changed'):
+            return get_glyph_signature(glyph)
+        naked = get_naked_glyph(glyph)
+        if naked not in self.signatures:
+            self.signatures[naked] = get_glyph_signature(glyph)
+        return self.signatures[naked]
+
+#: The signature cache of each font, by defcon font.
+_signature_caches = weakref.WeakKeyDictionary()
 
 # functions
 
+def get_signature_cache(font):
+    '''Return the ``SignatureCache`` of ``font``, or ``None`` if the font does not send glyph change notifications.'''
+    try:
+        naked = font.naked()
+    except AttributeError:
+        return None
+    if not hasattr(naked, 'dispatcher'):
+        return None
+    if naked not in _signature_caches:
+        _signature_caches[naked] = SignatureCache(naked)
+    return _signature_caches[naked]
+
+def get_cached_signature(glyph):
+    '''Return the signature of ``glyph``, from the signature cache of its font if possible.'''
+    cache = None
+    if get_naked_glyph(glyph) is not None and glyph.font is not None:
+        cache = get_signature_cache(glyph.font)
+    if cache is not None:
+        return cache.get(glyph)
+    return get_glyph_signature(glyph)
+
+def get_glyph_signature(glyph):
+    '''
+    Get the compatibility signature of a glyph: the point types of each contour (which also define its segment types), the base glyphs of its components, and the names of its anchors and guidelines.
+
+    Signatures are read with ``get_glyph_structure``, from the glyph's current contents. Use ``compare_signatures`` to check if two glyphs are compatible.
+
+    '''
+    return get_signature(get_glyph_structure(glyph)[0])
+
+def get_font_signatures(font, glyph_names=None):
+    '''Return a dictionary with the signatures of the given glyphs in ``font`` (all glyphs if ``glyph_names`` is ``None``), from the signature cache of the font if possible. Missing glyphs are left out.'''
+    if glyph_names is None:
+        glyph_names = font.keys()
+    cache = get_signature_cache(font)
+    signatures = {}
+    for glyph_name in glyph_names:
+        if font.has_key(glyph_name):
+            if cache is not None:
+                signatures[glyph_name] = cache.get(font[glyph_name])
+            else:
+                signatures[glyph_name] = get_glyph_signature(font[glyph_name])
+    return signatures
+
+def compare_signatures(signature1, signature2):
+    '''
+    Find where two glyph signatures differ.
+
+    Returns a list of mismatches, as dictionaries with the ``element`` (``contours``, ``points``, ``point``, ``components``, ``component``, ``anchors``, ``anchor``, ``guidelines`` or ``guideline``), its location (``contour``, ``point`` or ``index``), the ``expected`` and ``found`` values, and a ``level``. The list is empty if the signatures are equal.
+
+    Levels follow ``glyph.isCompatible``: differences in contours and points, in the number of components, or in the set of component base glyphs are ``fatal``. Differences in the order of components, and in anchors and guidelines, are only a ``warning``: such glyphs can still be interpolated.
+
+    '''
+    mismatches = []
+    contours1, components1, anchors1, guidelines1 = signature1
+    contours2, components2, anchors2, guidelines2 = signature2
+    # contours
+    if len(contours1) != len(contours2):
+        mismatches.append({ 'element' : 'contours', 'level' : 'fatal', 'expected' : len(contours1), 'found' : len(contours2) })
+    for i, (types1, types2) in enumerate(zip(contours1, contours2)):
+        if len(types1) != len(types2):
+            mismatches.append({ 'element' : 'points', 'level' : 'fatal', 'contour' : i, 'expected' : len(types1), 'found' : len(types2) })
+            continue
+        for j, (type1, type2) in enumerate(zip(types1, types2)):
+            if type1 != type2:
+                mismatches.append({ 'element' : 'point', 'level' : 'fatal', 'contour' : i, 'point' : j, 'expected' : type1, 'found' : type2 })
+                break
+    # components: fatal if count or base glyphs differ, warning if only the order differs
+    component_level = 'warning'
+    if len(components1) != len(components2) or set(components1) != set(components2):
+        component_level = 'fatal'
+    # components, anchors and guidelines
+    for element, level, names1, names2 in [('component', component_level, components1, components2), ('anchor', 'warning', anchors1, anchors2), ('guideline', 'warning', guidelines1, guidelines2)]:
+        if len(names1) != len(names2):
+            mismatches.append({ 'element' : '%ss' % element, 'level' : level, 'expected' : len(names1), 'found' : len(names2) })
+        for i, (name1, name2) in enumerate(zip(names1, names2)):
+            if name1 != name2:
+                mismatches.append({ 'element' : element, 'level' : level, 'index' : i, 'expected' : name1, 'found' : name2 })
+    return mismatches
+
+def describe_mismatch(mismatch):
+    '''Return a short text description of a mismatch from ``compare_signatures``.'''
+    location = ''
+    if 'contour' in mismatch:
+        location += ' in contour %s' % mismatch['contour']
+    if 'point' in mismatch:
+        location += ' at point %s' % mismatch['point']
+    if 'index' in mismatch:
+        location += ' at index %s' % mismatch['index']
+    description = '%s%s: expected %s, found %s' % (mismatch['element'], location, mismatch['expected'], mismatch['found'])
+    if mismatch.get('level') == 'warning':
+        description += ' (warning)'
+    return description
+
+def glyphs_compatible(g1, g2):
+    '''Check if two glyphs are compatible for interpolation: their signatures (from the signature caches of their fonts) have no ``fatal`` differences (see ``compare_signatures``).'''
+    mismatches = compare_signatures(get_cached_signature(g1), get_cached_signature(g2))
+    return not [mismatch for mismatch in mismatches if mismatch['level'] == 'fatal']
+
+def compare_font_signatures(font_names, signatures, glyph_names):
+    '''
+    Compare the glyph signatures of two or more fonts.
+
+    **font_names** A list with the name of each font.
+    **signatures** A list with a dictionary of glyph signatures for each font, as returned by ``get_font_signatures``.
+
+    Each glyph is compared with the same glyph in the first font which contains it. Returns a compatibility report (see ``get_compatibility_report``).
+
+    '''
+    report = {
+        'fonts' : font_names,
+        'compatible' : 0,
+        'incompatible' : 0,
+        'missing' : 0,
+        'warnings' : 0,
+        'glyphs' : {},
+    }
+    for glyph_name in glyph_names:
+        glyph_report = {
+            'status' : 'compatible',
+            'missing' : [],
+            'mismatches' : [],
+        }
+        reference = None
+        for font_name, font_signatures in zip(font_names, signatures):
+            if glyph_name not in font_signatures:
+                glyph_report['missing'].append(font_name)
+            elif reference is None:
+                reference = font_signatures[glyph_name]
+            elif font_signatures[glyph_name] != reference:
+                for mismatch in compare_signatures(reference, font_signatures[glyph_name]):
+                    mismatch['font'] = font_name
+                    glyph_report['mismatches'].append(mismatch)
+        if len(glyph_report['missing']):
+            glyph_report['status'] = 'missing'
+        elif [mismatch for mismatch in glyph_report['mismatches'] if mismatch['level'] == 'fatal']:
+            glyph_report['status'] = 'incompatible'
+        report[glyph_report['status']] += 1
+        if glyph_report['status'] == 'compatible' and len(glyph_report['mismatches']):
+            report['warnings'] += 1
+        report['glyphs'][glyph_name] = glyph_report
+    return report
+
+def get_compatibility_report(fonts, glyph_names=None):
+    '''
+    Check if the glyphs in two or more masters are compatible for interpolation, by comparing their signatures.
+
+    The glyphs in the first font (or the glyphs in ``glyph_names``) are compared with the same glyphs in all other fonts.
+
+    Returns a dictionary which can be saved as JSON, with the names of the ``fonts``, the number of ``compatible``, ``incompatible`` and ``missing`` glyphs, the number of compatible glyphs with ``warnings``, and a ``glyphs`` dictionary with the ``status`` of each glyph, the fonts in which it is ``missing``, and the ``mismatches`` found in each font (see ``compare_signatures``). Glyphs are ``incompatible`` only if there are ``fatal`` mismatches.
+
+    '''
+    font_names = [get_full_name(font) for font in fonts]
+    if glyph_names is None:
+        glyph_names = fonts[0].keys()
+    signatures = [get_font_signatures(font, glyph_names) for font in fonts]
+    return compare_font_signatures(font_names, signatures, glyph_names)
+
+def _font_signatures_job(ufo_path):
+    '''Get the signatures of all glyphs in a ``.ufo`` font. Runs in a worker process, so errors are returned instead of raised.'''
+    result = {
+        'path' : ufo_path,
+        'status' : 'ok',
+        'error' : None,
+        'name' : None,
+        'signatures' : None,
+    }
+    start = time.time()
+    try:
+        font = open_font(ufo_path)
+        result['name'] = get_full_name(font)
+        result['signatures'] = get_font_signatures(font)
+        font.close()
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    result['time'] = time.time() - start
+    return result
+
+def check_family_compatibility(fonts, glyph_names=None, workers=None, json_path=None, verbose=True):
+    '''
+    Check the compatibility of all glyphs in any number of masters, in one pass.
+
+    **fonts** A list of open fonts and/or paths to ``.ufo`` fonts.
+    **glyph_names** A list of glyphs to check. Use ``None`` for all glyphs in all fonts.
+    **workers** The number of worker processes used to read ``.ufo`` paths. Use ``None`` for one process per CPU, or ``1`` to read all fonts in the current process. Open fonts are always read in the current process.
+    **json_path** Save the report as a JSON file.
+
+    The report has the same form as ``get_compatibility_report``, with an additional list of fonts which could not be read (``errors``). Fonts and glyphs are always in the same order and JSON keys are sorted, so reports from different runs can be compared with a text diff or with ``diff_compatibility_reports``.
+
+    '''
+    font_names = [None] * len(fonts)
+    signatures = [None] * len(fonts)
+    ufo_paths = []
+    for i, font in enumerate(fonts):
+        if isinstance(font, basestring):
+            ufo_paths.append((i, font))
+        else:
+            font_names[i] = get_full_name(font)
+            signatures[i] = get_font_signatures(font)
+    # read .ufo fonts in parallel
+    if len(ufo_paths):
+        paths = [ufo_path for i, ufo_path in ufo_paths]
+        if workers == 1:
+            results = [_font_signatures_job(ufo_path) for ufo_path in paths]
+        else:
+            pool = Pool(workers)
+            try:
+                results = pool.map(_font_signatures_job, paths)
+            finally:
+                pool.close()
+                pool.join()
+        errors = []
+        for (i, ufo_path), result in zip(ufo_paths, results):
+            if result['status'] == 'ok':
+                font_names[i] = result['name']
+                signatures[i] = result['signatures']
+            else:
+                errors.append({ 'path' : ufo_path, 'error' : result['error'] })
+                if verbose:
+                    print '### could not read %s:\n%s' % (ufo_path, result['error'])
+    else:
+        errors = []
+    # compare all fonts
+    font_names = [font_name for font_name, font_signatures in zip(font_names, signatures) if font_signatures is not None]
+    signatures = [font_signatures for font_signatures in signatures if font_signatures is not None]
+    if glyph_names is None:
+        glyph_names = set()
+        for font_signatures in signatures:
+            glyph_names.update(font_signatures.keys())
+    report = compare_font_signatures(font_names, signatures, sorted(glyph_names))
+    report['errors'] = errors
+    if verbose:
+        print 'checking compatibility of %s fonts...\n' % len(font_names)
+        for glyph_name in sorted(report['glyphs'].keys()):
+            glyph_report = report['glyphs'][glyph_name]
+            if glyph_report['status'] == 'missing':
+                print '\t### %s is missing in %s' % (glyph_name, ', '.join(glyph_report['missing']))
+            elif glyph_report['status'] == 'incompatible':
+                print '\t### %s is not compatible' % glyph_name
+                for mismatch in glyph_report['mismatches']:
+                    print '\t\t%s: %s' % (mismatch['font'], describe_mismatch(mismatch))
+            elif len(glyph_report['mismatches']):
+                print '\t%s is compatible, with warnings' % glyph_name
+                for mismatch in glyph_report['mismatches']:
+                    print '\t\t%s: %s' % (mismatch['font'], describe_mismatch(mismatch))
+        print
+        print '\tcompatible: %s' % report['compatible']
+        print '\tincompatible: %s' % report['incompatible']
+        print '\twith warnings: %s' % report['warnings']
+        print '\tmissing: %s' % report['missing']
+        print '\n...done.\n'
+    if json_path is not None:
+        save_compatibility_report(report, json_path)
+    return report
+
+def diff_compatibility_reports(old_report, new_report):
+    '''
+    Compare two compatibility reports of the same fonts, for example before and after editing the masters.
+
+    Returns a dictionary with lists of glyph names: ``fixed`` (now compatible), ``broken`` (no longer compatible), ``changed`` (still not compatible, with different problems), ``added`` and ``removed``.
+
+    '''
+    old_glyphs = old_report['glyphs']
+    new_glyphs = new_report['glyphs']
+    diff = {
+        'fixed' : [],
+        'broken' : [],
+        'changed' : [],
+        'added' : sorted(set(new_glyphs.keys()) - set(old_glyphs.keys())),
+        'removed' : sorted(set(old_glyphs.keys()) - set(new_glyphs.keys())),
+    }
+    for glyph_name in sorted(set(old_glyphs.keys()) & set(new_glyphs.keys())):
+        old_status = old_glyphs[glyph_name]['status']
+        new_status = new_glyphs[glyph_name]['status']
+        if old_status != 'compatible' and new_status == 'compatible':
+            diff['fixed'].append(glyph_name)
+        elif old_status == 'compatible' and new_status != 'compatible':
+            diff['broken'].append(glyph_name)
+        elif old_glyphs[glyph_name] != new_glyphs[glyph_name]:
+            diff['changed'].append(glyph_name)
+    return diff
+
+def save_compatibility_report(report, json_path):
+    '''Save a compatibility report from ``get_compatibility_report`` as a JSON file.'''
+    with open(json_path, 'w') as json_file:
+        json.dump(report, json_file, indent=2, sort_keys=True)
+
+def get_glyph_structure(glyph):
+    '''
+    Get the point structure and the coordinates of a glyph.
+
+    Returns the structure of the glyph, as a tuple with the point types of each contour, the base glyphs of the components, the names of the anchors and guidelines, and the smooth flags of each contour. The first four items are the signature of the glyph (see ``get_signature``), which is the same for compatible glyphs.
+
+    Also returns a list of ``(x, y)`` coordinates: all contour points, three pairs of values for the transformation of each component, the anchors, two pairs of values (position and ``(angle, 0)``) for each guideline, and the width as ``(width, 0)``.
+
+    The glyph is read from its defcon object if possible, which is much faster than reading it through the RoboFont/fontParts objects.
+
+    '''
+    try:
+        naked = glyph.naked()
+    except AttributeError:
+        naked = None
+    if not hasattr(naked, 'dispatcher'):
+        naked = None
+    coords = []
+    contours = []
+    smooth = []
+    # defcon contours and points, or RoboFont/fontParts objects
+    if naked is not None:
+        for contour in naked:
+            contours.append(tuple([point.segmentType or 'offcurve' for point in contour]))
+            smooth.append(tuple([bool(point.smooth) for point in contour]))
+            coords += [(point.x, point.y) for point in contour]
+        components_list = naked.components
+        anchors_list = naked.anchors
+        guidelines_list = getattr(naked, 'guidelines', [])
+    else:
+        for contour in glyph.contours:
+            contours.append(tuple([point.type for point in contour.points]))
+            smooth.append(tuple([bool(point.smooth) for point in contour.points]))
+            coords += [(point.x, point.y) for point in contour.points]
+        components_list = glyph.components
+        anchors_list = glyph.anchors
+        guidelines_list = getattr(glyph, 'guidelines', [])
+    components = []
+    for component in components_list:
+        components.append(component.baseGlyph)
+        try:
+            xx, xy, yx, yy, dx, dy = component.transformation
+        except AttributeError:
+            xx, yy = component.scale
+            xy, yx = 0, 0
+            dx, dy = component.offset
+        coords += [(xx, yy), (xy, yx), (dx, dy)]
+    anchors = []
+    for anchor in anchors_list:
+        anchors.append(anchor.name)
+        coords.append((anchor.x, anchor.y))
+    guidelines = []
+    for guideline in guidelines_list:
+        guidelines.append(guideline.name)
+        coords += [(guideline.x or 0, guideline.y or 0), (guideline.angle or 0, 0)]
+    coords.append((glyph.width, 0))
+    structure = tuple(contours), tuple(components), tuple(anchors), tuple(guidelines), tuple(smooth)
+    return structure, coords
+
+def get_signature(structure):
+    '''Return the signature part of a glyph structure from ``get_glyph_structure``: the items which must be equal for glyphs to be compatible.'''
+    return structure[:4]
+
+def match_coords(structure1, structure2, coords2):
+    '''
+    Reorder the coordinates of a glyph structure to match another structure, for glyphs which differ only in the order of their components, anchors or guidelines.
+
+    Components are matched by base glyph, anchors and guidelines by name, in order of appearance. Returns the coordinates of ``structure2`` in the order of ``structure1``, or ``None`` if the contours differ or the elements cannot be matched.
+
+    '''
+    contours1, components1, anchors1, guidelines1, smooth1 = structure1
+    contours2, components2, anchors2, guidelines2, smooth2 = structure2
+    if contours1 != contours2:
+        return None
+    i = sum([len(point_types) for point_types in contours2])
+    coords = list(coords2[:i])
+    for names1, names2, size in [(components1, components2, 3), (anchors1, anchors2, 1), (guidelines1, guidelines2, 2)]:
+        if sorted(names1) != sorted(names2):
+            return None
+        used = set()
+        for name in names1:
+            j = [k for k, name2 in enumerate(names2) if name2 == name and k not in used][0]
+            used.add(j)
+            coords += coords2[i + j * size:i + (j + 1) * size]
+        i += len(names2) * size
+    coords += coords2[i:]
+    return coords
+
+def apply_deltas(coords, deltas, (factor_x, factor_y)):
+    '''Compute interpolated coordinates from base coordinates and master-to-master deltas, with separate ``x`` and ``y`` factors.'''
+    # numpy: all glyphs at once
+    if numpy is not None:
+        return coords + deltas * numpy.array([factor_x, factor_y])
+    # no numpy: one value at a time
+    return [(x + dx * factor_x, y + dy * factor_y) for (x, y), (dx, dy) in zip(coords, deltas)]
+
+def set_glyph_structure(glyph, structure, coords):
+    '''Draw a structure from ``get_glyph_structure`` into the (empty) ``glyph``, with new coordinates in the same order.'''
+    contours, components, anchors, guidelines, smooth = structure
+    pen = glyph.getPointPen()
+    i = 0
+    for point_types, point_smooth in zip(contours, smooth):
+        pen.beginPath()
+        for point_type, point_is_smooth in zip(point_types, point_smooth):
+            if point_type == 'offcurve':
+                point_type = None
+            pen.addPoint((float(coords[i][0]), float(coords[i][1])), point_type, point_is_smooth)
+            i += 1
+        pen.endPath()
+    for base_glyph in components:
+        (xx, yy), (xy, yx), (dx, dy) = coords[i:i+3]
+        pen.addComponent(base_glyph, tuple([float(n) for n in (xx, xy, yx, yy, dx, dy)]))
+        i += 3
+    for anchor_name in anchors:
+        glyph.appendAnchor(anchor_name, (float(coords[i][0]), float(coords[i][1])))
+        i += 1
+    for guideline_name in guidelines:
+        (x, y), (angle, zero) = coords[i:i+2]
+        try:
+            glyph.appendGuideline((float(x), float(y)), float(angle), name=guideline_name)
+        except AttributeError:
+            pass
+        i += 2
+    glyph.width = float(coords[i][0])
+
+def set_glyph_lib(glyph, lib):
+    '''Replace the lib of ``glyph`` with a copy of ``lib``.'''
+    glyph.lib.clear()
+    for key, value in lib.items():
+        glyph.lib[key] = copy.deepcopy(value)
+
+def get_glyph_data(glyph):
+    '''Return the data which interpolated glyphs take from a master glyph, as a dictionary with its ``lib``, ``unicodes`` and ``note``.'''
+    return {
+        'lib' : copy.deepcopy(dict(glyph.lib)),
+        'unicodes' : list(glyph.unicodes),
+        'note' : glyph.note,
+    }
+
+def set_glyph_data(glyph, data):
+    '''Copy the ``lib``, ``unicodes`` and ``note`` in ``data`` (as returned by ``get_glyph_data``) to ``glyph``. Missing keys are left unchanged.'''
+    if 'lib' in data:
+        set_glyph_lib(glyph, data['lib'])
+    if 'unicodes' in data:
+        glyph.unicodes = data['unicodes']
+    if 'note' in data:
+        glyph.note = data['note']
+
+def write_interpolated_glyphs(f3, names, structures, sizes, coords, glyph_data=None, write_names=None):
+    '''Write interpolated coordinates (as returned by ``apply_deltas``) into new glyphs in ``f3``, with the given structures. Glyph libs, unicodes and notes are copied from ``glyph_data``, a dictionary of glyph names and data (see ``get_glyph_data``). If ``write_names`` is given, only these glyphs are written.'''
+    if write_names is not None:
+        write_names = set(write_names)
+    with BatchChanges(f3):
+        start = 0
+        for i, glyph_name in enumerate(names):
+            end = start + sizes[i]
+            if write_names is None or glyph_name in write_names:
+                glyph = f3.newGlyph(glyph_name, clear=True)
+                set_glyph_structure(glyph, structures[i], coords[start:end])
+                if glyph_data is not None and glyph_name in glyph_data:
+                    set_glyph_data(glyph, glyph_data[glyph_name])
+                glyph_changed(glyph)
+            start = end
+
+def interpolate_fonts(f1, f2, instances, glyph_names=None, clear=True, cache=None):
+    '''
+    Interpolates all compatible glyphs from masters ``f1`` and ``f2`` into several destination fonts.
+
+    **instances** A list of ``(font, factor)`` tuples. Factors can be numbers or ``(factor_x, factor_y)`` tuples.
+    **glyph_names** A list of glyphs to interpolate. Use ``None`` for all glyphs in ``f1``.
+    **clear** Overwrite existing glyphs in the destination fonts. If ``False``, existing glyphs are skipped.
+    **cache** An ``InterpolationCache`` of ``f1`` and ``f2``, to reuse its data over several calls. Use ``None`` to read the masters again.
+
+    The base coordinates and deltas of the masters are collected once (from the cache) and each instance is computed in one array operation, with NumPy if available. Compatible glyphs which cannot be matched element by element (for example with an anchor missing in one master) are interpolated with ``glyph.interpolate``. Each destination font gets a single change notification.
+
+    Returns a list with the names of the interpolated glyphs in each instance.
+
+    '''
+    if cache is None:
+        cache = InterpolationCache(f1, f2)
+    if glyph_names is None:
+        glyph_names = f1.keys()
+    names, structures, sizes, coords, deltas = cache.get_arrays(glyph_names)
+    # compatible glyphs with warnings which are not in the arrays
+    array_names = set(names)
+    fallback_names = []
+    for glyph_name in glyph_names:
+        if glyph_name in array_names or not f1.has_key(glyph_name) or not f2.has_key(glyph_name):
+            continue
+        if glyphs_compatible(f1[glyph_name], f2[glyph_name]):
+            fallback_names.append(glyph_name)
+    glyph_data = dict([(glyph_name, get_glyph_data(f1[glyph_name])) for glyph_name in names + fallback_names])
+    done = []
+    for f3, factor in instances:
+        if not isinstance(factor, tuple):
+            factor = factor, factor
+        instance_coords = apply_deltas(coords, deltas, factor)
+        instance_names = names
+        instance_fallback_names = fallback_names
+        if not clear:
+            instance_names = [glyph_name for glyph_name in names if not f3.has_key(glyph_name)]
+            instance_fallback_names = [glyph_name for glyph_name in fallback_names if not f3.has_key(glyph_name)]
+        with BatchChanges(f3):
+            write_interpolated_glyphs(f3, names, structures, sizes, instance_coords, glyph_data, instance_names)
+            for glyph_name in instance_fallback_names:
+                glyph = f3.newGlyph(glyph_name, clear=True)
+                glyph.interpolate(factor, f1[glyph_name], f2[glyph_name])
+                set_glyph_data(glyph, glyph_data[glyph_name])
+                glyph_changed(glyph)
+        done.append(instance_names + instance_fallback_names)
+    return done
+
+def interpolate_font(f1, f2, f3, factor, glyph_names=None, clear=True, cache=None):
+    '''
+    Interpolates all compatible glyphs from masters ``f1`` and ``f2`` into the destination font ``f3``, in one batch.
+
+    **factor** The interpolation factor, as a number or as a tuple of ``(factor_x, factor_y)`` values.
+    **glyph_names** A list of glyphs to interpolate. Use ``None`` for all glyphs in ``f1``.
+    **clear** Overwrite existing glyphs in ``f3``. If ``False``, existing glyphs are skipped.
+
+    Glyphs missing in one of the masters or with different structures are skipped. See ``interpolate_fonts`` for details.
+
+    Returns a list with the names of the interpolated glyphs.
+
+    '''
+    return interpolate_fonts(f1, f2, [(f3, factor)], glyph_names, clear, cache)[0]
+
 def interpolate_glyph(gName, f1, f2, f3, factor, clear=True):
     '''
     Interpolates the glyphs with name ``glyph_name`` from masters ``f1`` and ``f2``, with interpolation factor ``(factor_x, factor_y)``, into the destination font ``f3``.
 
     The optional parameter ``clear`` controls if existing glyphs in ``f3`` should be overwritten.
 
+    Compatible glyphs are interpolated from their coordinates (see ``InterpolationCache``).
+
     '''
     if f2.has_key(gName):
-        if clear:
+        if clear or not f3.has_key(gName):
             g = f3.newGlyph(gName, clear=True)
         else:
             g = f3[gName]
-        g.interpolate(factor, f1[gName], f2[gName])
-        g.changed()
-        f3.changed()
+        if not InterpolationCache(f1, f2).interpolate_glyph(g, gName, factor):
+            g.interpolate(factor, f1[gName], f2[gName])
+            set_glyph_data(g, get_glyph_data(f1[gName]))
+        glyph_changed(g)
+        font_changed(f3)
     else:
         print 'glyph %s not contained in font 2' % gName
 
@@ -35,7 +699,7 @@ def interpolate_kerning(f1, f2, f3, factor):
     k3.interpolate(k1, k2, factor, True)
     f3.changed()
 
-def check_compatibility(f1, f2, names=None, report=True):
+def check_compatibility(f1, f2, names=None, report=True, json_path=None):
     '''
     Checks if glyphs in ``f1`` and ``f2`` are compatible for interpolation.
 
@@ -47,14 +711,12 @@ def check_compatibility(f1, f2, names=None, report=True):
     - ``red``   -> glyphs are not compatible
     - ``blue``  -> glyph does not exist in ``f2``
 
-    If ``report=True``, the check results will be printed to the output window.
+    If ``report=True``, the check results will be printed to the output window. If ``json_path`` is given, the report is also saved as a JSON file, with the exact location of each mismatch.
+
+    Glyphs are compared by their signatures, so differences in anchors, guidelines or component order are reported as warnings, like ``glyph.isCompatible`` does. Returns the compatibility report (see ``get_compatibility_report``).
 
     '''
-    # glyph names
-    if names != None:
-        gNames = names
-    else:
-        gNames = f1.keys()
+    compatibility = get_compatibility_report([f1, f2], names)
     # colors
     clear_colors(f1)
     green = named_colors['green']
@@ -63,38 +725,49 @@ def check_compatibility(f1, f2, names=None, report=True):
     # check glyphs
     if report == True:
         print 'checking compatibility between %s and %s...\n' % (get_full_name(f1), get_full_name(f2))
-    for name in gNames:
-        if f2.has_key(name):
-            clear_color(f2[name])
+    with BatchChanges(f1), BatchChanges(f2):
+        for name in sorted(compatibility['glyphs'].keys()):
+            glyph_report = compatibility['glyphs'][name]
+            # if glyphs not in f1 or f2
+            if glyph_report['status'] == 'missing':
+                if f1.has_key(name):
+                    set_mark_color(f1[name], blue)
+                    glyph_changed(f1[name])
+                if report == True:
+                    missing = ['font %s' % (i + 1) for i, font in enumerate([f1, f2]) if not font.has_key(name)]
+                    print "\t### %s is not in %s" % (name, ' or '.join(missing))
+                continue
             # if not compatible
-            if not f1[name].isCompatible(f2[name]):
-                f2[name].markColor = red
+            if glyph_report['status'] == 'incompatible':
+                set_mark_color(f2[name], red)
                 if report == True:
                     print "\t### %s is not compatible" % name
+                    for mismatch in glyph_report['mismatches']:
+                        print "\t\t%s" % describe_mismatch(mismatch)
             # if compatible
             else:
-                f2[name].markColor = green
+                set_mark_color(f2[name], green)
                 if report == True:
                     print "\t%s is compatible" % name
-        # if glyphs not in f2
-        else:
-            f1[name].markColor = blue
-            if report == True:
-                print "\t### %s is not in font 2" % name
-    # update fonts
-    f2.changed()
-    f1.changed()
+                    for mismatch in glyph_report['mismatches']:
+                        print "\t\t%s" % describe_mismatch(mismatch)
+            glyph_changed(f2[name])
+    if json_path is not None:
+        save_compatibility_report(compatibility, json_path)
     if report == True:
         print '\n...done.\n'
+    return compatibility
 
 def condense_glyphs(f3, f1, f2, f1_stem, f2_stem, factor, glyph_names):
-    '''Generate condensed glyphs from a 'Regular' font ``f1`` and a 'Bold' font ``f2``.'''
+    '''Generate condensed glyphs from a 'Regular' font ``f1`` and a 'Bold' font ``f2``. Compatible glyphs are interpolated from their coordinates (see ``InterpolationCache``).'''
+    cache = InterpolationCache(f1, f2)
     scale_x = float(f1_stem) / ( f1_stem + factor * (f2_stem - f1_stem ) )
     for glyph_name in glyph_names:
         if not f3.has_key(glyph_name):
             f3.newGlyph(glyph_name)
         f3[glyph_name].prepareUndo('condensomatic')
-        f3[glyph_name].interpolate((factor, 0), f1[glyph_name], f2[glyph_name])
+        if not cache.interpolate_glyph(f3[glyph_name], glyph_name, (factor, 0)):
+            f3[glyph_name].interpolate((factor, 0), f1[glyph_name], f2[glyph_name])
         f3[glyph_name].scaleBy((scale_x, 1))
         f3[glyph_name].leftMargin = (f1[glyph_name].leftMargin + f2[glyph_name].leftMargin) * 0.5 * (1.0 - factor)
         f3[glyph_name].rightMargin = (f1[glyph_name].rightMargin + f2[glyph_name].rightMargin) * 0.5 * (1.0 - factor)
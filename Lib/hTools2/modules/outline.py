@@ -3,7 +3,7 @@
 '''A simple wrapper for Frederik Berlaen's outliner code.'''
 
 from hTools2.extras.outline import *
-from mojo.roboFont import NewFont
+from hTools2.modules.backends import new_font
 
 def make_outline(glyph, distance, join, cap, inner=True, outer=True, miter=None):
     '''Calculate expanded outlines for a given glyph.'''
@@ -40,7 +40,7 @@ expand = expand_glyph
 def expand_font(src_font, distance, join=1, cap=1):
     '''Expand outlines for all glyphs in font.'''
     # create a new empty font
-    dst_font = NewFont(showInterface=False)
+    dst_font = new_font()
     # expand all glyph
     for glyph_name in src_font.keys():
         # get source glyph
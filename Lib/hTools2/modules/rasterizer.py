@@ -1,7 +1,14 @@
 # [h] hTools2.modules.rasterizer
 
 import random
+import hashlib
+from multiprocessing import Pool
+from base64 import b64encode, b64decode
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.pointInsidePen import PointInsidePen
+from fontTools.misc.bezierTools import solveCubic
 from hTools2.modules.primitives import oval, rect, element
+from hTools2.modules.backends import open_font, set_mark_color, set_auto_unicodes
 
 # functions
 
@@ -92,8 +99,406 @@ def get_esize(font, element_src='_element'):
 
     return w, h
 
+def get_element_rect(font, element_src='_element'):
+    '''
+    Get the bounding box of a rectangular element glyph.
+
+    **font** The font to which the element glyph belongs.
+    **element_src** The name of the element glyph.
+
+    Returns the ``(xMin, yMin, xMax, yMax)`` box of the element, or ``None`` if the element is not a single axis-aligned rectangle (for example an ``oval`` or ``super`` element).
+
+    '''
+    glyph = font[element_src]
+    if len(glyph.components) > 0 or len(glyph.contours) != 1:
+        return None
+    points = glyph.contours[0].points
+    if len(points) != 4:
+        return None
+    xs = set()
+    ys = set()
+    for point in points:
+        if point.type == 'offcurve':
+            return None
+        xs.add(point.x)
+        ys.add(point.y)
+    if len(xs) != 2 or len(ys) != 2:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+def get_crossings(segments, y):
+    '''
+    Get all crossings between a list of outline segments and the horizontal line at ``y``.
+
+    **segments** A list of line and curve segments, as collected by ``SegmentsPen``.
+    **y** The vertical position of the scanline.
+
+    Returns a list of ``(x, winding)`` tuples. A point ``(px, y)`` is crossed by the ray shooting to its right if ``px <= x``; the tests mirror the ones in ``fontTools.pens.pointInsidePen``, so the results are identical to ``glyph.pointInside()``.
+
+    '''
+    crossings = []
+    for segment in segments:
+
+        # line segments
+        if len(segment) == 2:
+            (x1, y1), (x2, y2) = segment
+            if y1 < y and y2 < y:
+                continue
+            if y1 >= y and y2 >= y:
+                continue
+            dx = x2 - x1
+            dy = y2 - y1
+            t = (y - y1) / float(dy)
+            ix = dx * t + x1
+            x_max = max(x1, x2)
+            if y2 > y1:
+                crossings.append((min(ix, x_max), 1))
+            else:
+                crossings.append((min(ix, x_max), -1))
+
+        # curve segments
+        else:
+            (x1, y1), (x2, y2), (x3, y3), (x4, y4) = segment
+            if y1 < y and y2 < y and y3 < y and y4 < y:
+                continue
+            if y1 >= y and y2 >= y and y3 >= y and y4 >= y:
+                continue
+            dy = y1
+            cy = (y2 - dy) * 3.0
+            by = (y3 - y2) * 3.0 - cy
+            ay = y4 - dy - cy - by
+            solutions = sorted(solveCubic(ay, by, cy, dy - y))
+            solutions = [t for t in solutions if -0. <= t <= 1.]
+            if not solutions:
+                continue
+            dx = x1
+            cx = (x2 - dx) * 3.0
+            bx = (x3 - x2) * 3.0 - cx
+            ax = x4 - dx - cx - bx
+            x_max = max(x1, x2, x3, x4)
+            lastT = None
+            for t in solutions:
+                if t == lastT:
+                    continue
+                lastT = t
+                t2 = t * t
+                t3 = t2 * t
+                # get direction of the curve at crossing
+                direction = 3*ay*t2 + 2*by*t + cy
+                incomingGoingUp = outgoingGoingUp = direction > 0.0
+                if direction == 0.0:
+                    direction = 6*ay*t + 2*by
+                    outgoingGoingUp = direction > 0.0
+                    incomingGoingUp = not outgoingGoingUp
+                    if direction == 0.0:
+                        direction = ay
+                        incomingGoingUp = outgoingGoingUp = direction > 0.0
+                # skip points where the curve only touches the line
+                if t in (0.0, -0.0):
+                    if outgoingGoingUp:
+                        continue
+                    goingUp = outgoingGoingUp
+                elif t == 1.0:
+                    if not incomingGoingUp:
+                        continue
+                    goingUp = incomingGoingUp
+                else:
+                    if incomingGoingUp != outgoingGoingUp:
+                        continue
+                    goingUp = outgoingGoingUp
+                xt = ax*t3 + bx*t2 + cx*t + dx
+                if goingUp:
+                    crossings.append((min(xt, x_max), 1))
+                else:
+                    crossings.append((min(xt, x_max), -1))
+
+    # done
+    return crossings
+
+def get_glyph_set(glyph):
+    '''Return the layer (or font) of ``glyph``, in which the base glyphs of its components are looked up.'''
+    try:
+        glyph_set = glyph.layer
+    except AttributeError:
+        glyph_set = None
+    if glyph_set is None:
+        glyph_set = glyph.getParent()
+    return glyph_set
+
+def get_glyph_segments(glyph):
+    '''Return the line and curve segments of the outline of ``glyph``, including the outlines of its components.'''
+    pen = SegmentsPen(get_glyph_set(glyph))
+    glyph.draw(pen)
+    return pen.get_segments()
+
+def get_outline_hash(segments, res, mode='scanline'):
+    '''
+    Get a hash of outline segments, scan resolution and scanning mode.
+
+    Used to detect glyphs which changed since their bits were last scanned. Contours generated by ``RasterGlyph.place_components`` are hashed with the mode ``output``.
+
+    '''
+    return hashlib.md5(repr((segments, tuple(res), mode))).hexdigest()
+
+def get_grid(box, res):
+    '''
+    Get the scanning grid for a bounding box.
+
+    **box** The bounding box of the glyph, as a tuple of ``(xMin, yMin, xMax, yMax)`` values.
+    **res** The grid resolution, as a tuple of values for x and y.
+
+    Returns the x and y positions of the grid cells (y values from top to bottom), and an empty ``RasterBits`` object to store the scanned lines.
+
+    '''
+    res_x, res_y = res
+    xMin, yMin, xMax, yMax = box
+    xMin, yMin, xMax, yMax = int(xMin), int(yMin), int(xMax), int(yMax)
+    xValues = range(xMin, xMax, res_x)
+    yValues = range(yMin, yMax, res_y)
+    yValues.reverse()
+    if len(yValues) > 0:
+        top = yValues[0] / res_y
+    else:
+        top = yMin / res_y
+    lines = RasterBits(top, len(xValues), (xMin, yMin), res)
+    return xValues, yValues, lines
+
+def scan_segments(segments, box, res):
+    '''
+    Scan outline segments into bits, collecting the crossings of each row with the outline and filling the spans between them.
+
+    **segments** A list of line and curve segments, as collected by ``SegmentsPen``.
+    **box** The bounding box of the glyph, as a tuple of ``(xMin, yMin, xMax, yMax)`` values.
+    **res** The grid resolution, as a tuple of values for x and y.
+
+    Returns a ``RasterBits`` object.
+
+    '''
+    res_x, res_y = res
+    xValues, yValues, lines = get_grid(box, res)
+    for y in yValues:
+        crossings = get_crossings(segments, y+(res_y/2))
+        crossings.sort()
+        # winding of the leftmost cell
+        winding = 0
+        for cx, w in crossings:
+            winding += w
+        # walk the row, dropping crossings left of each cell
+        i = 0
+        bits = []
+        for x in xValues:
+            px = x + (res_x/2)
+            while i < len(crossings) and crossings[i][0] < px:
+                winding -= crossings[i][1]
+                i += 1
+            if winding != 0:
+                bits.append(1,)
+            else:
+                bits.append(0,)
+        lines.append_line(bits)
+    return lines
+
 # objects
 
+class SegmentsPen(BasePen):
+
+    '''
+    A pen to collect the line and curve segments of a glyph's closed contours.
+
+    **glyphSet** The layer or font in which the base glyphs of components are found (see ``get_glyph_set``). Components are drawn into the pen with their transformations.
+
+    Quadratic segments are converted to equivalent cubic segments by ``BasePen``, as in ``PointInsidePen``, so crossings are computed in the same way as ``glyph.pointInside()``.
+
+    '''
+
+    def __init__(self, glyphSet=None):
+        BasePen.__init__(self, glyphSet)
+        self.segments = []
+        self.firstPoint = None
+
+    def get_segments(self):
+        '''Close the last contour (if needed) and return the list of segments.'''
+        if self.firstPoint is not None:
+            self.closePath()
+        return self.segments
+
+    def _moveTo(self, pt):
+        if self.firstPoint is not None:
+            self.closePath()
+        self.firstPoint = pt
+
+    def _lineTo(self, pt):
+        self.segments.append((self._getCurrentPoint(), pt))
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        self.segments.append((self._getCurrentPoint(), pt1, pt2, pt3))
+
+    def _closePath(self):
+        if self._getCurrentPoint() != self.firstPoint:
+            self.lineTo(self.firstPoint)
+        self.firstPoint = None
+
+    def _endPath(self):
+        '''Insideness is not defined for open contours.'''
+        raise NotImplementedError
+
+class RasterBits(object):
+
+    '''
+    The scanned bits of a glyph, stored as bit-packed rows.
+
+    Rows are kept from top to bottom, each one padded to a whole number of bytes. In the glyph lib the rows are saved as a base64 string, together with the format version, the line numbers, the scan origin and resolution.
+
+    '''
+
+    #: Version of the packed format stored in the glyph lib.
+    version = 2
+
+    def __init__(self, top, width, origin=None, res=None, data=None, hash=None, output_hash=None):
+        #: Number of the topmost line.
+        self.top = top
+        #: Number of bits in each line.
+        self.width = width
+        #: Bottom left corner of the scanned area, in font units.
+        self.origin = origin
+        #: Grid resolution used when scanning, as a tuple of values for x and y.
+        self.res = res
+        #: Hash of the outline, resolution and mode used when scanning (see ``get_outline_hash``).
+        self.hash = hash
+        #: Hash of the contours generated from the bits, if they were rendered as contours.
+        self.output_hash = output_hash
+        self.row_size = (width + 7) // 8
+        if data is None:
+            data = bytearray()
+        self.data = data
+
+    def __len__(self):
+        return len(self.data) // self.row_size if self.row_size else 0
+
+    def line_numbers(self):
+        '''Return the numbers of all lines, from top to bottom.'''
+        return range(self.top, self.top - len(self), -1)
+
+    def append_line(self, bits):
+        '''Pack a list of bits and add it as a new line below the current ones.'''
+        row = bytearray(self.row_size)
+        for i, bit in enumerate(bits):
+            if bit:
+                row[i // 8] |= 0x80 >> (i % 8)
+        self.data += row
+
+    def get_bits(self, line):
+        '''Iterate over the bits (``1`` or ``0``) in the given line.'''
+        offset = (self.top - line) * self.row_size
+        for i in range(self.width):
+            if self.data[offset + i // 8] & (0x80 >> (i % 8)):
+                yield 1
+            else:
+                yield 0
+
+    def get_set_bits(self, line):
+        '''Iterate over the positions of the set bits in the given line.'''
+        offset = (self.top - line) * self.row_size
+        for j in range(self.row_size):
+            byte = self.data[offset + j]
+            if byte == 0:
+                continue
+            for k in range(8):
+                if byte & (0x80 >> k):
+                    yield j * 8 + k
+
+    def to_lib(self):
+        '''Return the packed bits as a dictionary which can be stored in a glyph lib.'''
+        lib = {
+            'version' : self.version,
+            'top' : self.top,
+            'lines' : len(self),
+            'width' : self.width,
+            'data' : b64encode(bytes(self.data)),
+        }
+        if self.origin is not None:
+            lib['origin'] = list(self.origin)
+        if self.res is not None:
+            lib['resolution'] = list(self.res)
+        if self.hash is not None:
+            lib['hash'] = self.hash
+        if self.output_hash is not None:
+            lib['output_hash'] = self.output_hash
+        return lib
+
+    def get_runs(self, line):
+        '''Return the runs of consecutive set bits in the given line, as a list of ``(start, length)`` tuples.'''
+        runs = []
+        start = previous = None
+        for i in self.get_set_bits(line):
+            if previous is not None and i == previous + 1:
+                previous = i
+                continue
+            if start is not None:
+                runs.append((start, previous - start + 1))
+            start = previous = i
+        if start is not None:
+            runs.append((start, previous - start + 1))
+        return runs
+
+    def get_rects(self, merge='rows'):
+        '''
+        Return the set bits merged into rectangles, as a list of ``(start, line, length, height)`` tuples.
+
+        **merge** ``rows`` merges horizontal runs of bits in each line; ``rects`` also merges identical runs in consecutive lines into taller rectangles.
+
+        ``line`` is the bottom line of each rectangle.
+
+        '''
+        rects = []
+        open_rects = {}
+        for line in self.line_numbers():
+            runs = self.get_runs(line)
+            # horizontal runs only
+            if merge != 'rects':
+                for start, length in runs:
+                    rects.append((start, line, length, 1))
+                continue
+            # extend runs which continue from the line above
+            new_rects = {}
+            for run in runs:
+                new_rects[run] = open_rects.pop(run, 0) + 1
+            # close runs which end in the line above
+            for (start, length), height in open_rects.items():
+                rects.append((start, line + 1, length, height))
+            open_rects = new_rects
+        # close runs which end in the last line
+        bottom = self.top - len(self) + 1
+        for (start, length), height in open_rects.items():
+            rects.append((start, bottom, length, height))
+        rects.sort(key=lambda r: (-(r[1] + r[3]), r[0]))
+        return rects
+
+    @classmethod
+    def from_lib(cls, lib):
+        '''Create a ``RasterBits`` object from a glyph lib value, in the packed or in the old (dict of lists) format.'''
+        # packed format
+        if 'version' in lib:
+            origin = lib.get('origin')
+            if origin is not None:
+                origin = tuple(origin)
+            res = lib.get('resolution')
+            if res is not None:
+                res = tuple(res)
+            data = bytearray(b64decode(lib['data']))
+            return cls(lib['top'], lib['width'], origin, res, data, lib.get('hash'), lib.get('output_hash'))
+        # old format: stringified line numbers -> lists of bits
+        lineNumbers = [int(L) for L in lib.keys()]
+        if len(lineNumbers) == 0:
+            return cls(0, 0)
+        top = max(lineNumbers)
+        bottom = min(lineNumbers)
+        width = len(lib[str(top)])
+        bits = cls(top, width)
+        for line in range(top, bottom - 1, -1):
+            bits.append_line(lib.get(str(line), []))
+        return bits
+
 class RasterGlyph:
 
     '''An object to scan glyphs and rasterize them into element components.'''
@@ -108,17 +513,47 @@ class RasterGlyph:
     def __init__(self, sourceGlyph):
         self.g = sourceGlyph
 
-    def scan(self, res):
+    def get_segments(self, glyph=None):
+        '''Return the line and curve segments of the glyph outline, or of the outline of ``glyph`` if given.'''
+        if glyph is None:
+            glyph = self.g
+        return get_glyph_segments(glyph)
+
+    def has_bits(self, segments, res, mode='scanline'):
+        '''
+        Check if the bits in the glyph lib are up-to-date for the outline ``segments``.
+
+        Returns ``True`` if the bits were scanned from the same segments, with the same resolution and mode, or if the segments are the contours which were generated from the bits (see ``place_components``), so that rasterized output is never scanned again.
+
+        '''
+        lib = self.g.lib.get(self.lib_key_coordenates)
+        if lib is None or 'version' not in lib:
+            return False
+        if get_outline_hash(segments, res, mode) == lib.get('hash'):
+            return True
+        output_hash = lib.get('output_hash')
+        return output_hash is not None and get_outline_hash(segments, res, 'output') == output_hash
+
+    def needs_scan(self, res, mode='scanline'):
+        '''Check if the glyph outline, the resolution or the mode changed since the bits in the glyph lib were scanned.'''
+        if len(self.g.contours) == 0:
+            return self.g.lib.has_key(self.lib_key_coordenates) is not True
+        return not self.has_bits(self.get_segments(), res, mode)
+
+    def scan(self, res, mode='scanline', force=False):
         '''
         Scan glyph and store bits into glyph lib.
 
         **res** The grid resolution to use when scanning the glyph, as a tuple of values for x and y.
+        **mode** The scanning engine: ``scanline`` intersects each row with the glyph outline once and fills the spans; ``pointInside`` tests every grid cell with a ``PointInsidePen``, like ``glyph.pointInside()``, and is kept as a reference. Both include the outlines of components.
+        **force** Scan the glyph even if its outline, the resolution and the mode have not changed since the last scan.
 
-        Returns a boolean indicating sucess or failure of the scan operation.
+        Returns a boolean indicating sucess or failure of the scan operation. If the glyph was up-to-date and not scanned again, ``self.skipped`` is set to ``True``.
 
         '''
 
         success = False
+        self.skipped = False
         res_x, res_y = res
 
         # get margins
@@ -128,41 +563,55 @@ class RasterGlyph:
         # scan glyph
         if len(self.g.contours) > 0:
 
-            # get bounding box
-            xMin, yMin, xMax, yMax = self.g.box
-            xMin, yMin, xMax, yMax = int(xMin), int(yMin), int(xMax), int(yMax)
-            xValues = range(xMin, xMax, res_x)
-            yValues = range(yMin, yMax, res_y)
-            yValues.reverse()
+            segments = self.get_segments()
+
+            # outline unchanged, or rasterized output: keep current bits
+            if not force and self.has_bits(segments, res, mode):
+                self.coordenates = RasterBits.from_lib(self.g.lib[self.lib_key_coordenates])
+                if tuple(self.g.lib.get(self.lib_key_margins, ())) != (self.leftMargin, self.rightMargin):
+                    self.g.lib[self.lib_key_margins] = self.leftMargin, self.rightMargin
+                self.skipped = True
+                return True
 
             # scan lines
-            lines = {}
-            for y in yValues:
-                lineNumber = y / res_y
-                bits = []
-                for x in xValues:
-                    if self.g.pointInside((x+(res_x/2), y+(res_y/2))):
-                        bits.append(1,)
-                    else:
-                        bits.append(0,)
-                lines[str(lineNumber)] = bits
+            if mode == 'pointInside':
+                xValues, yValues, bits = get_grid(self.g.box, res)
+                self._scan_point_inside(bits, xValues, yValues, res)
+            else:
+                bits = scan_segments(segments, self.g.box, res)
 
             # store scanned data
-            self.coordenates = lines
+            bits.hash = get_outline_hash(segments, res, mode)
+            self.coordenates = bits
             self.save_bits_to_lib()
             success = True
 
         # done
         return success
 
+    def _scan_point_inside(self, lines, xValues, yValues, res):
+        '''Scan lines by testing each grid cell with a ``PointInsidePen``, like ``glyph.pointInside()`` but including components.'''
+        res_x, res_y = res
+        glyph_set = get_glyph_set(self.g)
+        for y in yValues:
+            bits = []
+            for x in xValues:
+                pen = PointInsidePen(glyph_set, (x+(res_x/2), y+(res_y/2)))
+                self.g.draw(pen)
+                if pen.getResult():
+                    bits.append(1,)
+                else:
+                    bits.append(0,)
+            lines.append_line(bits)
+
     def save_bits_to_lib(self):
         '''Save bit coordenates and margins from attributes into the glyph lib.'''
-        self.g.lib[self.lib_key_coordenates] = self.coordenates
+        self.g.lib[self.lib_key_coordenates] = self.coordenates.to_lib()
         self.g.lib[self.lib_key_margins] = self.leftMargin, self.rightMargin
 
     def read_bits_from_lib(self):
-        '''Read bit coordenates and margins from the glyph lib into attributes.'''
-        self.coordenates = self.g.lib[self.lib_key_coordenates]
+        '''Read bit coordenates and margins from the glyph lib into attributes. Libs in the old (unpacked) format are converted transparently.'''
+        self.coordenates = RasterBits.from_lib(self.g.lib[self.lib_key_coordenates])
         self.leftMargin, self.rightMargin = self.g.lib[self.lib_key_margins]
 
     def print_bits(self, black="#", white="-", res=(125, 125)):
@@ -179,20 +628,6 @@ class RasterGlyph:
         marginLeft = white
         marginRight = white + ' '
 
-        # prepare line numbers
-        lineNumbers = self.coordenates.keys()
-        belowBase = []
-        aboveBase = []
-        for L in lineNumbers:
-            if int(L) < 0:
-                belowBase.append(int(L))
-            else:
-                aboveBase.append(int(L))
-        aboveBase.sort()
-        aboveBase.reverse()
-        belowBase.sort()
-        belowBase.reverse()
-
         # print glyph info
         line_length = 30
         print "-" * line_length
@@ -204,22 +639,11 @@ class RasterGlyph:
         print "-" * line_length
         print
 
-        # print lines above or equal to baseline
-        for line in aboveBase:
+        # print lines from top to bottom
+        for line in self.coordenates.line_numbers():
             print '%+03d' % line, "\t",
             print marginLeft * int(self.leftMargin),
-            for bit in self.coordenates[str(line)]:
-                if bit == 1:
-                    print black,
-                else:
-                    print white,
-            print marginRight * int(self.rightMargin)
-
-        # print lines below baseline
-        for line in belowBase:
-            print '%+03d' % line, "\t",
-            print marginLeft * int(self.leftMargin),
-            for bit in self.coordenates[str(line)]:
+            for bit in self.coordenates.get_bits(line):
                 if bit == 1:
                     print black,
                 else:
@@ -230,11 +654,75 @@ class RasterGlyph:
         print
         print "-" * line_length, "\n"
 
-    def rasterize(self, destGlyph=None, res=(125, 125), color=None):
-        '''Render scanned bits into destination glyph using components.'''
+    def place_components(self, destGlyph, res=(125, 125), element='_element', merge=None, element_box=None, contours=False):
+        '''
+        Clear the destination glyph and place element components for the bits in the scanned lines.
+
+        **merge** ``None`` places one component for each bit. ``rows`` and ``rects`` merge runs of bits into horizontal or rectangular blocks (see ``RasterBits.get_rects``), each one rendered as a single scaled component.
+        **element_box** The bounding box of the element, as returned by ``get_element_rect``. Runs are merged only for rectangular elements which leave no gaps between grid cells; otherwise one component is placed for each bit.
+        **contours** Draw merged blocks as rectangle contours instead of scaled components. The hash of the generated contours is saved with the bits in the lib of the source glyph, so that they are not mistaken for a changed outline when the destination is the source glyph itself.
+
+        '''
 
         res_x, res_y = res
-        element = "_element"
+
+        # prepare glyphs
+        destGlyph.clear()
+
+        # check if element can be merged without gaps
+        if merge is not None:
+            if element_box is None:
+                merge = None
+            else:
+                exMin, eyMin, exMax, eyMax = element_box
+                w = exMax - exMin
+                h = eyMax - eyMin
+                if w < res_x:
+                    merge = None
+                elif h < res_y:
+                    merge = 'rows'
+
+        # place components from matrix
+        if merge is None:
+            for line in self.coordenates.line_numbers():
+                y = line * res_y
+                for bitCount in self.coordenates.get_set_bits(line):
+                    x = bitCount * res_x
+                    destGlyph.appendComponent(element, (x, y), (1, 1))
+
+        # place merged blocks
+        else:
+            pen = destGlyph.getPen()
+            for start, line, length, height in self.coordenates.get_rects(merge):
+                x = start * res_x
+                y = line * res_y
+                block_w = (length - 1) * res_x + w
+                block_h = (height - 1) * res_y + h
+                if contours:
+                    rect(pen, x + exMin, y + eyMin, block_w, block_h)
+                else:
+                    scale_x = block_w / float(w)
+                    scale_y = block_h / float(h)
+                    offset_x = x + exMin * (1 - scale_x)
+                    offset_y = y + eyMin * (1 - scale_y)
+                    destGlyph.appendComponent(element, (offset_x, offset_y), (scale_x, scale_y))
+
+        # set margins
+        destGlyph.leftMargin = self.leftMargin * res_x
+        destGlyph.rightMargin = self.rightMargin * res_x
+
+        # remember generated contours
+        if merge is not None and contours:
+            self.coordenates.output_hash = get_outline_hash(self.get_segments(destGlyph), res, 'output')
+            self.save_bits_to_lib()
+
+    def rasterize(self, destGlyph=None, res=(125, 125), color=None, element='_element', merge=None, contours=False):
+        '''
+        Render scanned bits into destination glyph using components.
+
+        **merge** Merge runs of bits into ``rows`` or ``rects`` blocks, placing one scaled component (or contour, if ``contours=True``) for each block. Only applies to rectangular elements.
+
+        '''
 
         # define destination glyph
         if destGlyph == None:
@@ -244,41 +732,148 @@ class RasterGlyph:
         if destGlyph.name == element:
             return
 
-        # see if glyph has been scanned already
+        # see if glyph has been scanned already (and is up-to-date)
         lib_exists = True
-        if self.g.lib.has_key(self.lib_key_coordenates) is not True:
-            lib_exists = self.scan(res)
+        if self.needs_scan(res):
+            lib_exists = self.scan(res, force=True)
 
         if lib_exists:
 
-            # prepare glyphs
-            destGlyph.clear()
-
-            # prepare lines
-            lineNumbers = self.g.lib[self.lib_key_coordenates].keys()
-            lineNumbers.sort()
-            lineNumbers.reverse()
-
-            # place components from matrix
-            for line in lineNumbers:
-                bitCount = 0
-                for bit in self.g.lib[self.lib_key_coordenates][line]:
-                    if bit == 1:
-                        x = bitCount * res_x
-                        y = int(line) * res_y
-                        destGlyph.appendComponent(element, (x, y), (1, 1))
-                    else:
-                        pass
-                    bitCount = bitCount + 1
+            # place components
+            self.read_bits_from_lib()
+            element_box = None
+            if merge is not None:
+                element_box = get_element_rect(destGlyph.getParent(), element)
+            self.place_components(destGlyph, res, element, merge, element_box, contours)
 
             # set glyph data & update
-            destGlyph.leftMargin = self.g.lib[self.lib_key_margins][0] * res_x
-            destGlyph.rightMargin = self.g.lib[self.lib_key_margins][1] * res_x
-            destGlyph.autoUnicodes()
+            set_auto_unicodes(destGlyph)
             if color:
-                destGlyph.mark = color
+                set_mark_color(destGlyph, color)
             destGlyph.update()
 
         else:
             # print '\tglyph %s is empty.\n' % destGlyph.name
             pass
+
+#-----------------
+# batch rasterize
+#-----------------
+
+def _scan_glyph_job(job):
+    '''Scan the outline segments of one glyph. Runs in a worker process.'''
+    glyph_name, segments, box, res = job
+    bits = scan_segments(segments, box, res)
+    bits.hash = get_outline_hash(segments, res)
+    return glyph_name, bits.to_lib()
+
+def rescan_changed(font, res, element='_element', mode='scanline', verbose=False):
+    '''
+    Rescan only those glyphs in the font whose outline (or the scan resolution) changed since their last scan. Margins are updated for all glyphs.
+
+    **font** The font to scan.
+    **res** The grid resolution, as a tuple of values for x and y.
+    **element** The name of the element glyph, which is never scanned.
+
+    Returns a list with the names of the rescanned glyphs.
+
+    '''
+    rescanned = []
+    for glyph in font:
+        if glyph.name == element or len(glyph.contours) == 0:
+            continue
+        R = RasterGlyph(glyph)
+        R.scan(res, mode=mode)
+        if not R.skipped:
+            if verbose:
+                print '\tscanned %s' % glyph.name
+            rescanned.append(glyph.name)
+    return rescanned
+
+def rasterize_font(ufo_path, res, element='_element', workers=None, glyph_names=None, merge=None, contours=False, verbose=True):
+    '''
+    Scan and rasterize all glyphs in a UFO font, without RoboFont.
+
+    **ufo_path** The path of the UFO font to rasterize.
+    **res** The grid resolution, as a tuple of values for x and y.
+    **element** The name of the element glyph used in the components.
+    **workers** The number of worker processes used to scan the glyphs. Use ``None`` for one process per CPU, or ``1`` to scan in the current process.
+    **glyph_names** A list of names of glyphs to rasterize. Use ``None`` for all glyphs in the font.
+    **merge** Merge runs of bits into ``rows`` or ``rects`` blocks (see ``RasterGlyph.place_components``).
+    **contours** Draw merged blocks as contours instead of scaled components.
+
+    Outlines are read from the font once, scanned in a process pool, and the component placements are written back and saved in one batch.
+
+    Returns the number of rasterized glyphs.
+
+    '''
+    font = open_font(ufo_path)
+
+    # element glyph must exist
+    if element not in font:
+        print 'font has no element glyph %s.\n' % element
+        return 0
+
+    if glyph_names is None:
+        glyph_names = font.keys()
+
+    # collect outlines
+    if verbose:
+        print 'collecting outlines...'
+    jobs = []
+    for glyph_name in glyph_names:
+        if glyph_name == element:
+            continue
+        glyph = font[glyph_name]
+        if len(glyph.contours) > 0:
+            jobs.append((glyph_name, get_glyph_segments(glyph), glyph.box, res))
+
+    # scan glyphs
+    if verbose:
+        print 'scanning %s glyphs...' % len(jobs)
+    if workers == 1:
+        results = map(_scan_glyph_job, jobs)
+    else:
+        pool = Pool(workers)
+        try:
+            results = pool.map(_scan_glyph_job, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    # write bits and components
+    if verbose:
+        print 'placing components...'
+    res_x, res_y = res
+    element_box = None
+    if merge is not None:
+        element_box = get_element_rect(font, element)
+    for glyph_name, lib in results:
+        glyph = font[glyph_name]
+        R = RasterGlyph(glyph)
+        R.leftMargin = glyph.leftMargin / res_x
+        R.rightMargin = glyph.rightMargin / res_x
+        R.coordenates = RasterBits.from_lib(lib)
+        R.save_bits_to_lib()
+        R.place_components(glyph, res, element, merge, element_box, contours)
+
+    # save font
+    if verbose:
+        print 'saving font...'
+    font.save()
+    if verbose:
+        print '...done.\n'
+    return len(results)
+
+if __name__ == '__main__':
+
+    import sys
+
+    # usage: python rasterizer.py font.ufo gridsize [workers]
+    ufo_path = sys.argv[1]
+    gridsize = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        workers = int(sys.argv[3])
+    else:
+        workers = None
+    rasterize_font(ufo_path, (gridsize, gridsize), workers=workers)
@@ -0,0 +1,164 @@
+# [h] hTools2.modules.subsets
+
+'''
+Plan webfont subsets from encoding groups or language coverage.
+
+Subsets are disjoint, so that each one can be declared in CSS with its own ``unicode-range``: browsers download only the subsets which contain characters used in a page.
+
+'''
+
+import os
+from collections import OrderedDict
+from fontTools.ttLib import TTFont
+from hTools2.modules.encoding import import_groups_from_encoding
+from hTools2.modules.languages import diacritics_glyphnames
+
+#-----------
+# functions
+#-----------
+
+def get_unicode_range(unicodes):
+    '''Return a CSS ``unicode-range`` value for a list of unicodes, joining consecutive values into ranges.'''
+    ranges = []
+    for uni in sorted(set(unicodes)):
+        if len(ranges) and uni == ranges[-1][1] + 1:
+            ranges[-1][1] = uni
+        else:
+            ranges.append([uni, uni])
+    parts = []
+    for first, last in ranges:
+        if first == last:
+            parts.append('U+%04X' % first)
+        else:
+            parts.append('U+%04X-%04X' % (first, last))
+    return ', '.join(parts)
+
+def get_language_classes(glyph_names, languages=None):
+    '''
+    Sort the diacritics glyphs of the given languages into classes of glyphs used by the same languages.
+
+    Returns a dictionary with tuples of language names (keys) and lists of glyph names (values).
+
+    '''
+    if languages is None:
+        languages = sorted(diacritics_glyphnames.keys())
+    glyph_languages = {}
+    for language in languages:
+        lc, uc = diacritics_glyphnames[language]
+        for glyph_name in lc + uc:
+            glyph_languages.setdefault(glyph_name, set()).add(language)
+    classes = {}
+    for glyph_name in glyph_names:
+        if glyph_name in glyph_languages:
+            key = tuple(sorted(glyph_languages[glyph_name]))
+            classes.setdefault(key, []).append(glyph_name)
+    return classes
+
+def plan_language_subsets(glyph_names, languages=None, min_glyphs=4):
+    '''
+    Split a list of glyph names into disjoint subsets by language.
+
+    The ``base`` subset contains all glyphs which are not diacritics of any of the given languages. Diacritics glyphs are grouped by the set of languages which use them, so that a page in one language only needs the base subset and the subsets of that language. Classes with fewer than ``min_glyphs`` glyphs are added to the base subset.
+
+    Returns an ``OrderedDict`` with subset names (keys) and glyph names (values).
+
+    '''
+    classes = get_language_classes(glyph_names, languages)
+    class_glyphs = set()
+    subsets = OrderedDict()
+    subsets['base'] = []
+    for key in sorted(classes.keys(), key=lambda key: (-len(key), key)):
+        if len(classes[key]) >= min_glyphs:
+            subsets['-'.join(key)] = classes[key]
+            class_glyphs.update(classes[key])
+    subsets['base'] = [glyph_name for glyph_name in glyph_names if glyph_name not in class_glyphs]
+    return subsets
+
+def plan_group_subsets(glyph_names, enc_path):
+    '''
+    Split a list of glyph names into disjoint subsets using the groups in a structured encoding file.
+
+    Glyphs which are in more than one group are added to the first one only. Glyphs which are in no group are added to a ``base`` subset.
+
+    Returns an ``OrderedDict`` with subset names (keys) and glyph names (values).
+
+    '''
+    groups = import_groups_from_encoding(enc_path) or OrderedDict()
+    font_glyphs = set(glyph_names)
+    done = set()
+    subsets = OrderedDict()
+    subsets['base'] = []
+    for group_name, group_glyphs in groups.items():
+        subset = []
+        for glyph_name in group_glyphs:
+            if glyph_name in font_glyphs and glyph_name not in done:
+                subset.append(glyph_name)
+                done.add(glyph_name)
+        if len(subset):
+            subsets[group_name] = subset
+    subsets['base'] = [glyph_name for glyph_name in glyph_names if glyph_name not in done]
+    if not len(subsets['base']):
+        del subsets['base']
+    return subsets
+
+def plan_font_subsets(font_path, enc_path=None, languages=None, min_glyphs=4):
+    '''
+    Plan the subsets of an .otf or .ttf font, by encoding groups (if ``enc_path`` is given) or by language.
+
+    Returns an ``OrderedDict`` with subset names (keys) and dictionaries with the glyph names, unicodes and CSS ``unicode-range`` of each subset (values). Empty subsets, and subsets without any encoded glyphs, are left out.
+
+    '''
+    tt_font = TTFont(font_path)
+    glyph_names = tt_font.getGlyphOrder()
+    cmap = tt_font.getBestCmap() or {}
+    tt_font.close()
+    if enc_path is not None:
+        subsets = plan_group_subsets(glyph_names, enc_path)
+    else:
+        subsets = plan_language_subsets(glyph_names, languages, min_glyphs)
+    glyph_unicodes = {}
+    for uni, glyph_name in cmap.items():
+        glyph_unicodes.setdefault(glyph_name, []).append(uni)
+    plan = OrderedDict()
+    for subset_name, subset_glyphs in subsets.items():
+        unicodes = []
+        for glyph_name in subset_glyphs:
+            unicodes += glyph_unicodes.get(glyph_name, [])
+        if len(unicodes):
+            plan[subset_name] = {
+                'glyph_names' : subset_glyphs,
+                'unicodes' : sorted(unicodes),
+                'unicode_range' : get_unicode_range(unicodes),
+            }
+    return plan
+
+def make_font_subsets(font_path, dst_folder, plan, flavor='woff2', css_path=None, family_name=None, workers=None, **options):
+    '''
+    Make the subset fonts of a subsets plan, and optionally a CSS file declaring them with their ``unicode-range``.
+
+    **plan** A subsets plan made with ``plan_font_subsets``.
+    **flavor** The format of the subset fonts: ``woff``, ``woff2``, or ``None`` for the format of the source font.
+    **options** Subsetting options for ``webfonts.SubsetService``.
+
+    Returns the list of results of ``SubsetService.run``.
+
+    '''
+    from hTools2.modules.webfonts import SubsetService, get_fontface_info, write_fontface
+    file_name, extension = os.path.splitext(os.path.split(font_path)[1])
+    if flavor is not None:
+        extension = '.%s' % flavor
+    service = SubsetService(font_path, **options)
+    subset_paths = OrderedDict()
+    for subset_name, subset in plan.items():
+        subset_paths[subset_name] = os.path.join(dst_folder, '%s-%s%s' % (file_name, subset_name, extension))
+        service.add(subset_paths[subset_name], glyph_names=subset['glyph_names'], flavor=flavor)
+    results = service.run(workers=workers)
+    if css_path is not None:
+        _family_name, weight, style = get_fontface_info(font_path)
+        if family_name is None:
+            family_name = _family_name
+        with open(css_path, 'w') as css_file:
+            for subset_name, subset in plan.items():
+                write_fontface(css_file, subset_paths[subset_name], family_name, weight, style,
+                            embed=False, unicode_range=subset['unicode_range'])
+    return results
@@ -17,8 +17,99 @@ class SuppressPrint(object):
     def __exit__(self, *args):
         sys.stdout = self.stdout
 
+def _get_key(obj):
+    '''Return a key identifying a font object, the same for all wrappers of the same font.'''
+    try:
+        return id(obj.naked())
+    except AttributeError:
+        return id(obj)
+
+def _get_glyph_font(glyph):
+    '''Return the font of ``glyph``, or ``None`` for glyphs without a font.'''
+    try:
+        return glyph.font
+    except AttributeError:
+        return glyph.getParent()
+
+class BatchChanges(object):
+
+    '''
+    An object to batch change notifications during font-wide operations.
+
+    Inside a ``with BatchChanges(font):`` block, notifications sent with ``glyph_changed`` for glyphs of ``font`` are collected, and the ``Glyph.Changed`` notifications posted by the font objects are held. Other notifications (for example glyph name changes) are still posted immediately, since the font depends on them. When the outermost block for the font exits, each changed glyph gets one notification, the held notifications are released (each one only once), and a single ``font.changed()`` is sent. Other fonts are not affected.
+
+    '''
+
+    #: Open batches by font key, with their nesting level and changed glyphs.
+    batches = {}
+
+    def __init__(self, font):
+        self.font = font
+        self.key = _get_key(font)
+        self.dispatcher = None
+
+    def __enter__(self):
+        if self.key not in BatchChanges.batches:
+            BatchChanges.batches[self.key] = { 'level' : 0, 'glyphs' : {} }
+        BatchChanges.batches[self.key]['level'] += 1
+        try:
+            self.dispatcher = self.font.naked().dispatcher
+            self.dispatcher.holdNotifications(notification='Glyph.Changed')
+        except AttributeError:
+            self.dispatcher = None
+        return self.font
+
+    def __exit__(self, *args):
+        batch = BatchChanges.batches[self.key]
+        batch['level'] -= 1
+        if batch['level'] == 0:
+            del BatchChanges.batches[self.key]
+            for glyph in batch['glyphs'].values():
+                _send_changed(glyph)
+        if self.dispatcher is not None:
+            self.dispatcher.releaseHeldNotifications(notification='Glyph.Changed')
+        font_changed(self.font)
+
 # functions
 
+def get_available_memory():
+    '''Return the available physical memory in bytes, or ``None`` if it cannot be measured.'''
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def _get_batch(font):
+    '''Return the open ``BatchChanges`` batch for ``font``, or ``None``.'''
+    if font is None or not BatchChanges.batches:
+        return None
+    return BatchChanges.batches.get(_get_key(font))
+
+def _send_changed(obj):
+    try:
+        obj.changed()
+    except AttributeError:
+        obj.update()
+
+def glyph_changed(glyph):
+    '''Send a change notification for ``glyph``. Inside a ``BatchChanges`` block for its font, the notification is sent once when the block exits.'''
+    batch = _get_batch(_get_glyph_font(glyph))
+    if batch is not None:
+        batch['glyphs'][_get_key(glyph)] = glyph
+        return
+    _send_changed(glyph)
+
+def font_changed(font):
+    '''Send a change notification for ``font``, unless inside a ``BatchChanges`` block for it.'''
+    if _get_batch(font) is not None:
+        return
+    _send_changed(font)
+
 def clean_pyc(directory, path):
     '''Remove all .pyc files recursively in path.'''
     for file_name in directory:
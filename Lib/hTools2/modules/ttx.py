@@ -2,11 +2,95 @@
 
 import os
 import time
+from io import BytesIO
 from fontTools.ttLib import TTFont
+from fontTools.misc.py23 import tounicode
 from hTools2.modules.sysutils import SuppressPrint
 from hTools2.extras.ElementTree import parse
 
-# functions
+#: The nameIDs which are cleared by ``strip_names``, to prevent a font from being installable on desktop OSs.
+STRIP_NAME_IDS = [1, 2, 4, 16, 17, 18]
+
+#: The text fields of the ``CFF `` top dict which can be edited with ``find_and_replace_cff``.
+CFF_ELEMENTS = ['version', 'Notice', 'Copyright', 'FullName', 'FamilyName', 'Weight']
+
+#-------------------
+# in-memory editing
+#-------------------
+
+def open_otf(otf_path):
+    '''
+    Open an .otf or .ttf font for editing.
+
+    Tables are only decompiled when they are used. The timestamp and bounding boxes are not recalculated, so tables which are not used are saved unchanged.
+
+    '''
+    return TTFont(otf_path, recalcBBoxes=False, recalcTimestamp=False)
+
+def save_otf(tt_font, otf_path):
+    '''
+    Save a font opened with ``open_otf``, and close it.
+
+    Only the tables which were used are compiled again, all other tables are copied from the source file. The original table order is kept. The font can be saved over its own source file.
+
+    '''
+    data = BytesIO()
+    tt_font.save(data, reorderTables=False)
+    tt_font.close()
+    with open(otf_path, 'wb') as otf_file:
+        otf_file.write(data.getvalue())
+
+def set_name_records(tt_font, names):
+    '''Set the text of all name records with the given nameIDs.
+
+    **names** A dictionary of nameIDs and texts.
+
+    '''
+    for record in tt_font['name'].names:
+        if record.nameID in names:
+            record.string = tounicode(names[record.nameID], encoding='utf-8')
+
+def strip_name_records(tt_font, nameIDs=STRIP_NAME_IDS):
+    '''Clear the name records with the given nameIDs.'''
+    set_name_records(tt_font, dict([(nameID, ' ') for nameID in nameIDs]))
+
+def find_and_replace_names(tt_font, find_string, replace_string):
+    '''Find and replace text in all name records. Returns the number of changed records.'''
+    count = 0
+    for record in tt_font['name'].names:
+        text = record.toUnicode()
+        if text.find(tounicode(find_string, encoding='utf-8')) != -1:
+            record.string = text.replace(tounicode(find_string, encoding='utf-8'), tounicode(replace_string, encoding='utf-8'))
+            count += 1
+    return count
+
+def find_and_replace_cff(tt_font, find_string, replace_string):
+    '''Find and replace text in the names of the ``CFF `` table. Returns the number of changed fields.'''
+    count = 0
+    if 'CFF ' not in tt_font:
+        return count
+    font_dict = tt_font['CFF '].cff.topDictIndex[0]
+    for element in CFF_ELEMENTS:
+        text = getattr(font_dict, element, None)
+        if text is not None and text.find(find_string) != -1:
+            setattr(font_dict, element, text.replace(find_string, replace_string))
+            count += 1
+    return count
+
+def strip_names_otf(otf_path, dest_path=None):
+    '''Clear several nameIDs in an .otf or .ttf font, to prevent it from being installable on desktop OSs.
+
+    **otf_path** Path of the font to be modified.
+    **dest_path** Path of the modified font. Use ``None`` to overwrite the font.
+
+    '''
+    tt_font = open_otf(otf_path)
+    strip_name_records(tt_font)
+    save_otf(tt_font, dest_path or otf_path)
+
+#-----------
+# ttx files
+#-----------
 
 def ttx2otf(ttx_path, otf_path=None):
     '''Generate an .otf font from a .ttx file.
@@ -47,12 +131,10 @@ def strip_names(ttx_path):
     **ttx_path** Path of the .ttx font to be modified.
 
     '''
-    # nameIDs which will be erased
-    nameIDs = [1, 2, 4, 16, 17, 18]
     tree = parse(ttx_path)
     root = tree.getroot()
     for child in root.find('name'):
-        if int(child.attrib['nameID']) in nameIDs:
+        if int(child.attrib['nameID']) in STRIP_NAME_IDS:
             child.text = ' '
     tree.write(ttx_path)
 
@@ -73,25 +155,16 @@ def set_unique_name(ttx_path, unique_name):
     tree.write(ttx_path)
 
 def fix_font_info(otf_path, family_name, style_name, version_major, version_minor, clear_ttx=True):
-    ttx_path = '%s.ttx' % os.path.splitext(otf_path)[0]
+    '''Set the version string and the unique name of an .otf font. Only the ``name`` table is rebuilt (``clear_ttx`` is kept for compatibility, no .ttx file is made).'''
     timestamp = time.strftime("%Y%m%d.%H%M%S", time.localtime())
     version_string = 'Version %s.%s' % (version_major, version_minor)
     unique_name = '%s %s: %s' % (family_name, style_name, timestamp)
-    otf2ttx(otf_path, ttx_path)
-    set_version_string(ttx_path, version_string)
-    set_unique_name(ttx_path, unique_name)
-    ttx2otf(ttx_path, otf_path)
-    if clear_ttx:
-        os.remove(ttx_path)
-
-def makeDSIG(tt_font):
-    '''
-    Add a dummy DSIG table to an OpenType-TTF font, so positioning features work in Office applications on Windows.
-
-    thanks to Ben Kiel on TypeDrawers:
-    http://typedrawers.com/discussion/192/making-ot-ttf-layout-features-work-in-ms-word-2010
+    tt_font = open_otf(otf_path)
+    set_name_records(tt_font, { 3 : unique_name, 5 : version_string })
+    save_otf(tt_font, otf_path)
 
-    '''
+def new_DSIG_table():
+    '''Return a dummy DSIG table (see ``makeDSIG``).'''
     from fontTools import ttLib
     from fontTools.ttLib.tables.D_S_I_G_ import SignatureRecord
     newDSIG = ttLib.newTable("DSIG")
@@ -107,7 +180,17 @@ def makeDSIG(tt_font):
     sig.ulFormat = 1
     sig.ulOffset = 20
     newDSIG.signatureRecords = [sig]
-    tt_font["DSIG"] = newDSIG
+    return newDSIG
+
+def makeDSIG(tt_font):
+    '''
+    Add a dummy DSIG table to an OpenType-TTF font, so positioning features work in Office applications on Windows.
+
+    thanks to Ben Kiel on TypeDrawers:
+    http://typedrawers.com/discussion/192/making-ot-ttf-layout-features-work-in-ms-word-2010
+
+    '''
+    tt_font["DSIG"] = new_DSIG_table()
     # ugly but necessary -> so all tables are added to ttfont
     # tt_font.lazy = False
     for key in tt_font.keys():
@@ -127,11 +210,15 @@ def extract_tables(otf_path, dest_folder, table_names=['name'], split=True):
     ttfont.saveXML(info_path, tables=table_names, splitTables=split)
 
 def find_and_replace_otf(otf_path, dest_path, find_string, replace_string, tables=['name']):
-    ttx_path = '%s.ttx' % os.path.splitext(otf_path)[0]
-    otf2ttx(otf_path, ttx_path)
-    find_and_replace_ttx(ttx_path, find_string, replace_string, tables)
-    ttx2otf(ttx_path, dest_path)
-    os.remove(ttx_path)
+    '''Find and replace text in the ``name`` and/or ``CFF `` tables of an .otf font, and save the result in ``dest_path``. Only the modified tables are rebuilt. Returns the number of changes.'''
+    count = 0
+    tt_font = open_otf(otf_path)
+    if 'name' in tables:
+        count += find_and_replace_names(tt_font, find_string, replace_string)
+    if 'CFF ' in tables:
+        count += find_and_replace_cff(tt_font, find_string, replace_string)
+    save_otf(tt_font, dest_path)
+    return count
 
 def find_and_replace_ttx(ttx_path, find_string, replace_string, tables=['name']):
     count = 0
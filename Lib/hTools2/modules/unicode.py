@@ -1,6 +1,8 @@
 # [h] hTools2.modules.unicode
 
 from collections import OrderedDict
+from hTools2.modules.sysutils import BatchChanges, glyph_changed, font_changed
+from hTools2.modules.backends import set_auto_unicodes
 
 '''Tools to work with Unicode, convert glyph names to hex/unicode etc.'''
 
@@ -8,21 +10,21 @@ def clear_unicodes(font):
     '''Remove unicodes from all glyphs in the font.'''
     for g in font:
         g.unicodes = []
-    font.update()
+    font_changed(font)
 
 def auto_unicodes(font, custom_unicodes={}):
     '''Automatically set unicode values for all glyphs in the font.'''
-    clear_unicodes(font)
-    for g in font:
-        if g is not None:
-            auto_unicode(g, custom_unicodes)
-    font.update()
+    with BatchChanges(font):
+        clear_unicodes(font)
+        for g in font:
+            if g is not None:
+                auto_unicode(g, custom_unicodes)
 
 def auto_unicode(g, custom_unicodes={}):
     '''
     Automatically set unicode value(s) for the specified glyph.
 
-    The method uses RoboFab's ``glyph.autoUnicodes()`` function for common glyphs, and complements it with additional values from ``unicodes_extra``.
+    The method uses the font backend's ``glyph.autoUnicodes()`` function for common glyphs, and complements it with additional values from ``unicodes_extra``.
 
     '''
 
@@ -43,9 +45,9 @@ def auto_unicode(g, custom_unicodes={}):
             uString = 'uni%s' % custom_unicodes[g.name]
             g.unicode = unicode_hexstr_to_int(uString)
         else:
-            g.autoUnicodes()
+            set_auto_unicodes(g)
 
-        g.update()
+        glyph_changed(g)
 
 #------------------------------
 # unicode-to-string conversion
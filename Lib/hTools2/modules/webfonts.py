@@ -3,7 +3,7 @@
 '''
 A collection of tools for working with webfonts.
 
-Some functions in this module require external C libraries:
+WOFF and WOFF2 fonts are compressed with fontTools (WOFF2 requires the ``brotli`` module). Some functions in this module require external C libraries:
 
 - [ttfautohint](http://freetype.org/ttfautohint/)
 - [sfnt2woff](http://people.mozilla.org/~jkew/woff/)
@@ -13,14 +13,19 @@ Some functions in this module require external C libraries:
 '''
 
 import os
+import time
+import json
 import shutil
+import hashlib
+import cPickle
+import traceback
+from multiprocessing import Pool
 from base64 import b64encode
-from mojo.roboFont import OpenFont
-from mojo.compile import executeCommand, hasTTFAutoHint
-from lib.tools.bezierTools import curveConverter
-from hTools2.modules.ttx import otf2ttx, ttx2otf
-from hTools2.modules.ttx import strip_names as ttx_strip_names
+from io import BytesIO
+from fontTools.ttLib import TTFont
+from hTools2.modules.ttx import strip_names_otf, open_otf, set_name_records, strip_name_records, new_DSIG_table
 from hTools2.modules.sysutils import SuppressPrint
+from hTools2.modules.backends import open_font, execute_command
 
 #--------------------
 # higher-level tools
@@ -32,13 +37,8 @@ def generate_webfont(otf_path, strip_names=False, woff=True, woff_path=None, wof
 
     # strip font infos (webfont obfuscation)
     if strip_names:
-        ttx_path = '%s.ttx' % file_name
-        otf2ttx(otf_path, ttx_path)
-        ttx_strip_names(ttx_path)
-        otf_path_tmp = '%s_tmp.otf' % file_name
-        ttx2otf(ttx_path, otf_path_tmp)
-        if clear_ttx:
-            os.remove(ttx_path)
+        otf_path_tmp = '%s_tmp%s' % (file_name, extension)
+        strip_names_otf(otf_path, otf_path_tmp)
         otf_path = otf_path_tmp
 
     # generate woff
@@ -95,36 +95,382 @@ def subset_font(src_path, dst_path, enc_path, remove_features=True, remove_kerni
     # done
     return os.path.exists(dst_path)
 
+def get_subset_options(remove_features=True, remove_kerning=False, remove_hinting=False, strip_names=False):
+    '''Return fontTools subsetting options matching the arguments of ``subset_font``.'''
+    from fontTools import subset
+    options = subset.Options()
+    if strip_names:
+        options.obfuscate_names = True
+    else:
+        options.name_IDs = ['*']
+        options.name_languages = [0, 1033]
+        options.name_legacy = True
+    if remove_features:
+        if not remove_kerning:
+            options.legacy_kern = True
+            options.layout_features = ['kern']
+        else:
+            options.layout_features = []
+    else:
+        options.layout_features = ['*']
+    options.hinting = not remove_hinting
+    return options
+
+#-----------
+# pipelines
+#-----------
+
+class FontPipeline(object):
+
+    '''
+    Apply several post-processing stages to a binary font, and save it in different formats, loading the font only once.
+
+    .. code-block:: python
+
+        pipeline = FontPipeline('MyFont.otf')
+        pipeline.add('version', 'Version 1.2')
+        pipeline.add('dsig')
+        pipeline.add('subset', ['A', 'B', 'C'], remove_hinting=True)
+        pipeline.save(otf_path='MyFont-web.otf', woff_path='MyFont.woff', woff2_path='MyFont.woff2')
+
+    WOFF and WOFF2 files are written by fontTools (WOFF2 requires the ``brotli`` module).
+
+    '''
+
+    #: The available stages.
+    stage_names = ['version', 'unique_name', 'dsig', 'strip_names', 'subset']
+
+    def __init__(self, otf_path):
+        self.otf_path = otf_path
+        self.stages = []
+        self.tt_font = None
+
+    def add(self, stage_name, *args, **kwargs):
+        '''Add a stage to the pipeline. Stages are applied in the order in which they are added.'''
+        if stage_name not in self.stage_names:
+            raise ValueError('unknown stage: %s' % stage_name)
+        self.stages.append((stage_name, args, kwargs))
+        return self
+
+    def run(self):
+        '''Load the font and apply all stages. Returns the modified ``TTFont`` object.'''
+        if self.tt_font is None:
+            self.tt_font = open_otf(self.otf_path)
+            for stage_name, args, kwargs in self.stages:
+                stage = getattr(self, 'stage_%s' % stage_name)
+                stage(*args, **kwargs)
+        return self.tt_font
+
+    def save(self, otf_path=None, woff_path=None, woff2_path=None):
+        '''
+        Save the processed font in one or more formats.
+
+        Returns a list with the paths of the saved files.
+
+        '''
+        tt_font = self.run()
+        outputs = [(otf_path, None), (woff_path, 'woff'), (woff2_path, 'woff2')]
+        # compile all outputs before writing (output paths may overwrite the source font)
+        font_data = []
+        for path, flavor in outputs:
+            if path is not None:
+                data = BytesIO()
+                tt_font.flavor = flavor
+                tt_font.save(data, reorderTables=False)
+                font_data.append((path, data.getvalue()))
+        tt_font.flavor = None
+        saved = []
+        for path, data in font_data:
+            with open(path, 'wb') as font_file:
+                font_file.write(data)
+            saved.append(path)
+        return saved
+
+    def close(self):
+        '''Release the loaded font.'''
+        if self.tt_font is not None:
+            self.tt_font.close()
+            self.tt_font = None
+
+    # stages
+
+    def stage_version(self, version_string):
+        set_name_records(self.tt_font, { 5 : version_string })
+
+    def stage_unique_name(self, unique_name):
+        set_name_records(self.tt_font, { 3 : unique_name })
+
+    def stage_dsig(self):
+        self.tt_font['DSIG'] = new_DSIG_table()
+
+    def stage_strip_names(self):
+        strip_name_records(self.tt_font)
+
+    def stage_subset(self, glyph_names, remove_features=True, remove_kerning=False, remove_hinting=False):
+        '''Subset the font to ``glyph_names``, with the same options as ``subset_font``.'''
+        from fontTools import subset
+        options = get_subset_options(remove_features, remove_kerning, remove_hinting)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(glyphs=[glyph_name for glyph_name in glyph_names if glyph_name in self.tt_font.getGlyphOrder()])
+        # keep a DSIG table added by an earlier stage
+        dsig = self.tt_font['DSIG'] if 'DSIG' in self.tt_font else None
+        subsetter.subset(self.tt_font)
+        if dsig is not None:
+            self.tt_font['DSIG'] = dsig
+
+#-----------
+# subsetting
+#-----------
+
+#: The source font data and subsetting options of a worker process (see ``SubsetService``).
+_subset_source = None
+
+def get_font_snapshot(data):
+    '''Parse binary font data, with all tables, and return the parsed ``TTFont`` as a pickled string. Loading the snapshot gives a new copy of the font without parsing its tables again.'''
+    tt_font = TTFont(BytesIO(data), recalcBBoxes=False, recalcTimestamp=False)
+    for tag in tt_font.keys():
+        tt_font[tag]
+    tt_font.reader = None
+    return cPickle.dumps(tt_font, cPickle.HIGHEST_PROTOCOL)
+
+def _init_subset_worker(data, options):
+    '''Keep the source font data in a worker process, so it is sent only once per process. The font is parsed by the first job in each process.'''
+    global _subset_source
+    _subset_source = {
+        'data' : data,
+        'options' : options,
+        'snapshot' : None,
+    }
+
+def _subset_job(job):
+    '''Make one subset from the source font data. Runs in a worker process, so errors are returned instead of raised.'''
+    from fontTools import subset
+    dst_path, glyph_names, flavor = job
+    source = _subset_source
+    result = {
+        'path' : dst_path,
+        'status' : 'ok',
+        'error' : None,
+        'glyphs' : None,
+    }
+    start = time.time()
+    try:
+        if source['snapshot'] is None:
+            source['snapshot'] = get_font_snapshot(source['data'])
+        tt_font = cPickle.loads(source['snapshot'])
+        subsetter = subset.Subsetter(get_subset_options(**source['options']))
+        subsetter.populate(glyphs=glyph_names)
+        subsetter.subset(tt_font)
+        tt_font.flavor = flavor
+        tt_font.save(dst_path)
+        result['glyphs'] = len(tt_font.getGlyphOrder())
+        tt_font.close()
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    result['time'] = time.time() - start
+    return result
+
+class SubsetService(object):
+
+    '''
+    Make many subsets of one font, reading the font file only once.
+
+    .. code-block:: python
+
+        service = SubsetService('MyFont.otf', remove_hinting=True)
+        service.add('MyFont-latin.woff', enc_path='latin.enc', flavor='woff')
+        service.add('MyFont-greek.woff', unicodes=range(0x0370, 0x0400), flavor='woff')
+        results = service.run(workers=4)
+
+    Glyph names and unicodes are resolved against the source glyph order and cmap, which are read once. Subsets are made in a pool of worker processes, each receiving the source font data once and parsing it once. The fontTools subsetter modifies the font it works on, so every subset is made on its own copy of the parsed font, loaded from a snapshot (see ``get_font_snapshot``).
+
+    '''
+
+    def __init__(self, src_path, remove_features=True, remove_kerning=False, remove_hinting=False, strip_names=False):
+        self.src_path = src_path
+        self.options = {
+            'remove_features' : remove_features,
+            'remove_kerning' : remove_kerning,
+            'remove_hinting' : remove_hinting,
+            'strip_names' : strip_names,
+        }
+        with open(src_path, 'rb') as src_file:
+            self.data = src_file.read()
+        tt_font = TTFont(BytesIO(self.data))
+        self.glyph_order = tt_font.getGlyphOrder()
+        self.cmap = tt_font.getBestCmap() or {}
+        tt_font.close()
+        self.jobs = []
+
+    def get_glyph_names(self, glyph_names=None, unicodes=None, enc_path=None):
+        '''Return the names of the glyphs in the font which match a list of glyph names, a list of unicodes and/or an encoding file.'''
+        names = set()
+        if enc_path is not None:
+            from hTools2.modules.encoding import import_encoding
+            names.update(import_encoding(enc_path) or [])
+        if glyph_names is not None:
+            names.update(glyph_names)
+        if unicodes is not None:
+            names.update([self.cmap[uni] for uni in unicodes if uni in self.cmap])
+        return [glyph_name for glyph_name in self.glyph_order if glyph_name in names]
+
+    def add(self, dst_path, glyph_names=None, unicodes=None, enc_path=None, flavor=None):
+        '''Add a subset to be made. ``flavor`` can be ``woff`` or ``woff2`` for compressed output.'''
+        self.jobs.append((dst_path, self.get_glyph_names(glyph_names, unicodes, enc_path), flavor))
+        return self
+
+    def run(self, workers=None, callback=None):
+        '''
+        Make all subsets, in parallel.
+
+        **workers** The number of worker processes. Use ``None`` for one process per CPU, or ``1`` to make all subsets in the current process.
+
+        The result of each subset is passed to ``callback`` as soon as it is done. Returns a list of result dictionaries, with the status, error traceback, number of glyphs and time of each subset.
+
+        '''
+        jobs = self.jobs
+        self.jobs = []
+        pool = None
+        if workers == 1:
+            _init_subset_worker(self.data, self.options)
+            results_iter = (_subset_job(job) for job in jobs)
+        else:
+            pool = Pool(workers, initializer=_init_subset_worker, initargs=(self.data, self.options))
+            results_iter = pool.imap_unordered(_subset_job, jobs)
+        results = []
+        try:
+            for result in results_iter:
+                if callback is not None:
+                    callback(result)
+                results.append(result)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        paths = [job[0] for job in jobs]
+        results.sort(key=lambda result: paths.index(result['path']))
+        return results
+
 #------------
 # WOFF tools
 #------------
 
-def sfnt2woff(otf_path, woff_path=None):
+def compress_font(font, dst=None, flavor='woff'):
+    '''
+    Compress an .otf or .ttf font to WOFF or WOFF2 with fontTools, without external tools or temporary files.
+
+    **font** The path of the font, or a ``TTFont`` object.
+    **dst** The path or file object to write the compressed font to. Use ``None`` to return it as a string of bytes.
+    **flavor** The output format, ``woff`` or ``woff2``.
+
+    '''
+    if isinstance(font, basestring):
+        tt_font = open_otf(font)
+    else:
+        tt_font = font
+    data = BytesIO()
+    _flavor = tt_font.flavor
+    tt_font.flavor = flavor
+    try:
+        tt_font.save(data, reorderTables=False)
+    finally:
+        tt_font.flavor = _flavor
+    if tt_font is not font:
+        tt_font.close()
+    if dst is None:
+        return data.getvalue()
+    if hasattr(dst, 'write'):
+        dst.write(data.getvalue())
+    else:
+        with open(dst, 'wb') as font_file:
+            font_file.write(data.getvalue())
+    return dst
+
+def sfnt2woff(otf_path, woff_path=None, external=False):
     '''
     Generate a .woff file from an .otf or .ttf font.
 
-    Requires ``sfnt2woff`` installed on your system.
+    The font is compressed with fontTools, or with the external ``sfnt2woff`` tool if ``external`` is ``True``.
 
     '''
+    if not external:
+        if woff_path is None:
+            woff_path = '%s.woff' % os.path.splitext(otf_path)[0]
+        compress_font(otf_path, woff_path, 'woff')
+        return
     command = ['sfnt2woff', "%s" % otf_path]
-    executeCommand(command, shell=True)
+    execute_command(command, shell=True)
     woff_path_temp = '%s.woff' % os.path.splitext(otf_path)[0]
     if woff_path is not None and os.path.exists(woff_path_temp):
         shutil.move(woff_path_temp, woff_path)
 
+def benchmark_woff(otf_path, flavor='woff', repeat=5, verbose=True):
+    '''
+    Compare the time to compress a font with fontTools and with the external tool (``sfnt2woff`` or ``woff2_compress``).
+
+    Returns a dictionary with the best time of each method, in seconds (``None`` if a method failed).
+
+    '''
+    import tempfile
+    tmp_folder = tempfile.mkdtemp()
+    font_file = os.path.split(otf_path)[1]
+    src_path = os.path.join(tmp_folder, font_file)
+    shutil.copy(otf_path, src_path)
+    dst_path = os.path.join(tmp_folder, '%s.%s' % (os.path.splitext(font_file)[0], flavor))
+    compress = { 'woff' : sfnt2woff, 'woff2' : woff2_compress }[flavor]
+    times = {}
+    for method, external in [('fontTools', False), ('external', True)]:
+        times[method] = None
+        for i in range(repeat):
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            start = time.time()
+            try:
+                compress(src_path, dst_path, external=external)
+            except Exception:
+                times[method] = None
+                break
+            if not os.path.exists(dst_path):
+                times[method] = None
+                break
+            t = time.time() - start
+            if times[method] is None or t < times[method]:
+                times[method] = t
+    shutil.rmtree(tmp_folder)
+    if verbose:
+        print 'compressing %s to %s (best of %s):\n' % (font_file, flavor, repeat)
+        for method in ['fontTools', 'external']:
+            if times[method] is None:
+                print '\t%s: failed' % method
+            else:
+                print '\t%s: %.4f s' % (method, times[method])
+        print
+    return times
+
 #-------------
 # WOFF2 tools
 #-------------
 
-def woff2_compress(otf_path, woff_path=None):
+def woff2_compress(otf_path, woff_path=None, external=False):
     '''
     Generate a .woff2 file from an .otf or .ttf font.
 
-    Requires ``woff2_compress`` installed on your system.
+    The font is compressed with fontTools, or with the external ``woff2_compress`` tool if ``external`` is ``True`` or if the ``brotli`` module is not installed.
 
     '''
+    if not external:
+        try:
+            import brotli
+        except ImportError:
+            external = True
+    if not external:
+        if woff_path is None:
+            woff_path = '%s.woff2' % os.path.splitext(otf_path)[0]
+        compress_font(otf_path, woff_path, 'woff2')
+        return
     command = ['woff2_compress', "%s" % otf_path]
-    executeCommand(command, shell=True)
+    execute_command(command, shell=True)
     woff_path_temp = '%s.woff2' % os.path.splitext(otf_path)[0]
     if woff_path is not None and os.path.exists(woff_path_temp):
         shutil.move(woff_path_temp, woff_path)
@@ -140,7 +486,8 @@ def otf2ttf(otf_path, ttf_path):
     Requires RoboFont.
 
     '''
-    otf_font = OpenFont(otf_path, showInterface=False)
+    from lib.tools.bezierTools import curveConverter
+    otf_font = open_font(otf_path)
     ### is this curve conversion really necessary?
     ### some scripts do just `font.generate('myfont.ttf', 'ttf')`
     coreFont = otf_font.naked()
@@ -164,7 +511,7 @@ def autohint_ttf(ttf_path, ttfautohinted_path):
     ttfautohint_options = []
     ttfautohint_command = ['ttfautohint'] + \
         ttfautohint_options + [ttf_path, ttfautohinted_path]
-    executeCommand(ttfautohint_command, shell=True)
+    execute_command(ttfautohint_command, shell=True)
     return os.path.exists(ttfautohinted_path)
 
 def autohint_ttfs(folder_ttfs, folder_ttfs_autohint):
@@ -191,7 +538,7 @@ def ttf2eot(ttf_path, eot_path):
 
     '''
     eot_command = ['ttf2eot', '<', ttf_path, '>', eot_path]
-    executeCommand(eot_command, shell=True)
+    execute_command(eot_command, shell=True)
     return os.path.exists(eot_path)
 
 def generate_eots(folder_ttfs, folder_eots):
@@ -200,8 +547,204 @@ def generate_eots(folder_ttfs, folder_eots):
         file_name, extension = os.path.splitext(file_)
         if extension == '.ttf':
             ttf_path = os.path.join(folder_ttfs, file_)
-            eot_path = os.path.join(folder_ttfs, '%s.eot' % file_name)
-            generate_eot(ttf_path, eot_path)
+            eot_path = os.path.join(folder_eots, '%s.eot' % file_name)
+            ttf2eot(ttf_path, eot_path)
+
+#--------------
+# webfont kits
+#--------------
+
+#: The formats in a webfont kit. ``otf`` and ``ttf`` are the processed font in its own format.
+KIT_FORMATS = ['otf', 'ttf', 'woff', 'woff2', 'eot']
+
+#: The name of the file which records the options of each kit, saved in the folder of the webfont kits.
+KIT_CACHE = '.hTools2-kit-cache.json'
+
+def get_kit_paths(src_path, dst_folder, formats):
+    '''Return a dictionary with the output path for each format of a webfont kit.'''
+    file_name = os.path.splitext(os.path.split(src_path)[1])[0]
+    return dict([(format_, os.path.join(dst_folder, '%s.%s' % (file_name, format_))) for format_ in formats])
+
+def get_kit_format_applies(format_, extension):
+    '''Return ``True`` if a webfont kit format can be made from a font with the given extension: ``otf`` and ``ttf`` only from fonts in the same format, and ``eot`` only from .ttf fonts.'''
+    if format_ == 'otf':
+        return extension == 'otf'
+    if format_ in ['ttf', 'eot']:
+        return extension == 'ttf'
+    return True
+
+def get_kit_options(formats, autohint=False, subset=None, strip_names=False):
+    '''Return a fingerprint of the options used to make a webfont kit.'''
+    options = {
+        'formats' : sorted(formats),
+        'autohint' : autohint,
+        'subset' : subset,
+        'strip_names' : strip_names,
+    }
+    return hashlib.sha1(json.dumps(options, sort_keys=True)).hexdigest()
+
+def read_kit_cache(dst_folder):
+    '''Read the options recorded for the webfont kits in a folder. Returns a dictionary of source font file names and option fingerprints.'''
+    cache_path = os.path.join(dst_folder, KIT_CACHE)
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except ValueError:
+            pass
+    return {}
+
+def write_kit_cache(dst_folder, cache):
+    '''Save the options recorded for the webfont kits in a folder.'''
+    cache_path = os.path.join(dst_folder, KIT_CACHE)
+    with open(cache_path, 'w') as cache_file:
+        json.dump(cache, cache_file, indent=2, sort_keys=True)
+
+def kit_is_up_to_date(src_path, kit_paths, options=None, kit_options=None):
+    '''
+    Return ``True`` if all files of a webfont kit exist and are newer than their source font.
+
+    **options** The fingerprint of the current options (see ``get_kit_options``). If given, the kit is only up-to-date if it was made with the same options, as recorded in ``kit_options``.
+
+    '''
+    if options is not None and options != kit_options:
+        return False
+    src_mtime = os.path.getmtime(src_path)
+    for kit_path in kit_paths.values():
+        if not os.path.exists(kit_path) or os.path.getmtime(kit_path) < src_mtime:
+            return False
+    return True
+
+def _webfont_kit_job(job):
+    '''Generate the webfont kit for one font. Runs in a worker process, so errors are returned instead of raised.'''
+    src_path, dst_folder, formats, autohint, subset, strip_names, force, kit_options = job
+    result = {
+        'path' : src_path,
+        'status' : 'ok',
+        'error' : None,
+        'outputs' : [],
+        'times' : {},
+    }
+    start = time.time()
+    extension = os.path.splitext(src_path)[1][1:].lower()
+    options = get_kit_options(formats, autohint, subset, strip_names)
+    # skip formats which cannot be made from this font
+    formats = [format_ for format_ in formats if get_kit_format_applies(format_, extension)]
+    kit_paths = get_kit_paths(src_path, dst_folder, formats)
+    if not force and kit_is_up_to_date(src_path, kit_paths, options, kit_options):
+        result['status'] = 'skipped'
+        result['time'] = time.time() - start
+        return result
+    file_name = os.path.splitext(os.path.split(src_path)[1])[0]
+    font_path = src_path
+    eot_src = None
+    try:
+        # autohint
+        if autohint and extension == 'ttf':
+            step_start = time.time()
+            font_path = os.path.join(dst_folder, '%s_autohint.ttf' % file_name)
+            if not autohint_ttf(src_path, font_path):
+                raise IOError('ttfautohint failed for %s' % src_path)
+            result['times']['autohint'] = time.time() - step_start
+        # process and save all sfnt formats from one load
+        step_start = time.time()
+        pipeline = FontPipeline(font_path)
+        if subset is not None:
+            pipeline.add('subset', subset)
+        if strip_names:
+            pipeline.add('strip_names')
+        sfnt_path = kit_paths.get(extension)
+        # the .eot is made from the processed .ttf, saved to a temporary file if not in the kit
+        if 'eot' in formats and sfnt_path is None:
+            eot_src = sfnt_path = os.path.join(dst_folder, '%s_eot.ttf' % file_name)
+        saved = pipeline.save(
+                    otf_path=sfnt_path,
+                    woff_path=kit_paths.get('woff'),
+                    woff2_path=kit_paths.get('woff2'))
+        pipeline.close()
+        result['outputs'] += [path for path in saved if path != eot_src]
+        result['times']['sfnt'] = time.time() - step_start
+        # eot
+        if 'eot' in formats:
+            step_start = time.time()
+            if not ttf2eot(sfnt_path, kit_paths['eot']):
+                raise IOError('ttf2eot failed for %s' % src_path)
+            result['outputs'].append(kit_paths['eot'])
+            result['times']['eot'] = time.time() - step_start
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    # clear temporary files
+    for tmp_path in [font_path, eot_src]:
+        if tmp_path is not None and tmp_path != src_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    result['time'] = time.time() - start
+    return result
+
+def generate_webfont_kits(src_folder, dst_folder, formats=['woff', 'woff2'], workers=None, autohint=False, subset=None, strip_names=False, force=False, callback=None, verbose=True):
+    '''
+    Generate webfont kits for all .otf and .ttf fonts in a folder, in parallel.
+
+    **formats** A list of output formats (see ``KIT_FORMATS``). Formats which cannot be made from a font are skipped for that font (see ``get_kit_format_applies``).
+    **workers** The number of worker processes. Use ``None`` for one process per CPU, or ``1`` to process all fonts in the current process.
+    **autohint** Run ``ttfautohint`` on .ttf fonts before making the other formats.
+    **subset** A list of glyph names to subset the fonts to, or ``None``.
+    **strip_names** Clear the font names (see ``ttx.strip_name_records``).
+    **force** Generate all kits, also those which are newer than their source fonts and were made with the same options.
+
+    The result of each font is passed to ``callback`` as soon as it is done. Returns a list of result dictionaries, with the status (``ok``, ``skipped`` or ``error``), the error traceback, the output paths and the time for each step.
+
+    '''
+    unknown = [format_ for format_ in formats if format_ not in KIT_FORMATS]
+    if len(unknown):
+        raise ValueError('unknown formats: %s' % ', '.join(unknown))
+    if not os.path.exists(dst_folder):
+        os.makedirs(dst_folder)
+    src_paths = []
+    for file_ in sorted(os.listdir(src_folder)):
+        if os.path.splitext(file_)[1].lower() in ['.otf', '.ttf']:
+            src_paths.append(os.path.join(src_folder, file_))
+    # options of existing kits
+    kit_cache = read_kit_cache(dst_folder)
+    jobs = []
+    for src_path in src_paths:
+        kit_options = kit_cache.get(os.path.split(src_path)[1])
+        jobs.append((src_path, dst_folder, formats, autohint, subset, strip_names, force, kit_options))
+    if verbose:
+        print 'generating webfont kits for %s fonts...\n' % len(jobs)
+    pool = None
+    if workers == 1:
+        results_iter = (_webfont_kit_job(job) for job in jobs)
+    else:
+        pool = Pool(workers)
+        results_iter = pool.imap_unordered(_webfont_kit_job, jobs)
+    results = []
+    try:
+        for result in results_iter:
+            if verbose:
+                print '\t%s (%.2f s): %s' % (os.path.split(result['path'])[1], result['time'], result['status'])
+                if result['error'] is not None:
+                    print result['error']
+            if callback is not None:
+                callback(result)
+            results.append(result)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    # record the options of new kits
+    options = get_kit_options(formats, autohint, subset, strip_names)
+    for result in results:
+        src_file = os.path.split(result['path'])[1]
+        if result['status'] == 'ok':
+            kit_cache[src_file] = options
+        elif result['status'] == 'error':
+            kit_cache.pop(src_file, None)
+    write_kit_cache(dst_folder, kit_cache)
+    results.sort(key=lambda result: src_paths.index(result['path']))
+    if verbose:
+        print '\n...done.\n'
+    return results
 
 #-----------
 # SVG tools
@@ -233,3 +776,78 @@ def make_base64_fontface_woff(font_name, base64_font):
     font_face = '''@font-face { font-family: '%s'; src:url(data:application/x-font-woff;charset=utf-8;base64,%s) format('woff') }''' % (font_name, base64_font)
     return font_face
 
+
+#: The size of the chunks read by ``write_base64``. Must be a multiple of 3, so that the encoded chunks can be joined.
+BASE64_CHUNK_SIZE = 3 * 16384
+
+#: The MIME type and CSS format name for each font file extension.
+FONT_FORMATS = {
+    '.woff'  : ('application/x-font-woff', 'woff'),
+    '.woff2' : ('font/woff2', 'woff2'),
+    '.otf'   : ('font/opentype', 'opentype'),
+    '.ttf'   : ('font/truetype', 'truetype'),
+}
+
+def write_base64(font_path, dst_file, chunk_size=BASE64_CHUNK_SIZE):
+    '''Write a font at a given path to an open file in base64 encoding, one chunk at a time.'''
+    with open(font_path, 'rb') as font_file:
+        while True:
+            chunk = font_file.read(chunk_size)
+            if not chunk:
+                break
+            dst_file.write(b64encode(chunk))
+
+def get_fontface_info(font_path):
+    '''Get the family name, CSS weight and CSS style of a font, reading only its ``name`` and ``OS/2`` tables.'''
+    tt_font = open_otf(font_path)
+    name = tt_font['name']
+    family_name = name.getName(16, 3, 1) or name.getName(1, 3, 1) or name.getName(1, 1, 0)
+    if family_name is not None:
+        family_name = family_name.toUnicode()
+    weight = tt_font['OS/2'].usWeightClass
+    style = 'italic' if tt_font['OS/2'].fsSelection & 1 else 'normal'
+    tt_font.close()
+    return family_name, weight, style
+
+def write_fontface(css_file, font_path, font_name, weight='normal', style='normal', embed=True, url=None, unicode_range=None):
+    '''
+    Write a CSS ``@font-face`` rule for a font to an open file.
+
+    **embed** Embed the font as base64 data (written in chunks), or link to it.
+    **url** The url of the font if not embedded. Use ``None`` for the font's file name.
+    **unicode_range** A CSS ``unicode-range`` value for the font, or ``None``.
+
+    '''
+    mime_type, format_name = FONT_FORMATS[os.path.splitext(font_path)[1].lower()]
+    if isinstance(font_name, unicode):
+        font_name = font_name.encode('utf-8')
+    css_file.write("@font-face { font-family: '%s'; font-weight: %s; font-style: %s; " % (font_name, weight, style))
+    if unicode_range is not None:
+        css_file.write("unicode-range: %s; " % unicode_range)
+    if embed:
+        css_file.write('src:url(data:%s;charset=utf-8;base64,' % mime_type)
+        write_base64(font_path, css_file)
+        css_file.write(")")
+    else:
+        if url is None:
+            url = os.path.split(font_path)[1]
+        css_file.write("src:url('%s')" % url)
+    css_file.write(" format('%s') }\n" % format_name)
+
+def generate_css_kit(css_path, font_paths, family_name=None, embed=True):
+    '''
+    Generate one CSS file with ``@font-face`` rules for all weights and styles of a family.
+
+    **font_paths** A list of paths of .woff, .woff2, .otf or .ttf fonts.
+    **family_name** The CSS font family name. Use ``None`` to read it from each font.
+    **embed** Embed the fonts as base64 data, or link to them.
+
+    Fonts are encoded and written one chunk at a time, so memory use does not depend on the size of the fonts.
+
+    '''
+    with open(css_path, 'w') as css_file:
+        for font_path in font_paths:
+            _family_name, weight, style = get_fontface_info(font_path)
+            if family_name is not None:
+                _family_name = family_name
+            write_fontface(css_file, font_path, _family_name, weight, style, embed)
@@ -17,5 +17,9 @@ setup(name='hTools2',
         'hTools2.dialogs',
         'hTools2.extras',
     ],
-    package_dir={'hTools2': 'Lib/hTools2'}
+    package_dir={'hTools2': 'Lib/hTools2'},
+    extras_require={
+        # generate .otfs outside RoboFont
+        'generate': ['ufo2ft'],
+    }
 )
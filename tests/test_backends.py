@@ -0,0 +1,92 @@
+# [h] tests for hTools2.modules.backends
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hTools2.modules.backends import new_font, auto_contour_order, add_extremes, FontProxy, FontInfoProxy
+
+def make_glyph():
+    font = new_font()
+    font.newGlyph('b')
+    glyph = font.newGlyph('a')
+    pen = glyph.getPen()
+    # curve without extreme point at the top
+    pen.moveTo((0, 0))
+    pen.curveTo((0, 100), (200, 100), (200, 0))
+    pen.closePath()
+    # triangle
+    pen.moveTo((500, 0))
+    pen.lineTo((600, 0))
+    pen.lineTo((600, 100))
+    pen.closePath()
+    glyph.appendComponent('b', (10, 20))
+    return glyph
+
+class ContourToolsTest(unittest.TestCase):
+
+    def test_add_extremes(self):
+        glyph = make_glyph()
+        add_extremes(glyph)
+        points = [(p.x, p.y, p.type) for p in glyph.contours[0].points]
+        self.assertIn((100, 75, 'curve'), points)
+        self.assertEqual(len(points), 7)
+        self.assertEqual(glyph.bounds, (0, 0, 600, 100))
+        self.assertEqual(len(glyph.components), 1)
+
+    def test_add_extremes_only_once(self):
+        glyph = make_glyph()
+        add_extremes(glyph)
+        contours = list(glyph.naked())
+        add_extremes(glyph)
+        self.assertEqual(list(glyph.naked()), contours)
+
+    def test_auto_contour_order(self):
+        glyph = make_glyph()
+        auto_contour_order(glyph)
+        self.assertEqual([len(c.points) for c in glyph.contours], [3, 4])
+        self.assertEqual(len(glyph.components), 1)
+
+    def test_outline_import(self):
+        from hTools2.modules.outline import expand_glyph, make_outline
+        glyph = make_glyph()
+        pen = make_outline(glyph, 10, 1, 1)
+        self.assertTrue(hasattr(pen, 'drawPoints'))
+
+class FontProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ufo_path = os.path.join(self.folder, 'test.ufo')
+        font = new_font()
+        font.info.familyName = 'Test'
+        font.newGlyph('a')
+        font.save(self.ufo_path)
+        font.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_lazy_info(self):
+        proxy = FontProxy(self.ufo_path)
+        self.assertEqual(proxy.info.familyName, 'Test')
+        self.assertEqual(proxy.info.styleName, None)
+        self.assertEqual(len(proxy), 1)
+        self.assertFalse(proxy.loaded())
+
+    def test_info_changes_kept(self):
+        proxy = FontProxy(self.ufo_path)
+        proxy.info.styleName = 'Bold'
+        self.assertTrue(proxy.loaded())
+        self.assertEqual(proxy.info.styleName, 'Bold')
+        proxy.save()
+        proxy.release()
+        self.assertEqual(FontProxy(self.ufo_path).info.styleName, 'Bold')
+
+    def test_read_only_info(self):
+        info = FontInfoProxy(self.ufo_path)
+        self.assertRaises(AttributeError, setattr, info, 'styleName', 'Bold')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# [h] tests for hTools2.modules.batch
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from hTools2.modules.backends import new_font, open_font, can_generate
+from hTools2.modules.batch import batch_fonts
+from hTools2.__main__ import main
+
+def make_ufo(ufo_path):
+    '''Save a font with a composed glyph and a curve without extreme points.'''
+    font = new_font()
+    glyph = font.newGlyph('a')
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((100, 0))
+    pen.lineTo((100, 100))
+    pen.closePath()
+    glyph = font.newGlyph('b')
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.curveTo((0, 100), (200, 100), (200, 0))
+    pen.closePath()
+    glyph.appendComponent('a', (300, 0))
+    font.save(ufo_path)
+    font.close()
+
+def run(*args):
+    '''Run the command line tool without printing to the console.'''
+    stdout, stderr = sys.stdout, sys.stderr
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = sys.stderr = devnull
+        try:
+            return main(list(args))
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+
+class CommandLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ufo_path = os.path.join(self.folder, 'test.ufo')
+        make_ufo(self.ufo_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_order_and_extremes(self):
+        status = run(self.folder, '--order', '--extremes', '--save')
+        self.assertEqual(status, 0)
+        font = open_font(self.ufo_path)
+        self.assertEqual(len(font['b'].contours[0].points), 7)
+
+    def test_mark_before_decompose(self):
+        status = run(self.folder, '--decompose', '--mark', '--save')
+        self.assertEqual(status, 0)
+        font = open_font(self.ufo_path)
+        self.assertEqual(len(font['b'].components), 0)
+        self.assertEqual(len(font['b'].contours), 2)
+        self.assertNotEqual(font['b'].markColor, None)
+        self.assertEqual(font['a'].markColor, None)
+
+    def test_generate_without_backend(self):
+        if can_generate():
+            return
+        self.assertRaises(SystemExit, run, self.folder, '--generate')
+
+class BatchFontsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ufo_paths = []
+        for i in range(4):
+            ufo_path = os.path.join(self.folder, 'test%s.ufo' % i)
+            make_ufo(ufo_path)
+            self.ufo_paths.append(ufo_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_iterator_of_paths(self):
+        consumed = []
+        def get_paths():
+            for ufo_path in self.ufo_paths:
+                consumed.append(ufo_path)
+                yield ufo_path
+        for workers in [1, 2, None]:
+            del consumed[:]
+            summary = batch_fonts(get_paths(), ['decompose', 'save'], workers=workers, verbose=False)
+            self.assertEqual([result['path'] for result in summary['fonts']], self.ufo_paths)
+            self.assertEqual([result['status'] for result in summary['fonts']], ['ok'] * 4)
+            self.assertEqual(consumed, self.ufo_paths)
+
+    def test_errors_reported(self):
+        ufo_paths = self.ufo_paths + [os.path.join(self.folder, 'missing.ufo')]
+        summary = batch_fonts(iter(ufo_paths), ['save'], workers=1, verbose=False)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['fonts'][-1]['status'], 'error')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# [h] tests for the build cache in hTools2.modules.batch
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from hTools2.modules.backends import new_font, open_font
+from hTools2.modules.batch import get_ufo_fingerprint, get_otf_path, read_build_cache, write_build_cache, invalidate_build_cache, generate_fonts, generate_open_font
+
+OPTIONS = { 'decompose' : True, 'checkOutlines' : True, 'autohint' : False, 'releaseMode' : False }
+
+class BuildCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ufo_path = os.path.join(self.folder, 'test.ufo')
+        self.otf_path = get_otf_path(self.ufo_path)
+        font = new_font()
+        glyph = font.newGlyph('a')
+        glyph.width = 500
+        font.save(self.ufo_path)
+        font.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def cache_font(self):
+        '''Record the font in the build cache, as after a successful build.'''
+        with open(self.otf_path, 'w') as otf_file:
+            otf_file.write('otf')
+        write_build_cache(self.folder, { os.path.split(self.otf_path)[1] : get_ufo_fingerprint(self.ufo_path, OPTIONS) })
+
+    def test_fingerprint_changes(self):
+        fingerprint = get_ufo_fingerprint(self.ufo_path, OPTIONS)
+        self.assertEqual(fingerprint, get_ufo_fingerprint(self.ufo_path, OPTIONS))
+        self.assertNotEqual(fingerprint, get_ufo_fingerprint(self.ufo_path, dict(OPTIONS, autohint=True)))
+        font = open_font(self.ufo_path)
+        font['a'].width = 600
+        font.save()
+        self.assertNotEqual(fingerprint, get_ufo_fingerprint(self.ufo_path, OPTIONS))
+
+    def test_skip_unchanged(self):
+        self.cache_font()
+        summary = generate_fonts([self.ufo_path], incremental=True, verbose=False, **OPTIONS)
+        self.assertEqual([result['status'] for result in summary['fonts']], ['skipped'])
+
+    def test_skip_unchanged_open_font(self):
+        self.cache_font()
+        font = open_font(self.ufo_path)
+        result = generate_open_font(font, generate_options=OPTIONS, incremental=True)
+        self.assertEqual(result['status'], 'skipped')
+
+    def test_invalidate(self):
+        self.cache_font()
+        invalidate_build_cache(self.otf_path)
+        self.assertEqual(read_build_cache(self.folder), {})
+
+    def test_unsaved_changes_invalidate(self):
+        self.cache_font()
+        font = open_font(self.ufo_path)
+        font['a'].width = 600
+        result = generate_open_font(font, generate_options=OPTIONS, incremental=True)
+        self.assertNotEqual(result['status'], 'skipped')
+        self.assertEqual(read_build_cache(self.folder), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# [h] tests for hTools2.modules.glyphutils
+
+import random
+import unittest
+
+from hTools2.modules.backends import new_font
+from hTools2.modules.glyphutils import round_glyphs_points, round_points
+
+GRID = (10, 10)
+
+def make_font(seed=1):
+    '''Make a font with random curves, points with names and components.'''
+    random.seed(seed)
+    font = new_font()
+    for i in range(20):
+        glyph = font.newGlyph('g%d' % i)
+        pen = glyph.getPen()
+        for c in range(2):
+            pen.moveTo((random.uniform(-500, 500), random.uniform(-500, 500)))
+            for k in range(5):
+                points = [(random.uniform(-500, 500), random.uniform(-500, 500)) for j in range(3)]
+                pen.curveTo(*points)
+            pen.lineTo((random.uniform(-500, 500), random.uniform(-500, 500)))
+            pen.closePath()
+        glyph.contours[0].points[0].name = 'start'
+        if i:
+            glyph.appendComponent('g0', (3.3, 4.7))
+    return font
+
+def round_per_point(font, (sizeX, sizeY)):
+    '''Reference: round the points one at a time, like the code without NumPy.'''
+    for glyph in font:
+        for contour in glyph.contours:
+            for point in contour.points:
+                point.x = round(float(point.x) / sizeX) * sizeX
+                point.y = round(float(point.y) / sizeY) * sizeY
+
+def get_contents(glyph):
+    points = [[(p.x, p.y, p.type, p.smooth, p.name) for p in contour.points] for contour in glyph.contours]
+    components = [(c.baseGlyph, c.offset) for c in glyph.components]
+    return points, components
+
+class RoundPointsTest(unittest.TestCase):
+
+    def test_same_as_per_point(self):
+        font = make_font()
+        reference = make_font()
+        round_glyphs_points(font, GRID)
+        round_per_point(reference, GRID)
+        for glyph in font:
+            self.assertEqual(get_contents(glyph), get_contents(reference[glyph.name]))
+
+    def test_round_points(self):
+        font = make_font()
+        reference = make_font()
+        round_points(font['g3'], (4, 7))
+        round_per_point(reference, (4, 7))
+        self.assertEqual(get_contents(font['g3']), get_contents(reference['g3']))
+        self.assertNotEqual(get_contents(font['g4']), get_contents(reference['g4']))
+
+    def test_aligned_glyphs_unchanged(self):
+        font = make_font()
+        round_glyphs_points(font, GRID)
+        contours = [font['g1'].naked()[0]]
+        round_glyphs_points(font, GRID)
+        # glyphs without moved points are not rewritten
+        self.assertTrue(font['g1'].naked()[0] is contours[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+# [h] tests for hTools2.modules.instances
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from hTools2.modules.backends import new_font, open_font
+from hTools2.modules.interpol import get_glyph_structure
+
+AXES = ['weight', 'width']
+
+MASTERS = {
+    'Light' : [0, 0],
+    'Bold' : [1000, 0],
+    'Wide' : [0, 100],
+}
+
+def make_master(weight, width):
+    font = new_font()
+    font.info.familyName = 'Test'
+    glyph = font.newGlyph('a')
+    glyph.unicodes = [97]
+    glyph.note = 'note %s' % weight
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((100 + width, 0))
+    pen.curveTo((120 + width, 50 + weight * 0.1), (80, 100), (50, 100 + weight * 0.2))
+    pen.closePath()
+    glyph.appendAnchor('top', (50 + width * 0.5, 100))
+    glyph.width = 500 + width
+    font.groups['public.kern1.a'] = ['a']
+    font.kerning[('public.kern1.a', 'a')] = -10 - weight * 0.01
+    font.features.text = 'feature kern { pos a a %s; } kern;' % weight
+    return font
+
+class Project(object):
+
+    '''A minimal stand-in for the ``hProject`` of a ``DesignSpaceMaker``.'''
+
+    def __init__(self, folder):
+        self.ufos_folder = os.path.join(folder, 'ufos')
+        self.instances_folder = os.path.join(folder, 'instances')
+        os.mkdir(self.ufos_folder)
+        os.mkdir(self.instances_folder)
+
+class Maker(object):
+
+    '''A minimal stand-in for a ``DesignSpaceMaker``.'''
+
+    def __init__(self, folder):
+        self.project = Project(folder)
+        self.axes = AXES
+        self.masters = MASTERS
+        self.neutral = 'Light'
+        self.instances = { 'Medium' : [500, 50] }
+
+@unittest.skipIf(numpy is None, 'the instance engine requires NumPy')
+class InstanceEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        from hTools2.modules.instances import InstanceEngine
+        self.fonts = dict([(name, make_master(*location)) for name, location in MASTERS.items()])
+        self.engine = InstanceEngine(AXES, MASTERS, 'Light', self.fonts)
+
+    def make_instance(self, location):
+        font = new_font()
+        self.engine.make_instance(font, location)
+        return font
+
+    def assertCoordsEqual(self, glyph1, glyph2):
+        structure1, coords1 = get_glyph_structure(glyph1)
+        structure2, coords2 = get_glyph_structure(glyph2)
+        self.assertEqual(structure1, structure2)
+        for (x1, y1), (x2, y2) in zip(coords1, coords2):
+            self.assertAlmostEqual(x1, x2)
+            self.assertAlmostEqual(y1, y2)
+
+    def assertNeutralData(self, font):
+        self.assertEqual(list(font['a'].unicodes), [97])
+        self.assertEqual(font['a'].note, 'note 0')
+        self.assertEqual(dict(font.groups), { 'public.kern1.a' : ('a',) })
+        self.assertEqual(dict(font.kerning), { ('public.kern1.a', 'a') : -10 })
+        self.assertEqual(font.features.text, 'feature kern { pos a a 0; } kern;')
+
+    def test_masters_round_trip(self):
+        for name, location in MASTERS.items():
+            self.assertCoordsEqual(self.make_instance(location)['a'], self.fonts[name]['a'])
+
+    def test_instance_values(self):
+        glyph = self.make_instance([500, 50])['a']
+        self.assertAlmostEqual(glyph.contours[0].points[1].x, 150)
+        self.assertAlmostEqual(glyph.contours[0].points[-1].y, 200)
+        self.assertAlmostEqual(glyph.width, 550)
+
+    def test_neutral_data(self):
+        self.assertNeutralData(self.make_instance([500, 50]))
+
+    def test_invalidate(self):
+        self.make_instance([500, 50])
+        self.fonts['Bold']['a'].contours[0].points[1].x = 300
+        self.engine.invalidate(['a'])
+        self.assertCoordsEqual(self.make_instance(MASTERS['Bold'])['a'], self.fonts['Bold']['a'])
+
+    def test_incompatible_glyph_is_skipped(self):
+        pen = self.fonts['Wide']['a'].getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((10, 10))
+        pen.lineTo((0, 10))
+        pen.closePath()
+        self.engine.clear()
+        self.assertNotIn('a', self.make_instance([500, 50]))
+
+    def test_generate_instances(self):
+        folder = tempfile.mkdtemp()
+        try:
+            results = self.engine.generate_instances({ 'Medium' : [500, 50] }, folder, workers=1, verbose=False)
+            self.assertEqual([result['status'] for result in results], ['ok'])
+            font = open_font(os.path.join(folder, 'Medium.ufo'))
+            self.assertEqual(font.info.styleName, 'Medium')
+            self.assertAlmostEqual(font['a'].width, 550)
+            self.assertNeutralData(font)
+        finally:
+            shutil.rmtree(folder)
+
+@unittest.skipIf(numpy is None, 'the instance engine requires NumPy')
+class DesignSpaceInstancesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.maker = Maker(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def save_masters(self, names):
+        for name in names:
+            make_master(*MASTERS[name]).save(os.path.join(self.maker.project.ufos_folder, '%s.ufo' % name))
+
+    def test_missing_master_is_skipped(self):
+        from hTools2.modules.instances import generate_designspace_instances
+        self.save_masters(['Light', 'Bold'])
+        results = generate_designspace_instances(self.maker, workers=1, verbose=False)
+        self.assertEqual([result['status'] for result in results], ['ok'])
+        font = open_font(os.path.join(self.maker.project.instances_folder, 'Medium.ufo'))
+        # interpolated on the weight axis only
+        self.assertAlmostEqual(font['a'].width, 500)
+        self.assertAlmostEqual(font['a'].contours[0].points[-1].y, 200)
+
+    def test_missing_neutral(self):
+        from hTools2.modules.instances import generate_designspace_instances
+        self.save_masters(['Bold', 'Wide'])
+        self.assertRaises(IOError, generate_designspace_instances, self.maker, workers=1, verbose=False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+# [h] tests for hTools2.modules.interpol
+
+import sys
+import unittest
+
+from StringIO import StringIO
+from hTools2.modules.backends import new_font
+from hTools2.modules.sysutils import BatchChanges
+from hTools2.modules.interpol import InterpolationCache, interpolate_font, interpolate_glyph, get_glyph_signature, get_signature_cache, compare_signatures, glyphs_compatible, get_compatibility_report, check_compatibility
+
+def make_master(delta):
+    '''Make a master font with one glyph, moving some of its points, anchors and guidelines by ``delta``.'''
+    font = new_font()
+    base = font.newGlyph('b')
+    pen = base.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((50 + delta, 0))
+    pen.lineTo((0, 50))
+    pen.closePath()
+    glyph = font.newGlyph('a')
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((100 + delta, 0))
+    pen.curveTo((120 + delta, 50), (80, 100), (50, 100 + delta))
+    pen.closePath()
+    glyph.appendComponent('b', (10 + delta, 20))
+    glyph.appendAnchor('top', (50, 100 + delta))
+    glyph.appendGuideline((10 + delta, 20), 0, name='guide')
+    glyph.lib['key'] = [delta]
+    glyph.unicodes = [0x61]
+    glyph.note = 'note %s' % delta
+    glyph.width = 500 + delta
+    return font
+
+def add_anchors(font, anchors, delta):
+    '''Add a glyph with the given anchors, all moved by ``delta``.'''
+    glyph = font.newGlyph('c')
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((100 + delta, 0))
+    pen.lineTo((0, 100))
+    pen.closePath()
+    for i, anchor_name in enumerate(anchors):
+        glyph.appendAnchor(anchor_name, (i * 100 + delta, 500))
+    glyph.width = 500 + delta
+
+def get_points(glyph):
+    return [[(point.x, point.y, point.type) for point in contour.points] for contour in glyph.contours]
+
+def get_contents(glyph):
+    '''Return the contents of a glyph which are written by interpolation, in a form which can be compared.'''
+    return {
+        'points' : get_points(glyph),
+        'components' : [(component.baseGlyph, tuple(component.transformation)) for component in glyph.components],
+        'anchors' : [(anchor.name, anchor.x, anchor.y) for anchor in glyph.anchors],
+        'guidelines' : [(guideline.name, guideline.x, guideline.y, guideline.angle) for guideline in glyph.guidelines],
+        'lib' : dict(glyph.lib),
+        'width' : glyph.width,
+    }
+
+class InterpolateFontTest(unittest.TestCase):
+
+    def setUp(self):
+        self.f1 = make_master(0)
+        self.f2 = make_master(100)
+
+    def interpolate(self, factor):
+        f3 = new_font()
+        interpolate_font(self.f1, self.f2, f3, factor)
+        return f3
+
+    def test_interpolated_values(self):
+        glyph = self.interpolate(0.5)['a']
+        self.assertEqual(get_points(glyph)[0][1][:2], (150, 0))
+        self.assertEqual(glyph.components[0].offset, (60, 20))
+        self.assertEqual((glyph.anchors[0].x, glyph.anchors[0].y), (50, 150))
+        self.assertEqual(glyph.width, 550)
+
+    def test_lib_and_guidelines(self):
+        glyph = self.interpolate(0.5)['a']
+        self.assertEqual(glyph.lib['key'], [0])
+        self.assertEqual([(guideline.name, guideline.x, guideline.y) for guideline in glyph.guidelines], [('guide', 60, 20)])
+        # the lib is copied, not shared with the master
+        glyph.lib['key'].append(1)
+        self.assertEqual(self.f1['a'].lib['key'], [0])
+
+    def test_unicodes_and_note(self):
+        glyph = self.interpolate(0.5)['a']
+        self.assertEqual(list(glyph.unicodes), [0x61])
+        self.assertEqual(glyph.note, 'note 0')
+        f3 = new_font()
+        interpolate_glyph('a', self.f1, self.f2, f3, (0.5, 0.5))
+        self.assertEqual(list(f3['a'].unicodes), [0x61])
+        self.assertEqual(f3['a'].note, 'note 0')
+
+    def test_anchor_order(self):
+        add_anchors(self.f1, ['top', 'bottom'], 0)
+        add_anchors(self.f2, ['bottom', 'top'], 100)
+        glyph = self.interpolate(0.5)['c']
+        # anchors are matched by name
+        self.assertEqual([(anchor.name, anchor.x) for anchor in glyph.anchors], [('top', 100), ('bottom', 100)])
+        self.assertEqual(glyph.width, 550)
+
+    def test_missing_anchor(self):
+        add_anchors(self.f1, ['top', 'bottom'], 0)
+        add_anchors(self.f2, ['top'], 100)
+        f3 = new_font()
+        self.assertEqual(sorted(interpolate_font(self.f1, self.f2, f3, 0.5)), ['a', 'b', 'c'])
+        self.assertEqual(get_points(f3['c'])[0][1][:2], (150, 0))
+        self.assertEqual(f3['c'].width, 550)
+
+class InterpolationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.f1 = make_master(0)
+        self.f2 = make_master(100)
+        self.cache = InterpolationCache(self.f1, self.f2)
+
+    def interpolate(self, cache, factor):
+        f3 = new_font()
+        interpolate_font(self.f1, self.f2, f3, factor, cache=cache)
+        return f3
+
+    def test_cached_equals_fresh(self):
+        self.interpolate(self.cache, 0.5)
+        cached = self.interpolate(self.cache, 0.25)
+        fresh = self.interpolate(None, 0.25)
+        self.assertEqual(get_contents(cached['a']), get_contents(fresh['a']))
+        self.assertEqual(get_contents(cached['b']), get_contents(fresh['b']))
+
+    def test_masters_read_once(self):
+        self.interpolate(self.cache, 0.5)
+        self.f1['a'].contours[0].points[1].x = 140
+        # the cache keeps the data it has read
+        self.assertEqual(get_points(self.interpolate(self.cache, 0.5)['a'])[0][1][:2], (150, 0))
+        # until the glyph is invalidated
+        self.cache.invalidate(['a'])
+        cached = self.interpolate(self.cache, 0.5)
+        self.assertEqual(get_points(cached['a'])[0][1][:2], (170, 0))
+        self.assertEqual(get_contents(cached['a']), get_contents(self.interpolate(None, 0.5)['a']))
+
+    def test_structure_edit(self):
+        self.interpolate(self.cache, 0.5)
+        pen = self.f2['a'].getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((10, 10))
+        pen.lineTo((0, 10))
+        pen.closePath()
+        self.cache.clear()
+        self.assertEqual(self.cache.get_entry('a'), None)
+        self.assertNotIn('a', self.interpolate(self.cache, 0.5))
+
+    def test_no_global_cache(self):
+        self.interpolate(None, 0.5)
+        self.f1['a'].contours[0].points[1].x = 140
+        # each call without a cache reads the masters again
+        self.assertEqual(get_points(self.interpolate(None, 0.5)['a'])[0][1][:2], (170, 0))
+
+class SignatureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.f1 = make_master(0)
+        self.f2 = make_master(100)
+
+    def get_mismatches(self):
+        return compare_signatures(get_glyph_signature(self.f1['a']), get_glyph_signature(self.f2['a']))
+
+    def test_compatible(self):
+        self.assertEqual(self.get_mismatches(), [])
+        self.assertTrue(glyphs_compatible(self.f1['a'], self.f2['a']))
+
+    def test_anchor_is_warning(self):
+        self.f2['a'].appendAnchor('bottom', (0, 0))
+        mismatches = self.get_mismatches()
+        self.assertEqual([mismatch['level'] for mismatch in mismatches], ['warning'])
+        self.assertTrue(glyphs_compatible(self.f1['a'], self.f2['a']))
+        report = get_compatibility_report([self.f1, self.f2], ['a'])
+        self.assertEqual(report['glyphs']['a']['status'], 'compatible')
+        self.assertEqual(report['warnings'], 1)
+
+    def test_component_order_is_warning(self):
+        for font in [self.f1, self.f2]:
+            font.newGlyph('c').getPen()
+        self.f1['a'].appendComponent('c', (0, 0))
+        self.f2['a'].clearComponents()
+        self.f2['a'].appendComponent('c', (0, 0))
+        self.f2['a'].appendComponent('b', (0, 0))
+        levels = set([mismatch['level'] for mismatch in self.get_mismatches()])
+        self.assertEqual(levels, set(['warning']))
+        self.assertTrue(glyphs_compatible(self.f1['a'], self.f2['a']))
+
+    def test_contours_are_fatal(self):
+        pen = self.f2['a'].getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((10, 10))
+        pen.lineTo((0, 10))
+        pen.closePath()
+        self.assertEqual(self.get_mismatches()[0]['level'], 'fatal')
+        self.assertFalse(glyphs_compatible(self.f1['a'], self.f2['a']))
+        report = get_compatibility_report([self.f1, self.f2], ['a'])
+        self.assertEqual(report['glyphs']['a']['status'], 'incompatible')
+
+    def test_point_edit_changes_signature(self):
+        signature = get_glyph_signature(self.f2['a'])
+        self.f2['a'].contours[0].points[1].type = 'curve'
+        self.assertNotEqual(get_glyph_signature(self.f2['a']), signature)
+        self.assertFalse(glyphs_compatible(self.f1['a'], self.f2['a']))
+
+    def test_cache_invalidated_on_change(self):
+        cache = get_signature_cache(self.f2)
+        self.assertTrue(get_signature_cache(self.f2) is cache)
+        signature = cache.get(self.f2['a'])
+        self.assertTrue(cache.get(self.f2['a']) is signature)
+        # appending an anchor posts a change notification
+        self.f2['a'].appendAnchor('bottom', (0, 0))
+        self.assertEqual(cache.get(self.f2['a'])[2], ('top', 'bottom'))
+        # point types changed in place need a clear
+        self.f2['a'].contours[0].points[1].type = 'curve'
+        self.assertTrue(glyphs_compatible(self.f1['a'], self.f2['a']))
+        cache.clear()
+        self.assertFalse(glyphs_compatible(self.f1['a'], self.f2['a']))
+
+    def test_cache_in_batch(self):
+        cache = get_signature_cache(self.f2)
+        cache.get(self.f2['a'])
+        with BatchChanges(self.f2):
+            self.f2['a'].appendAnchor('bottom', (0, 0))
+            self.assertEqual(cache.get(self.f2['a'])[2], ('top', 'bottom'))
+        self.assertEqual(cache.get(self.f2['a'])[2], ('top', 'bottom'))
+
+    def test_missing_glyph_message(self):
+        self.f1.newGlyph('x')
+        self.f2.newGlyph('y')
+        stdout = sys.stdout
+        sys.stdout = output = StringIO()
+        try:
+            check_compatibility(self.f1, self.f2, names=['a', 'x', 'y'])
+        finally:
+            sys.stdout = stdout
+        self.assertIn('### x is not in font 2', output.getvalue())
+        self.assertIn('### y is not in font 1', output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# [h] tests for hTools2.modules.rasterizer
+
+import unittest
+
+from hTools2.modules.backends import new_font
+from hTools2.modules.primitives import rect, oval
+from hTools2.modules.rasterizer import RasterGlyph, RasterBits, get_element_rect, get_glyph_segments, scan_segments, rescan_changed
+
+RES = (20, 20)
+
+def make_font():
+    font = new_font()
+    element = font.newGlyph('_element')
+    rect(element.getPen(), 0, 0, RES[0], RES[1])
+    element.width = RES[0]
+    # curves
+    glyph = font.newGlyph('o')
+    oval(glyph.getPen(), 50, 0, 500, 600)
+    oval(glyph.getPen(), 150, 100, 300, 400)
+    glyph.width = 600
+    # contours and components
+    glyph = font.newGlyph('c')
+    rect(glyph.getPen(), 450, 0, 200, 700)
+    glyph.appendComponent('o', (30, 40), (1.2, 0.8))
+    glyph.width = 800
+    # quadratic curves
+    glyph = font.newGlyph('q')
+    pen = glyph.getPen()
+    pen.moveTo((0, 0))
+    pen.qCurveTo((300, 600), (600, 0))
+    pen.closePath()
+    glyph.width = 600
+    return font
+
+def scan(glyph, mode='scanline'):
+    R = RasterGlyph(glyph)
+    R.scan(RES, mode=mode, force=True)
+    return R.coordenates
+
+class ScanlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = make_font()
+
+    def test_scanline_equals_point_inside(self):
+        for glyph_name in ['o', 'c', 'q']:
+            bits1 = scan(self.font[glyph_name], 'scanline')
+            bits2 = scan(self.font[glyph_name], 'pointInside')
+            self.assertEqual(bits1.top, bits2.top)
+            self.assertEqual(bits1.width, bits2.width)
+            self.assertEqual(bits1.data, bits2.data, glyph_name)
+            self.assertTrue(any(bits1.data))
+
+class RescanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = make_font()
+
+    def test_cached_bits_equal_fresh_bits(self):
+        R = RasterGlyph(self.font['o'])
+        R.scan(RES)
+        R.scan(RES)
+        self.assertTrue(R.skipped)
+        self.assertEqual(R.coordenates.data, scan(self.font['o']).data)
+
+    def test_rescan_changed(self):
+        for glyph_name in ['o', 'c', 'q']:
+            RasterGlyph(self.font[glyph_name]).scan(RES)
+        self.assertEqual(rescan_changed(self.font, RES), [])
+        # point edits do not send change notifications
+        self.font['q'].contours[0].points[1].y = 800
+        self.assertEqual(rescan_changed(self.font, RES), ['q'])
+        # a new resolution or another mode needs new bits
+        self.assertEqual(sorted(rescan_changed(self.font, (40, 40))), ['c', 'o', 'q'])
+        self.assertEqual(sorted(rescan_changed(self.font, (40, 40), mode='pointInside')), ['c', 'o', 'q'])
+
+    def test_rasterized_contours_are_not_rescanned(self):
+        R = RasterGlyph(self.font['o'])
+        R.scan(RES)
+        R.rasterize(res=RES, merge='rects', contours=True)
+        self.assertTrue(len(self.font['o'].contours) > 2)
+        self.assertNotIn('o', rescan_changed(self.font, RES))
+        self.font['o'].contours[0].points[0].x += 5
+        self.assertIn('o', rescan_changed(self.font, RES))
+
+class RasterBitsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = make_font()
+        self.bits = scan(self.font['o'])
+
+    def test_lib_round_trip(self):
+        bits = RasterBits.from_lib(self.bits.to_lib())
+        self.assertEqual((bits.top, bits.width, bits.origin, bits.res), (self.bits.top, self.bits.width, self.bits.origin, self.bits.res))
+        self.assertEqual(bits.data, self.bits.data)
+
+    def test_read_old_lib_format(self):
+        # old format: stringified line numbers -> lists of bits
+        old_lib = dict([(str(line), list(self.bits.get_bits(line))) for line in self.bits.line_numbers()])
+        bits = RasterBits.from_lib(old_lib)
+        self.assertEqual(bits.top, self.bits.top)
+        self.assertEqual(bits.line_numbers(), self.bits.line_numbers())
+        for line in bits.line_numbers():
+            self.assertEqual(list(bits.get_bits(line)), old_lib[str(line)])
+
+    def test_read_old_lib_from_glyph(self):
+        glyph = self.font['o']
+        R = RasterGlyph(glyph)
+        glyph.lib[R.lib_key_coordenates] = dict([(str(line), list(self.bits.get_bits(line))) for line in self.bits.line_numbers()])
+        glyph.lib[R.lib_key_margins] = 2, 3
+        R.read_bits_from_lib()
+        self.assertEqual(R.coordenates.data, self.bits.data)
+        self.assertEqual((R.leftMargin, R.rightMargin), (2, 3))
+
+def scan_output(glyph):
+    '''Scan a rasterized glyph, including its components.'''
+    return scan_segments(get_glyph_segments(glyph), glyph.bounds, RES).data
+
+class MergeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = make_font()
+        self.R = RasterGlyph(self.font['o'])
+        self.R.scan(RES)
+        self.element_box = get_element_rect(self.font, '_element')
+
+    def place(self, glyph_name, merge, contours=False):
+        glyph = self.font.newGlyph(glyph_name)
+        self.R.place_components(glyph, RES, '_element', merge, self.element_box, contours)
+        return glyph
+
+    def test_merged_rasters_look_identical(self):
+        single = self.place('single', None)
+        expected = scan_output(single)
+        for merge in ['rows', 'rects']:
+            merged = self.place('merged_%s' % merge, merge)
+            self.assertEqual(scan_output(merged), expected, merge)
+            self.assertEqual(merged.bounds, single.bounds)
+            self.assertTrue(0 < len(merged.components) < len(single.components))
+        contours = self.place('contours', 'rects', contours=True)
+        self.assertEqual(len(contours.components), 0)
+        self.assertEqual(scan_output(contours), expected)
+
+    def test_rects_use_fewer_components_than_rows(self):
+        rows = self.place('rows', 'rows')
+        rects = self.place('rects', 'rects')
+        self.assertTrue(len(rects.components) < len(rows.components))
+
+    def test_no_merge_for_gaps(self):
+        # elements smaller than the grid cells leave gaps, so they are never merged
+        element = self.font['_element']
+        element.clear()
+        rect(element.getPen(), 0, 0, RES[0] - 5, RES[1] - 5)
+        self.element_box = get_element_rect(self.font, '_element')
+        single = self.place('single', None)
+        merged = self.place('merged', 'rects')
+        self.assertEqual(len(merged.components), len(single.components))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# [h] tests for hTools2.modules.subsets
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fontTools.ttLib import TTFont
+from hTools2.modules.subsets import get_unicode_range, plan_language_subsets, plan_group_subsets, plan_font_subsets, make_font_subsets
+from test_ttx import make_font
+
+#: A structured encoding file, with group names from column 18.
+ENCODING = '''%% test encoding
+%% group name:    letters
+a
+b
+%% group name:    more
+b
+c
+%%_ comment
+'''
+
+class PlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.enc_path = os.path.join(self.folder, 'test.enc')
+        with open(self.enc_path, 'w') as enc_file:
+            enc_file.write(ENCODING)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_unicode_range(self):
+        self.assertEqual(get_unicode_range([0x63, 0x61, 0x62, 0x20, 0x100, 0x61]), 'U+0020, U+0061-0063, U+0100')
+
+    def test_language_subsets(self):
+        glyph_names = ['a', 'b', 'ccaron', 'scaron', 'zcaron', 'rcaron', 'lcaron', 'lacute', 'racute', 'ocircumflex', 'ccedilla']
+        subsets = plan_language_subsets(glyph_names, ['czech', 'slovak', 'albanian'], min_glyphs=3)
+        self.assertEqual(subsets.keys(), ['base', 'czech-slovak', 'slovak'])
+        self.assertEqual(subsets['czech-slovak'], ['ccaron', 'scaron', 'zcaron'])
+        self.assertEqual(subsets['slovak'], ['lcaron', 'lacute', 'racute', 'ocircumflex'])
+        # small classes go to the base subset
+        self.assertEqual(subsets['base'], ['a', 'b', 'rcaron', 'ccedilla'])
+        # subsets are disjoint and cover all glyphs
+        all_glyphs = sum(subsets.values(), [])
+        self.assertEqual(sorted(all_glyphs), sorted(glyph_names))
+
+    def test_group_subsets(self):
+        subsets = plan_group_subsets(['.notdef', 'a', 'b', 'c'], self.enc_path)
+        self.assertEqual(subsets.items(), [('base', ['.notdef']), ('letters', ['a', 'b']), ('more', ['c'])])
+
+    def test_font_subsets(self):
+        font_path = os.path.join(self.folder, 'test.otf')
+        make_font(font_path)
+        plan = plan_font_subsets(font_path, enc_path=self.enc_path)
+        # glyphs in no group go to the base subset
+        self.assertEqual(plan.keys(), ['base', 'letters', 'more'])
+        self.assertEqual(plan['base']['unicode_range'], 'U+0020')
+        self.assertEqual(plan['letters']['unicodes'], [0x61, 0x62])
+        self.assertEqual(plan['letters']['unicode_range'], 'U+0061-0062')
+        self.assertEqual(plan['more']['glyph_names'], ['c'])
+        # subset fonts and css
+        css_path = os.path.join(self.folder, 'test.css')
+        results = make_font_subsets(font_path, self.folder, plan, flavor='woff', css_path=css_path, workers=1)
+        self.assertEqual([result['status'] for result in results], ['ok'] * 3)
+        self.assertEqual(TTFont(os.path.join(self.folder, 'test-letters.woff')).getBestCmap(), { 0x61 : 'a', 0x62 : 'b' })
+        with open(css_path, 'r') as css_file:
+            css = css_file.readlines()
+        self.assertEqual(len(css), 3)
+        self.assertIn("unicode-range: U+0061-0062; src:url('test-letters.woff')", css[1])
+
+if __name__ == '__main__':
+    unittest.main()
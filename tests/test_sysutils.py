@@ -0,0 +1,47 @@
+# [h] tests for hTools2.modules.sysutils
+
+import unittest
+
+from hTools2.modules.backends import new_font
+from hTools2.modules.sysutils import BatchChanges, glyph_changed
+
+class BatchChangesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.f1 = new_font()
+        self.f2 = new_font()
+        self.calls = []
+        self.g1 = self.watch(self.f1.newGlyph('a'))
+        self.g2 = self.watch(self.f2.newGlyph('b'))
+
+    def watch(self, glyph):
+        glyph.changed = lambda *args: self.calls.append(glyph.name)
+        return glyph
+
+    def test_notifications_sent_once_on_exit(self):
+        with BatchChanges(self.f1):
+            with BatchChanges(self.f1):
+                glyph_changed(self.g1)
+                glyph_changed(self.g1)
+            self.assertEqual(self.calls, [])
+            glyph_changed(self.g1)
+        self.assertEqual(self.calls, ['a'])
+
+    def test_batches_are_per_font(self):
+        with BatchChanges(self.f1):
+            glyph_changed(self.g2)
+            self.assertEqual(self.calls, ['b'])
+            with BatchChanges(self.f2):
+                glyph_changed(self.g2)
+            self.assertEqual(self.calls, ['b', 'b'])
+            glyph_changed(self.g1)
+            self.assertEqual(self.calls, ['b', 'b'])
+        self.assertEqual(self.calls, ['b', 'b', 'a'])
+
+    def test_new_glyphs_inside_batch(self):
+        with BatchChanges(self.f1):
+            self.f1.newGlyph('c')
+        self.assertIn('c', self.f1)
+
+if __name__ == '__main__':
+    unittest.main()
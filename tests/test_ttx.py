@@ -0,0 +1,123 @@
+# [h] tests for hTools2.modules.ttx
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fontTools.ttLib import TTFont
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from hTools2.modules.ttx import fix_font_info, find_and_replace_otf, strip_names_otf, STRIP_NAME_IDS
+
+GLYPHS = ['.notdef', 'space', 'a', 'b', 'c']
+
+CMAP = { 32 : 'space', 97 : 'a', 98 : 'b', 99 : 'c' }
+
+def draw_box(pen, width):
+    pen.moveTo((50, 0))
+    pen.lineTo((50, 500))
+    pen.lineTo((width - 50, 500))
+    pen.lineTo((width - 50, 0))
+    pen.closePath()
+
+def make_font(font_path, cff=True):
+    '''Build a small .otf (CFF) or .ttf font with fontBuilder.'''
+    builder = FontBuilder(1000, isTTF=not cff)
+    builder.setupGlyphOrder(GLYPHS)
+    builder.setupCharacterMap(CMAP)
+    widths = dict([(glyph_name, 500 + i * 10) for i, glyph_name in enumerate(GLYPHS)])
+    glyphs = {}
+    for glyph_name in GLYPHS:
+        if cff:
+            pen = T2CharStringPen(widths[glyph_name], None)
+        else:
+            pen = TTGlyphPen(None)
+        if glyph_name != 'space':
+            draw_box(pen, widths[glyph_name])
+        if cff:
+            glyphs[glyph_name] = pen.getCharString()
+        else:
+            glyphs[glyph_name] = pen.glyph()
+    names = {
+        'familyName' : u'Test Family',
+        'styleName' : u'Regular',
+        'uniqueFontIdentifier' : u'Test Family Regular 1.0',
+        'fullName' : u'Test Family Regular',
+        'version' : u'Version 1.000',
+        'psName' : u'TestFamily-Regular',
+    }
+    if cff:
+        builder.setupCFF('TestFamily-Regular', { 'FullName' : 'Test Family Regular', 'FamilyName' : 'Test Family', 'Notice' : 'Test Family notice' }, glyphs, {})
+    else:
+        builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics(dict([(glyph_name, (widths[glyph_name], 50)) for glyph_name in GLYPHS]))
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable(names)
+    builder.setupOS2(sTypoAscender=800, usWinAscent=800, usWinDescent=200)
+    builder.setupPost()
+    builder.save(font_path)
+
+def get_table_data(font_path):
+    '''Return the raw data of all tables in a font.'''
+    tt_font = TTFont(font_path, lazy=True)
+    data = dict([(tag, tt_font.reader[tag]) for tag in tt_font.reader.keys()])
+    tt_font.close()
+    return data
+
+class EditTablesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.otf_path = os.path.join(self.folder, 'test.otf')
+        make_font(self.otf_path)
+        self.src_data = get_table_data(self.otf_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertOtherTablesUnchanged(self, font_path, changed):
+        data = get_table_data(font_path)
+        self.assertEqual(sorted(data.keys()), sorted(self.src_data.keys()))
+        for tag in data:
+            if tag not in changed:
+                self.assertEqual(data[tag], self.src_data[tag], '%s table changed' % tag)
+
+    def test_fix_font_info(self):
+        fix_font_info(self.otf_path, 'Test Family', 'Regular', 2, 5)
+        tt_font = TTFont(self.otf_path)
+        self.assertEqual(tt_font['name'].getName(5, 3, 1, 0x409).toUnicode(), 'Version 2.5')
+        self.assertTrue(tt_font['name'].getName(3, 3, 1, 0x409).toUnicode().startswith('Test Family Regular: '))
+        self.assertOtherTablesUnchanged(self.otf_path, ['name', 'head'])
+
+    def test_find_and_replace(self):
+        dest_path = os.path.join(self.folder, 'replaced.otf')
+        count = find_and_replace_otf(self.otf_path, dest_path, 'Test Family', 'Other Family', tables=['name', 'CFF '])
+        self.assertTrue(count > 0)
+        tt_font = TTFont(dest_path)
+        self.assertEqual(tt_font['name'].getName(1, 3, 1, 0x409).toUnicode(), 'Other Family')
+        font_dict = tt_font['CFF '].cff.topDictIndex[0]
+        self.assertEqual(font_dict.FamilyName, 'Other Family')
+        self.assertEqual(font_dict.Notice, 'Other Family notice')
+        self.assertOtherTablesUnchanged(dest_path, ['name', 'CFF ', 'head'])
+
+    def test_strip_names(self):
+        strip_names_otf(self.otf_path)
+        tt_font = TTFont(self.otf_path)
+        for record in tt_font['name'].names:
+            if record.nameID in STRIP_NAME_IDS:
+                self.assertEqual(record.toUnicode(), ' ')
+        self.assertOtherTablesUnchanged(self.otf_path, ['name', 'head'])
+
+    def test_head_only_checksum(self):
+        def get_head(font_path):
+            head = dict(vars(TTFont(font_path)['head']))
+            del head['checkSumAdjustment']
+            return head
+        src_head = get_head(self.otf_path)
+        strip_names_otf(self.otf_path)
+        self.assertEqual(get_head(self.otf_path), src_head)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+# [h] tests for hTools2.modules.webfonts
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fontTools.ttLib import TTFont
+from io import BytesIO
+from base64 import b64encode
+from hTools2.modules.ttx import open_otf
+from hTools2.modules.webfonts import FontPipeline, generate_webfont_kits, compress_font, sfnt2woff, write_base64, get_fontface_info, write_fontface, generate_css_kit, SubsetService
+from test_ttx import make_font
+
+def get_name(font_path, nameID):
+    return TTFont(font_path)['name'].getName(nameID, 3, 1, 0x409).toUnicode()
+
+class FontPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.otf_path = os.path.join(self.folder, 'test.otf')
+        make_font(self.otf_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_stages(self):
+        dst_path = os.path.join(self.folder, 'dst.otf')
+        pipeline = FontPipeline(self.otf_path)
+        pipeline.add('version', 'Version 2.0')
+        pipeline.add('unique_name', 'Test 2.0')
+        pipeline.add('dsig')
+        pipeline.add('subset', ['.notdef', 'a', 'b'])
+        saved = pipeline.save(otf_path=dst_path)
+        pipeline.close()
+        self.assertEqual(saved, [dst_path])
+        tt_font = TTFont(dst_path)
+        self.assertEqual(tt_font.getGlyphOrder(), ['.notdef', 'a', 'b'])
+        self.assertIn('DSIG', tt_font)
+        self.assertEqual(get_name(dst_path, 5), 'Version 2.0')
+        self.assertEqual(get_name(dst_path, 3), 'Test 2.0')
+
+    def test_loaded_once(self):
+        pipeline = FontPipeline(self.otf_path)
+        pipeline.add('version', 'Version 2.0')
+        tt_font = pipeline.run()
+        self.assertTrue(pipeline.run() is tt_font)
+        pipeline.close()
+
+    def test_formats(self):
+        woff_path = os.path.join(self.folder, 'test.woff')
+        pipeline = FontPipeline(self.otf_path)
+        pipeline.add('strip_names')
+        saved = pipeline.save(otf_path=self.otf_path, woff_path=woff_path)
+        pipeline.close()
+        self.assertEqual(saved, [self.otf_path, woff_path])
+        # the source font can be overwritten
+        self.assertEqual(get_name(self.otf_path, 1), ' ')
+        woff = TTFont(woff_path)
+        self.assertEqual(woff.flavor, 'woff')
+        self.assertEqual(woff['name'].getName(1, 3, 1, 0x409).toUnicode(), ' ')
+        self.assertEqual(woff.getGlyphOrder(), TTFont(self.otf_path).getGlyphOrder())
+
+    def test_unknown_stage(self):
+        self.assertRaises(ValueError, FontPipeline(self.otf_path).add, 'autohint')
+
+class WebfontKitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.src_folder = os.path.join(self.folder, 'fonts')
+        self.dst_folder = os.path.join(self.folder, 'kits')
+        os.mkdir(self.src_folder)
+        make_font(os.path.join(self.src_folder, 'test1.otf'))
+        make_font(os.path.join(self.src_folder, 'test2.ttf'), cff=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def make_kits(self, formats=['otf', 'ttf', 'woff'], **kwargs):
+        results = generate_webfont_kits(self.src_folder, self.dst_folder, formats, workers=1, verbose=False, **kwargs)
+        return [result['status'] for result in results]
+
+    def test_formats_per_source(self):
+        self.assertEqual(self.make_kits(), ['ok', 'ok'])
+        self.assertEqual(sorted(os.listdir(self.dst_folder)), ['.hTools2-kit-cache.json', 'test1.otf', 'test1.woff', 'test2.ttf', 'test2.woff'])
+
+    def test_up_to_date(self):
+        self.make_kits()
+        self.assertEqual(self.make_kits(), ['skipped', 'skipped'])
+        self.assertEqual(self.make_kits(force=True), ['ok', 'ok'])
+
+    def test_changed_options(self):
+        self.make_kits()
+        self.assertEqual(self.make_kits(strip_names=True), ['ok', 'ok'])
+        self.assertEqual(get_name(os.path.join(self.dst_folder, 'test2.ttf'), 1), ' ')
+        self.assertEqual(self.make_kits(strip_names=True), ['skipped', 'skipped'])
+
+    def test_changed_source(self):
+        self.make_kits()
+        # source font newer than its kit
+        mtime = os.path.getmtime(os.path.join(self.src_folder, 'test1.otf')) - 10
+        for file_name in ['test1.otf', 'test1.woff']:
+            os.utime(os.path.join(self.dst_folder, file_name), (mtime, mtime))
+        self.assertEqual(self.make_kits(), ['ok', 'skipped'])
+        os.remove(os.path.join(self.dst_folder, 'test2.woff'))
+        self.assertEqual(self.make_kits(), ['skipped', 'ok'])
+
+    def test_eot_temporary_ttf(self):
+        results = generate_webfont_kits(self.src_folder, self.dst_folder, ['woff', 'eot'], workers=1, strip_names=True, verbose=False)
+        # the .otf font gets no .eot
+        self.assertEqual(results[0]['status'], 'ok')
+        # the processed .ttf for the .eot is not part of the kit
+        self.assertNotIn('test2.ttf', os.listdir(self.dst_folder))
+        self.assertNotIn('test2_eot.ttf', os.listdir(self.dst_folder))
+        if results[1]['status'] == 'ok':
+            self.assertEqual(results[1]['outputs'], [os.path.join(self.dst_folder, name) for name in ['test2.woff', 'test2.eot']])
+
+class CompressTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.otf_path = os.path.join(self.folder, 'test.otf')
+        make_font(self.otf_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assertSameTables(self, tt_font_1, tt_font_2):
+        self.assertEqual(sorted(tt_font_1.keys()), sorted(tt_font_2.keys()))
+        for tag in tt_font_1.keys():
+            if tag not in ['GlyphOrder', 'head']:
+                self.assertEqual(tt_font_1.getTableData(tag), tt_font_2.getTableData(tag), tag)
+
+    def test_woff_file(self):
+        sfnt2woff(self.otf_path)
+        woff = TTFont(os.path.join(self.folder, 'test.woff'))
+        self.assertEqual(woff.flavor, 'woff')
+        self.assertSameTables(woff, TTFont(self.otf_path))
+
+    def test_woff_data(self):
+        data = compress_font(self.otf_path)
+        woff = TTFont(BytesIO(data))
+        self.assertEqual(woff.flavor, 'woff')
+        self.assertSameTables(woff, TTFont(self.otf_path))
+
+    def test_font_object(self):
+        tt_font = open_otf(self.otf_path)
+        compress_font(tt_font, os.path.join(self.folder, 'test.woff'))
+        # the font object keeps its flavor and stays open
+        self.assertEqual(tt_font.flavor, None)
+        self.assertEqual(tt_font.getGlyphOrder()[0], '.notdef')
+        tt_font.close()
+
+class CSSTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.woff_path = os.path.join(self.folder, 'test.woff')
+        make_font(os.path.join(self.folder, 'test.otf'))
+        sfnt2woff(os.path.join(self.folder, 'test.otf'))
+        with open(self.woff_path, 'rb') as woff_file:
+            self.woff_data = woff_file.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_base64_chunks(self):
+        for chunk_size in [3, 30, 3 * 16384]:
+            css_file = BytesIO()
+            write_base64(self.woff_path, css_file, chunk_size)
+            self.assertEqual(css_file.getvalue(), b64encode(self.woff_data))
+
+    def test_fontface_info(self):
+        self.assertEqual(get_fontface_info(self.woff_path), (u'Test Family', 400, 'normal'))
+
+    def test_fontface(self):
+        css_file = BytesIO()
+        write_fontface(css_file, self.woff_path, u'Test Family', unicode_range='U+0061-0063')
+        css = css_file.getvalue()
+        self.assertTrue(css.startswith("@font-face { font-family: 'Test Family'; font-weight: normal; font-style: normal; unicode-range: U+0061-0063; "))
+        self.assertIn('data:application/x-font-woff;charset=utf-8;base64,%s)' % b64encode(self.woff_data), css)
+        self.assertTrue(css.endswith(" format('woff') }\n"))
+
+    def test_css_kit(self):
+        css_path = os.path.join(self.folder, 'test.css')
+        generate_css_kit(css_path, [self.woff_path], family_name='Web Family', embed=False)
+        with open(css_path, 'r') as css_file:
+            css = css_file.read()
+        self.assertEqual(css, "@font-face { font-family: 'Web Family'; font-weight: 400; font-style: normal; src:url('test.woff') format('woff') }\n")
+
+class SubsetServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.otf_path = os.path.join(self.folder, 'test.otf')
+        make_font(self.otf_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def get_path(self, name):
+        return os.path.join(self.folder, name)
+
+    def test_glyph_names(self):
+        enc_path = self.get_path('test.enc')
+        with open(enc_path, 'w') as enc_file:
+            enc_file.write('%% test\nc\nx\n')
+        service = SubsetService(self.otf_path)
+        self.assertEqual(service.get_glyph_names(glyph_names=['b', 'x']), ['b'])
+        self.assertEqual(service.get_glyph_names(unicodes=[0x61, 0x20, 0x100]), ['space', 'a'])
+        self.assertEqual(service.get_glyph_names(glyph_names=['b'], enc_path=enc_path), ['b', 'c'])
+
+    def test_subsets(self):
+        for workers in [1, 2]:
+            service = SubsetService(self.otf_path)
+            service.add(self.get_path('ab.otf'), glyph_names=['a', 'b'])
+            service.add(self.get_path('c.woff'), unicodes=[0x63], flavor='woff')
+            service.add(self.get_path('a.otf'), glyph_names=['a'])
+            results = service.run(workers=workers)
+            self.assertEqual([result['path'] for result in results], [self.get_path(name) for name in ['ab.otf', 'c.woff', 'a.otf']])
+            self.assertEqual([result['status'] for result in results], ['ok'] * 3)
+            # each subset is made from its own copy of the source font
+            self.assertEqual(TTFont(self.get_path('ab.otf')).getGlyphOrder(), ['.notdef', 'a', 'b'])
+            self.assertEqual(TTFont(self.get_path('a.otf')).getGlyphOrder(), ['.notdef', 'a'])
+            woff = TTFont(self.get_path('c.woff'))
+            self.assertEqual(woff.flavor, 'woff')
+            self.assertEqual(woff.getBestCmap(), { 0x63 : 'c' })
+            self.assertEqual(service.jobs, [])
+
+    def test_callback_and_errors(self):
+        done = []
+        service = SubsetService(self.otf_path)
+        service.add(self.get_path('a.otf'), glyph_names=['a'])
+        service.add(self.get_path('missing/b.otf'), glyph_names=['b'])
+        results = service.run(workers=1, callback=done.append)
+        self.assertEqual(done, results)
+        self.assertEqual([result['status'] for result in results], ['ok', 'error'])
+
+if __name__ == '__main__':
+    unittest.main()